@@ -6,8 +6,10 @@ import psutil  # For CPU and Disk usage metrics
 import time
 import sys
 import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from fastapi import FastAPI, Request, HTTPException, Depends, status
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -19,11 +21,16 @@ from google.cloud import secretmanager, storage, logging as cloud_logging, monit
 from google.cloud.monitoring_v3 import Query
 from google.cloud.aiplatform import gapic as aiplatform_gapic
 from google.cloud.aiplatform_v1.types import PredictRequest
-from exporter import export_to_pdf, export_to_csv
+from exporter import export_to_pdf, export_to_csv, render_batch_pdf_to_file, iter_batch_csv, init_render_worker
+from export_cache import ExportCache
+from columnar_exporter import ColumnarExporter, FORMATS as COLUMNAR_FORMATS
 from functools import lru_cache
-from tenacity import retry, stop_after_attempt, wait_exponential
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import json
+import math
+import hashlib
+import orjson
+import tempfile
 import yaml
 from threading import Lock
 from watchdog.observers import Observer
@@ -31,9 +38,22 @@ from watchdog.events import FileSystemEventHandler
 from dotenv import load_dotenv
 from starlette.responses import FileResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from typing import Optional
+from typing import Optional, Any, Dict, List, AsyncIterator
+from contextlib import asynccontextmanager
 import atexit
-from parser import EmailParser  # Ensure EmailParser does not import app.py
+from parser import EmailParser, format_parse_result  # Ensure EmailParser does not import app.py
+from job_queue import JobQueue, JobWorkerPool
+from mime_extractor import new_message_parser, message_to_text
+from compression import CompressionMiddleware
+from secret_cache import SecretCache
+from rate_limiter import TokenBucketLimiter
+from tracing import TracingMiddleware, tracer
+from profiling import WorkerProfiler, ProfilerBusy, PROFILERS
+from token_accounting import TokenLedger, TokenReservation, TokenUsage, GLOBAL_ACCOUNT, usage_scope
+from results_store import ResultStore
+from claims_store import ClaimStore
+from deadline import DeadlineExceeded, deadline_scope
+from retry_budget import retry_coordinator
 from google.cloud.logging.handlers import CloudLoggingHandler
 
 # Import ConfigLoader from config_loader.py
@@ -46,16 +66,15 @@ load_dotenv()
 config_loader = ConfigLoader.get_instance()
 config = config_loader.config
 
-# Initialize FastAPI app
-app = FastAPI()
+# Services created during application startup (see lifespan below)
+email_parser: Optional[EmailParser] = None
+job_queue: Optional[JobQueue] = None
+job_workers: Optional[JobWorkerPool] = None
+pdf_render_pool: Optional[ProcessPoolExecutor] = None
 
 # Configuration for AsyncIOScheduler
 scheduler = AsyncIOScheduler()
 
-# Initialize Google Cloud Logging
-client_logging = cloud_logging.Client()
-client_logging.setup_logging()
-
 # Ensure credentials.json is loaded
 credentials_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "credentials.json")
 if not os.path.exists(credentials_path):
@@ -71,12 +90,182 @@ logger.setLevel(getattr(logging, config['logging']['level'].upper(), logging.DEB
 if logger.hasHandlers():
     logger.handlers.clear()
 
-# Add Cloud Logging handler with structured logging
-cloud_handler = CloudLoggingHandler(client_logging)
-cloud_handler.setFormatter(logging.Formatter(
-    '{"time": "%(asctime)s", "level": "%(levelname)s", "module": "%(module)s", "message": "%(message)s"}'
-))
-logger.addHandler(cloud_handler)
+def setup_cloud_logging():
+    """
+    Initialize Google Cloud Logging and attach the structured handler to the app logger.
+    """
+    client_logging = cloud_logging.Client()
+    client_logging.setup_logging()
+
+    # Add Cloud Logging handler with structured logging
+    cloud_handler = CloudLoggingHandler(client_logging)
+    cloud_handler.setFormatter(logging.Formatter(
+        '{"time": "%(asctime)s", "level": "%(levelname)s", "module": "%(module)s", "message": "%(message)s"}'
+    ))
+    logger.addHandler(cloud_handler)
+
+class LazyClient:
+    """
+    Creates a client on first use. Used for clients that are not needed to serve
+    requests (health checks only), so they do not slow down startup.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = Lock()
+
+    def get(self):
+        """
+        Retrieves the client, creating it if needed.
+        """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+GCP_PROJECT = os.getenv('GCP_PROJECT', 'forensicemailparser')
+project_name = f"projects/{GCP_PROJECT}"
+
+# Google Cloud Secret Manager, Storage and Monitoring clients, created on first use
+secret_client = LazyClient(secretmanager.SecretManagerServiceClient)
+storage_client = LazyClient(lambda: storage.Client(project=GCP_PROJECT))
+monitoring_client = LazyClient(monitoring_v3.MetricServiceClient)
+
+# Centralize Vertex AI client initialization with a factory pattern
+class VertexAIClientFactory:
+    """
+    Factory for creating and managing a single Vertex AI client instance.
+    """
+    _client = None
+    _lock = Lock()
+
+    @classmethod
+    def get_client(cls):
+        """
+        Retrieves the Vertex AI PredictionServiceClient instance.
+        """
+        if cls._client is None:
+            with cls._lock:
+                if cls._client is None:
+                    cls._client = aiplatform_gapic.PredictionServiceClient()
+        return cls._client
+
+async def _timed_phase(report: Dict[str, Any], name: str, func, *args):
+    """
+    Run a blocking startup step in a worker thread and record its duration.
+
+    Args:
+        report (dict): Startup report to record into.
+        name (str): Phase name.
+        func (Callable): Blocking function to run.
+
+    Returns:
+        The function's return value.
+    """
+    start = time.perf_counter()
+    try:
+        return await asyncio.to_thread(func, *args)
+    finally:
+        report['phases'][name] = round((time.perf_counter() - start) * 1000, 1)
+
+def _create_job_services(parser: EmailParser):
+    """
+    Create the persistent job queue and its worker pool.
+
+    Args:
+        parser (EmailParser): Parser used by the workers.
+
+    Returns:
+        tuple: (JobQueue, JobWorkerPool)
+    """
+    jobs_config = config.get('jobs', {})
+    queue = JobQueue(db_path=jobs_config.get('db_path', 'data/jobs.db'),
+                     lease_seconds=jobs_config.get('lease_seconds', 60))
+    workers = JobWorkerPool(
+        queue,
+        parser,
+        workers=jobs_config.get('workers', 2),
+        batch_size=config['parser']['batch_processing']['batch_size'],
+        poll_interval=jobs_config.get('poll_interval', 2),
+        claim_store=claim_store,
+        token_ledger=token_ledger,
+        token_limiter=token_limiter
+    )
+    return queue, workers
+
+def _create_render_pool() -> ProcessPoolExecutor:
+    """
+    Create the process pool that renders PDFs off the event loop's process.
+
+    Workers are spawned (not forked, so they do not inherit the event loop or
+    client threads) and build the reportlab styles once in their initializer.
+
+    Returns:
+        ProcessPoolExecutor: Render pool.
+    """
+    return ProcessPoolExecutor(
+        max_workers=config['app'].get('export', {}).get('pdf_workers', 2),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_render_worker
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application startup and shutdown.
+
+    Independent initializations (Cloud Logging, API keys, EmailParser with its
+    spaCy model) run concurrently in worker threads; Monitoring, Storage and
+    Vertex AI clients are created lazily on first use. The time spent in each
+    phase is logged as a structured startup report and kept on app.state.
+    """
+    global email_parser, job_queue, job_workers, pdf_render_pool, VALID_API_KEYS
+
+    report = {'phases': {}}
+    start = time.perf_counter()
+
+    async def init_parser():
+        parser = await _timed_phase(report, 'email_parser', EmailParser, 'config.yaml')
+        return parser, await _timed_phase(report, 'job_queue', _create_job_services, parser)
+
+    async def init_logging():
+        try:
+            await _timed_phase(report, 'cloud_logging', setup_cloud_logging)
+        except Exception as e:
+            logger.error(f"Cloud Logging setup failed; continuing with local logging: {e}")
+
+    _, VALID_API_KEYS, (email_parser, (job_queue, job_workers)) = await asyncio.gather(
+        init_logging(),
+        _timed_phase(report, 'api_keys', load_valid_api_keys),
+        init_parser(),
+    )
+
+    phase_start = time.perf_counter()
+    # Schedule periodic health checks every 5 minutes
+    scheduler.add_job(periodic_health_check, 'interval', minutes=5)
+    scheduler.add_job(result_store.prune, 'interval', days=1)
+    # Claims copy parse results, so they are kept no longer than the results themselves
+    scheduler.add_job(claim_store.prune, 'interval', days=1, args=[result_store.retention_days])
+    if token_ledger is not None:
+        scheduler.add_job(token_ledger.prune, 'interval', days=1)
+    scheduler.start()
+    secret_cache.start()
+    job_workers.start()
+    pdf_render_pool = _create_render_pool()
+    report['phases']['background_tasks'] = round((time.perf_counter() - phase_start) * 1000, 1)
+
+    report['total_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    app.state.startup_report = report
+    logger.info(f"Startup report: {json.dumps(report)}")
+
+    yield
+
+    await shutdown_event()
+
+# Initialize FastAPI app with orjson-backed responses
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS configuration based on environment
 ENV = os.getenv('FLASK_ENV', 'development')
@@ -90,45 +279,98 @@ app.add_middleware(
     allow_origins=allowed_origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization"],
+    allow_headers=["Content-Type", "Authorization", "X-Request-Timeout", "X-Thread-Id", "traceparent"],
+    expose_headers=["X-Trace-Id"],
+)
+
+# Request body size caps, enforced while the body streams in
+MAX_REQUEST_BYTES = config['app'].get('max_request_bytes', 10 * 1024 * 1024)
+MAX_BATCH_REQUEST_BYTES = config['app'].get('max_batch_request_bytes', 100 * 1024 * 1024)
+
+# Seconds between client-disconnect checks while a parse is in flight
+DISCONNECT_POLL_INTERVAL = 0.5
+
+# gzip/brotli response compression and gzip request decompression
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=config['app'].get('compression', {}).get('minimum_size', 1024),
+    level=config['app'].get('compression', {}).get('level', 6),
+    max_decompressed_bytes=max(MAX_REQUEST_BYTES, MAX_BATCH_REQUEST_BYTES),
 )
 
+# Request tracing: a root span per request, exported to JSONL and/or OTLP (tracing section)
+tracer.configure(config.get('tracing', {}))
+app.add_middleware(TracingMiddleware)
+
 # Initialize Limiter with dynamic rate limits from config
 limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
-# Initialize Google Cloud Secret Manager client
-secret_client = secretmanager.SecretManagerServiceClient()
+# Token-bucket limiter charging estimated provider tokens per API key, shared by all workers on the host
+token_limit_config = config['app'].get('token_rate_limit', {})
+token_limiter = TokenBucketLimiter(
+    db_path=token_limit_config.get('db_path', 'data/rate_limits.db'),
+    capacity=token_limit_config.get('capacity', 60000),
+    refill_per_minute=token_limit_config.get('refill_per_minute', 30000)
+) if token_limit_config.get('enabled', True) else None
+
+# Parse results addressed by content hash, for retrieval and export by id
+results_config = config.get('results', {})
+result_store = ResultStore(
+    db_path=results_config.get('db_path', 'data/results.db'),
+    retention_days=results_config.get('retention_days', 30)
+)
 
-# Initialize Google Cloud Storage client
-GCP_PROJECT = os.getenv('GCP_PROJECT', 'forensicemailparser')
-storage_client = storage.Client(project=GCP_PROJECT)
+# Searchable index of parsed claims (claim/policy number, insured, carrier, date of loss, notes/services)
+claim_store = ClaimStore(db_path=config.get('claims', {}).get('db_path', 'data/claims.db'))
 
-# Initialize Google Cloud Monitoring client
-monitoring_client = monitoring_v3.MetricServiceClient()
-project_name = f"projects/{GCP_PROJECT}"
+def store_parse_result(result: Dict[str, Any], account: str) -> str:
+    """
+    Persist a successful parse result in the results store and the claims index.
 
-# Centralize Vertex AI client initialization with a factory pattern
-class VertexAIClientFactory:
+    Args:
+        result (dict): Parsed data.
+        account (str): Account storing the result (the only one allowed to read it back).
+
+    Returns:
+        str: Result id.
     """
-    Factory for creating and managing a single Vertex AI client instance.
+    result_id = result_store.put(result, account)
+    claim_store.add(result, account)
+    return result_id
+
+# Longest thread id accepted by /parse_email
+MAX_THREAD_ID_LENGTH = 256
+
+def load_thread_state(thread_key: str) -> Optional[Dict[str, Any]]:
     """
-    _client = None
+    Load the parsed state of an email thread.
 
-    @classmethod
-    def get_client(cls):
-        """
-        Retrieves the Vertex AI PredictionServiceClient instance.
-        """
-        if cls._client is None:
-            cls._client = aiplatform_gapic.PredictionServiceClient()
-        return cls._client
+    Args:
+        thread_key (str): API-key-scoped thread id.
+
+    Returns:
+        dict or None: The thread's merged parse result, or None for a new (or expired) thread.
+    """
+    thread = result_store.get_thread(thread_key)
+    return result_store.get(thread[0]) if thread else None
 
-vertex_client = VertexAIClientFactory.get_client()
+# Rendered PDF/CSV exports keyed by content hash; repeat downloads are served from memory
+export_cache = ExportCache(max_bytes=config['app'].get('export', {}).get('cache_max_bytes', 64 * 1024 * 1024))
 
-# Initialize EmailParser
-email_parser = EmailParser(config_path='config.yaml')  # Updated to use 'config.yaml'
+# Hourly token accounting per API key, with budget-based admission control
+token_budget_config = config['app'].get('token_budget', {})
+token_ledger = TokenLedger(
+    db_path=token_budget_config.get('db_path', 'data/token_usage.db'),
+    account_hourly_budget=token_budget_config.get('account_hourly', 0),
+    global_hourly_budget=token_budget_config.get('global_hourly', 0),
+    retention_hours=token_budget_config.get('retention_hours', 720)
+) if token_budget_config.get('enabled', True) else None
+
+# On-demand CPU and allocation profiling of this worker (admin keys only)
+profiling_config = config['app'].get('profiling', {})
+worker_profiler = WorkerProfiler(max_seconds=profiling_config.get('max_seconds', 120))
 
 # Initialize Jinja2 Templates
 templates = Jinja2Templates(directory="templates")
@@ -152,6 +394,22 @@ def _get_memory_usage():
         logger.error(f"Error fetching memory usage: {e}")
         return "N/A"
 
+def _get_private_memory_usage():
+    """
+    Get memory private to this worker (USS), i.e. excluding pages shared with a
+    pre-fork master and sibling workers.
+
+    Returns:
+        float or str: Private memory in MB or "N/A" if an error occurs.
+    """
+    try:
+        process = psutil.Process(os.getpid())
+        mem = process.memory_full_info().uss / (1024 * 1024)  # Convert to MB
+        return round(mem, 2)
+    except Exception as e:
+        logger.error(f"Error fetching private memory usage: {e}")
+        return "N/A"
+
 def _get_cpu_usage():
     """
     Get current CPU usage percentage of the application.
@@ -185,9 +443,39 @@ def _get_disk_usage():
         logger.error(f"Error fetching disk usage: {e}")
         return "N/A"
 
+def _fetch_secret(secret_name):
+    """
+    Fetch the latest version of a secret from GCP Secret Manager.
+
+    Args:
+        secret_name (str): Name of the secret to retrieve.
+
+    Returns:
+        str: Secret value.
+
+    Raises:
+        Exception: If the secret cannot be retrieved.
+    """
+    project_id = os.getenv('GCP_PROJECT', 'forensicemailparser')
+    name = f"projects/{project_id}/secrets/{secret_name}/versions/latest"
+    response = secret_client.get().access_secret_version(request={"name": name})
+    return response.payload.data.decode('UTF-8')
+
+# Secret cache with per-secret TTL and background refresh (stale-while-revalidate)
+secret_cache_config = config.get('secret_cache', {})
+secret_cache = SecretCache(
+    _fetch_secret,
+    default_ttl=secret_cache_config.get('default_ttl', 300),
+    refresh_margin=secret_cache_config.get('refresh_margin', 0.2),
+    ttls=secret_cache_config.get('ttls', {})
+)
+
 def get_secret(secret_name, fallback=None):
     """
-    Retrieve secret from GCP Secret Manager with optional fallback.
+    Retrieve secret from the secret cache with optional fallback.
+
+    Only the first access of a secret goes to Secret Manager; after that the
+    cached value is returned and refreshed in the background before it expires.
 
     Args:
         secret_name (str): Name of the secret to retrieve.
@@ -196,34 +484,51 @@ def get_secret(secret_name, fallback=None):
     Returns:
         str: Secret value or fallback.
     """
-    try:
-        project_id = os.getenv('GCP_PROJECT', 'forensicemailparser')
-        name = f"projects/{project_id}/secrets/{secret_name}/versions/latest"
-        response = secret_client.access_secret_version(request={"name": name})
-        return response.payload.data.decode('UTF-8')
-    except Exception as e:
-        logger.error(f"Failed to retrieve secret '{secret_name}': {e}")
-        return fallback
+    return secret_cache.get(secret_name, fallback)
+
+def _parse_api_keys(keys):
+    """
+    Parse the comma-separated VALID_API_KEYS secret.
+
+    Args:
+        keys (str): Secret value.
+
+    Returns:
+        set: A set of valid API keys.
+    """
+    if keys:
+        return set(key.strip() for key in keys.split(',') if key.strip())
+    logger.warning("No API keys found in Secret Manager.")
+    return set()
+
+def _on_api_keys_rotated(keys):
+    """
+    Secret cache listener: swap in the new API key set after a rotation.
+
+    Args:
+        keys (str): New VALID_API_KEYS value.
+    """
+    global VALID_API_KEYS
+    VALID_API_KEYS = _parse_api_keys(keys)
+    logger.info(f"API keys reloaded ({len(VALID_API_KEYS)} keys)")
 
 def load_valid_api_keys():
     """
-    Load valid API keys from GCP Secret Manager.
+    Load valid API keys from GCP Secret Manager and keep them in sync with rotations.
 
     Returns:
         set: A set of valid API keys.
     """
     try:
+        secret_cache.subscribe('VALID_API_KEYS', _on_api_keys_rotated)
         keys = get_secret('VALID_API_KEYS')  # Store as comma-separated in Secret Manager
-        if keys:
-            return set(key.strip() for key in keys.split(','))
-        else:
-            logger.warning("No API keys found in Secret Manager.")
-            return set()
+        return _parse_api_keys(keys)
     except Exception as e:
         logger.error(f"Error loading API keys: {e}")
         return set()
 
-VALID_API_KEYS = load_valid_api_keys()
+# Loaded during application startup
+VALID_API_KEYS = set()
 
 def validate_api_key(api_key: Optional[str]) -> bool:
     """
@@ -242,7 +547,7 @@ def get_config():
     Accessor to fetch the latest configuration.
 
     Returns:
-        dict: Latest configuration dictionary.
+        Mapping: Read-only view of the current configuration snapshot.
     """
     return config_loader.config
 
@@ -258,6 +563,129 @@ async def api_key_dependency(request: Request):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or missing API key")
     return api_key
 
+async def admin_key_dependency(api_key: str = Depends(api_key_dependency)):
+    """
+    Allow only API keys listed (as SHA-256 hashes) in app.profiling.admin_key_hashes.
+    """
+    profiling = get_config()['app'].get('profiling', {})
+    if not profiling.get('enabled', False):
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if _account_key(api_key) not in profiling.get('admin_key_hashes', []):
+        logger.warning("Profiling requested with a non-admin API key.")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin API key required")
+    return api_key
+
+def _account_key(api_key: str) -> str:
+    """
+    Key under which an API key's rate limits and token usage are stored.
+
+    Keys are hashed so API keys are not stored on disk.
+
+    Args:
+        api_key (str): Validated API key.
+
+    Returns:
+        str: Hex SHA-256 of the API key.
+    """
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+async def try_charge_token_budget(api_key: str, cost: int):
+    """
+    Try to charge estimated provider tokens against the API key's bucket.
+
+    Args:
+        api_key (str): Validated API key.
+        cost (int): Estimated tokens (prompt + max_tokens).
+
+    Returns:
+        RateLimitDecision or None: The decision, or None if token limiting is disabled.
+    """
+    if token_limiter is None:
+        return None
+    if cost > token_limiter.capacity:
+        raise HTTPException(status_code=413, detail="Request exceeds the per-key token budget")
+    return await asyncio.to_thread(token_limiter.acquire, _account_key(api_key), cost)
+
+async def charge_token_budget(api_key: str, cost: int) -> None:
+    """
+    Charge estimated provider tokens, rejecting the request with 429 and Retry-After if over budget.
+
+    Args:
+        api_key (str): Validated API key.
+        cost (int): Estimated tokens (prompt + max_tokens).
+    """
+    decision = await try_charge_token_budget(api_key, cost)
+    if decision is not None and not decision.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Token budget exceeded",
+            headers={"Retry-After": str(math.ceil(decision.retry_after))}
+        )
+
+async def refund_token_budget(api_key: str, cost: int) -> None:
+    """
+    Return a bucket charge for a request that was rejected before any work started.
+
+    Args:
+        api_key (str): Validated API key.
+        cost (int): Tokens charged by charge_token_budget.
+    """
+    if token_limiter is not None:
+        await asyncio.to_thread(token_limiter.refund, _account_key(api_key), cost)
+
+async def try_admit_tokens(api_key: str, estimated_tokens: int):
+    """
+    Try to reserve estimated tokens in the hourly token budget.
+
+    Args:
+        api_key (str): Validated API key.
+        estimated_tokens (int): Estimated input + output tokens.
+
+    Returns:
+        AdmissionDecision or None: The decision, or None if token accounting is disabled.
+    """
+    if token_ledger is None:
+        return None
+    return await asyncio.to_thread(token_ledger.reserve, _account_key(api_key), estimated_tokens)
+
+async def admit_tokens(api_key: str, estimated_tokens: int) -> List[TokenReservation]:
+    """
+    Reserve estimated tokens, rejecting the request with 429 and Retry-After if the hourly budget is spent.
+
+    Args:
+        api_key (str): Validated API key.
+        estimated_tokens (int): Estimated input + output tokens.
+
+    Returns:
+        list: The reservation to settle once the work is done (empty if accounting is disabled).
+    """
+    decision = await try_admit_tokens(api_key, estimated_tokens)
+    if decision is None:
+        return []
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Hourly token budget exceeded",
+            headers={"Retry-After": str(math.ceil(decision.retry_after))}
+        )
+    return [decision.reservation]
+
+async def settle_tokens(reservations: List[TokenReservation], usage: TokenUsage, requests: int = 1) -> None:
+    """
+    Record the tokens admitted work actually used and release its reservations.
+
+    Args:
+        reservations (list): Reservations from admit_tokens.
+        usage (TokenUsage): Provider tokens used.
+        requests (int): Number of parse requests covered.
+    """
+    if token_ledger is None or not reservations:
+        return
+    try:
+        await asyncio.to_thread(token_ledger.settle, reservations, usage, requests)
+    except Exception as e:
+        logger.error(f"Failed to record token usage: {e}")
+
 # Dependency to inject Vertex AI client
 async def get_vertex_client():
     return VertexAIClientFactory.get_client()
@@ -280,7 +708,7 @@ def check_vertex_ai_quota():
             end_time={'seconds': int(time.time())},
             start_time={'seconds': int(time.time()) - 60},
         )
-        results = monitoring_client.list_time_series(
+        results = monitoring_client.get().list_time_series(
             request={
                 "name": project_name,
                 "filter": 'metric.type="aiplatform.googleapis.com/prediction/count"',
@@ -312,7 +740,7 @@ def get_vertex_ai_latency():
             end_time={'seconds': int(time.time())},
             start_time={'seconds': int(time.time()) - 60},
         )
-        results = monitoring_client.list_time_series(
+        results = monitoring_client.get().list_time_series(
             request={
                 "name": project_name,
                 "filter": 'metric.type="aiplatform.googleapis.com/prediction/latency"',
@@ -350,14 +778,14 @@ def get_vertex_ai_resource_usage():
 
 def check_secret_manager():
     """
-    Check connectivity to GCP Secret Manager.
+    Check connectivity to GCP Secret Manager, based on the most recent background refresh.
 
     Returns:
         bool: True if accessible, False otherwise.
     """
     try:
-        _ = get_secret('VERTEX_AI_ENDPOINT', fallback="None")
-        return True
+        # Answered from the secret cache's last refresh; never calls Secret Manager inline
+        return secret_cache.is_healthy()
     except Exception as e:
         logger.error(f"Secret Manager health check failed: {e}")
         return False
@@ -370,7 +798,7 @@ def check_cloud_storage():
         bool: True if accessible, False otherwise.
     """
     try:
-        buckets = list(storage_client.list_buckets())
+        buckets = list(storage_client.get().list_buckets())
         return True if buckets else False
     except Exception as e:
         logger.error(f"Cloud Storage health check failed: {e}")
@@ -397,20 +825,31 @@ def perform_health_checks():
         },
         "performance": {
             "memory_usage_mb": _get_memory_usage(),
+            "private_memory_mb": _get_private_memory_usage(),
             "cpu_usage_percent": _get_cpu_usage(),
             "disk_usage": _get_disk_usage(),
             "vertex_ai_latency_ms": "N/A",
             "vertex_ai_quota": "N/A",
             "vertex_ai_resource_usage": "N/A"
+        },
+        "retries": retry_coordinator.stats(),
+        "export_cache": export_cache.stats(),
+        "token_usage": token_ledger.usage(GLOBAL_ACCOUNT, 1) if token_ledger is not None else None,
+        "prompt": email_parser.prompt_stats.snapshot() if email_parser is not None else None,
+        "field_repair": email_parser.repair_stats if email_parser is not None else None,
+        "tracing": tracer.stats if tracer.enabled else None,
+        "completion_tokens": email_parser.token_model.snapshot() if email_parser is not None and email_parser.token_model is not None else None,
+        "config": {
+            "version": config_loader.version,
+            "reload_error": config_loader.last_reload_error
         }
     }
 
-    # Check Vertex AI connectivity with retries
+    # Check Vertex AI connectivity; retries draw from the shared retry budget
     try:
-        @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
         def check_vertex_ai():
-            vertex_client.get_endpoint(name=current_config['ai']['vertex_ai']['endpoint'])
-        check_vertex_ai()
+            VertexAIClientFactory.get_client().get_endpoint(name=current_config['ai']['vertex_ai']['endpoint'])
+        retry_coordinator.call(check_vertex_ai)
         health_data["components"]["vertex_ai"] = True
     except Exception as e:
         logger.error(f"Vertex AI connectivity check failed: {e}")
@@ -458,10 +897,11 @@ async def health_check():
     Health check endpoint to monitor application status.
 
     Returns:
-        JSONResponse: JSON response containing health data.
+        ORJSONResponse: JSON response containing health data.
     """
     health_data = perform_health_checks()
-    return JSONResponse(content=health_data)
+    health_data["startup"] = getattr(app.state, 'startup_report', None)
+    return ORJSONResponse(content=health_data)
 
 # Serve Frontend
 @app.get("/", response_class=Response)
@@ -473,7 +913,7 @@ async def serve_frontend(request: Request):
         request (Request): Incoming request.
 
     Returns:
-        HTMLResponse or JSONResponse: Rendered HTML template or error JSON.
+        HTMLResponse or ORJSONResponse: Rendered HTML template or error JSON.
     """
     try:
         return templates.TemplateResponse("index.html", {"request": request})
@@ -481,6 +921,132 @@ async def serve_frontend(request: Request):
         logger.error(f"Error serving frontend: {e}")
         raise HTTPException(status_code=500, detail="Failed to load application")
 
+def _check_content_length(request: Request, max_bytes: int) -> None:
+    """
+    Reject a request early when its declared Content-Length exceeds the cap.
+
+    Args:
+        request (Request): Incoming request.
+        max_bytes (int): Maximum accepted body size.
+    """
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Request body too large (max {max_bytes} bytes)")
+
+async def _iter_body(request: Request, max_bytes: int) -> AsyncIterator[bytes]:
+    """
+    Stream the request body, aborting as soon as it exceeds the size cap.
+
+    Args:
+        request (Request): Incoming request.
+        max_bytes (int): Maximum accepted body size.
+
+    Yields:
+        bytes: Body chunks.
+    """
+    _check_content_length(request, max_bytes)
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Request body too large (max {max_bytes} bytes)")
+        yield chunk
+
+async def _read_body(request: Request, max_bytes: int) -> bytes:
+    """
+    Read the full request body under a size cap.
+
+    Args:
+        request (Request): Incoming request.
+        max_bytes (int): Maximum accepted body size.
+
+    Returns:
+        bytes: Request body.
+    """
+    return b''.join([chunk async for chunk in _iter_body(request, max_bytes)])
+
+async def _read_json(request: Request, max_bytes: int = None) -> Any:
+    """
+    Read and decode a JSON request body with orjson.
+
+    Args:
+        request (Request): Incoming request.
+        max_bytes (int, optional): Maximum accepted body size (defaults to MAX_REQUEST_BYTES).
+
+    Returns:
+        Any: Decoded JSON body.
+    """
+    body = await _read_body(request, max_bytes or MAX_REQUEST_BYTES)
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+
+async def _read_rfc822_body(request: Request) -> str:
+    """
+    Incrementally parse a raw RFC 822 request body into prompt-ready text.
+
+    The body is fed to the MIME parser chunk by chunk, so attachments are skipped
+    as they stream past instead of being buffered and decoded.
+
+    Args:
+        request (Request): Incoming request with a message/rfc822 body.
+
+    Returns:
+        str: Selected headers and the best text part of the message.
+    """
+    feed = new_message_parser()
+    async for chunk in _iter_body(request, MAX_REQUEST_BYTES):
+        feed.feed(chunk)
+    return message_to_text(feed.close())
+
+def _request_timeout(request: Request) -> float:
+    """
+    Determine the request deadline from the X-Request-Timeout header or config.
+
+    Args:
+        request (Request): Incoming request.
+
+    Returns:
+        float: Seconds the request may run, capped at app.request_timeout.max.
+    """
+    timeout_config = get_config()['app'].get('request_timeout', {})
+    maximum = timeout_config.get('max', 300)
+    header = request.headers.get('x-request-timeout')
+    if header is None:
+        return min(timeout_config.get('default', 60), maximum)
+    try:
+        timeout = float(header)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid X-Request-Timeout header")
+    if not timeout > 0:
+        raise HTTPException(status_code=400, detail="Invalid X-Request-Timeout header")
+    return min(timeout, maximum)
+
+async def _run_until_disconnect(request: Request, awaitable) -> Any:
+    """
+    Await work for a request, cancelling it if the client disconnects first.
+
+    Args:
+        request (Request): Incoming request.
+        awaitable: Work to run (runs as a task in the current context, deadline included).
+
+    Returns:
+        Any: The work's result.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("Client disconnected; cancelling in-flight parse")
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
 # Parse Email Endpoint
 @app.post("/parse_email")
 @limiter.limit(lambda request: get_config()['app']['rate_limit']['parse_email'])
@@ -489,51 +1055,555 @@ async def parse_email_endpoint(request: Request, api_key: str = Depends(api_key_
     """
     Endpoint to parse email content.
 
+    A reply in an email thread can be parsed incrementally by passing a thread id
+    ("thread_id" in the JSON body or the X-Thread-Id header): the first message is
+    parsed in full, and each later one only sends the new message and the thread's
+    current fields to the provider and merges the changed fields.
+
     Args:
         request (Request): Incoming request.
         api_key (str): Validated API key.
         email_parser (EmailParser): Email parser instance.
 
     Returns:
-        JSONResponse: Parsed data JSON or error message.
+        ORJSONResponse: Parsed data JSON or error message.
     """
     try:
         logger.info("Received email parse request")
 
         # Validate request data
-        data = await request.json()
-        if not data or 'email_content' not in data:
-            logger.error("Missing email content in request")
-            raise HTTPException(status_code=400, detail="No email content provided")
+        content_type = request.headers.get('content-type', '')
+        thread_id = request.headers.get('x-thread-id')
+        if content_type.startswith('message/rfc822'):
+            email_content = await _read_rfc822_body(request)
+        elif content_type.startswith('text/plain'):
+            email_content = (await _read_body(request, MAX_REQUEST_BYTES)).decode('utf-8', errors='replace')
+        else:
+            data = await _read_json(request)
+            if not data or 'email_content' not in data:
+                logger.error("Missing email content in request")
+                raise HTTPException(status_code=400, detail="No email content provided")
+            email_content = data['email_content']
+            thread_id = data.get('thread_id', thread_id)
 
-        email_content = data['email_content']
         if not isinstance(email_content, str) or not email_content.strip():
             logger.error("Invalid email content format")
             raise HTTPException(status_code=400, detail="Invalid email content provided")
+        if thread_id is not None and (not isinstance(thread_id, str) or not 0 < len(thread_id) <= MAX_THREAD_ID_LENGTH):
+            raise HTTPException(status_code=400, detail="Invalid thread id")
 
-        logger.debug(f"Email content length: {len(email_content)}")
-
-        # Delegate parsing to EmailParser with retries for transient errors
-        @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-        async def parse_email_with_retry(content):
-            return await email_parser.parse_email(content)
+        # Thread ids are scoped to the API key
+        thread_key = f"{_account_key(api_key)[:16]}:{thread_id}" if thread_id else None
+        previous_state = await asyncio.to_thread(load_thread_state, thread_key) if thread_key else None
 
-        response = await parse_email_with_retry(email_content)
+        logger.debug(f"Email content length: {len(email_content)}")
+        estimated_tokens = email_parser.estimate_request_tokens(email_content)
+        await charge_token_budget(api_key, estimated_tokens)
+        try:
+            reservations = await admit_tokens(api_key, estimated_tokens)
+        except HTTPException:
+            # Not admitted, so the tokens just taken from the bucket are not spent
+            await refund_token_budget(api_key, estimated_tokens)
+            raise
+
+        # Delegate parsing to EmailParser. Provider calls are retried there by the shared
+        # retry coordinator, and retries, waits and provider calls all share the request deadline.
+        with usage_scope() as usage:
+            try:
+                with deadline_scope(_request_timeout(request)):
+                    response = await _run_until_disconnect(
+                        request, email_parser.parse_email(email_content, thread_key is not None, previous_state))
+            finally:
+                await settle_tokens(reservations, usage)
 
         if isinstance(response, dict) and 'error' in response:
             logger.error(f"Parsing error: {response['error']}")
             raise HTTPException(status_code=503, detail=response['error'])
         else:
             # Successfully parsed data
-            logger.info("Successfully processed email parsing request")
-            return JSONResponse(content={'result': response}, status_code=200)
+            result_id = await asyncio.to_thread(store_parse_result, response, _account_key(api_key))
+            logger.info(f"Successfully processed email parsing request (result {result_id[:12]})")
+            content = {
+                'result': response,
+                'id': result_id,
+                'usage': {'estimated_tokens': estimated_tokens, 'input_tokens': usage.input_tokens,
+                          'output_tokens': usage.output_tokens}
+            }
+            if thread_key:
+                messages = await asyncio.to_thread(result_store.set_thread, thread_key, result_id)
+                content['thread'] = {'id': thread_id, 'messages': messages, 'incremental': previous_state is not None}
+            return ORJSONResponse(content=content, status_code=200)
 
     except HTTPException as he:
         raise he
+    except DeadlineExceeded:
+        logger.warning("Parse request exceeded its deadline")
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
     except Exception as e:
         logger.error(f"Unexpected error in parse_email: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+def _extract_batch_emails(data: Any, max_emails: int) -> List[str]:
+    """
+    Extract and validate the list of emails from a JSON batch request body.
+
+    Args:
+        data (Any): Decoded JSON body; either a list or an object with an 'emails' list.
+        max_emails (int): Maximum number of emails accepted.
+
+    Returns:
+        list: Email contents to parse.
+    """
+    emails = data.get('emails') if isinstance(data, dict) else data
+    if not isinstance(emails, list) or not emails:
+        raise HTTPException(status_code=400, detail="No emails provided")
+    if len(emails) > max_emails:
+        raise HTTPException(status_code=413, detail=f"Too many emails in batch (max {max_emails})")
+    return [email.get('email_content') if isinstance(email, dict) else email for email in emails]
+
+async def _iter_batch_emails(emails: List[Any]) -> AsyncIterator[Any]:
+    """
+    Yield the emails of a JSON batch, so they are charged as they are scheduled like streamed ones.
+
+    Args:
+        emails (List[Any]): Email contents.
+
+    Yields:
+        Email content.
+    """
+    for email in emails:
+        yield email
+
+async def _iter_ndjson_emails(request: Request, truncated: Dict[str, Any]) -> AsyncIterator[Any]:
+    """
+    Incrementally decode a streamed NDJSON request body into email contents.
+
+    Each line is either a JSON string or an object with an 'email_content' field.
+    Lines that cannot be decoded are passed through as None so they fail validation
+    with their own index instead of aborting the whole batch.
+
+    Args:
+        request (Request): Incoming request with an NDJSON body.
+        truncated (Dict[str, Any]): Filled with 'next_index' and 'detail' if the body is
+            cut short (too many emails or too large), so the response can report it.
+
+    Yields:
+        Email content (or None for malformed lines).
+    """
+    max_emails = get_config()['parser']['batch_processing'].get('max_emails', 1000)
+    count = 0
+    buffer = b''
+
+    def decode(line: bytes):
+        try:
+            item = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            logger.warning("Malformed NDJSON line in batch request")
+            return None
+        return item.get('email_content') if isinstance(item, dict) else item
+
+    try:
+        async for chunk in _iter_body(request, MAX_BATCH_REQUEST_BYTES):
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                if not line.strip():
+                    continue
+                if count >= max_emails:
+                    logger.warning(f"NDJSON batch truncated at {max_emails} emails")
+                    truncated.update(next_index=count, detail=f"Too many emails in batch (max {max_emails})")
+                    return
+                count += 1
+                yield decode(line)
+    except HTTPException as he:
+        # The response is already streaming; stop reading and finish the emails received so far
+        logger.warning(f"NDJSON batch truncated: {he.detail}")
+        truncated.update(next_index=count, detail=he.detail)
+        return
+    if buffer.strip():
+        if count >= max_emails:
+            logger.warning(f"NDJSON batch truncated at {max_emails} emails")
+            truncated.update(next_index=count, detail=f"Too many emails in batch (max {max_emails})")
+            return
+        yield decode(buffer)
+
+def _format_batch_result(index: int, result: Any) -> bytes:
+    """
+    Format a single batch result as an NDJSON line.
+
+    Args:
+        index (int): Position of the email in the request.
+        result (Any): Parsed data, error dict or error message from EmailParser.
+
+    Returns:
+        bytes: Encoded NDJSON line.
+    """
+    return orjson.dumps({'index': index, **format_parse_result(result)}) + b'\n'
+
+# Successful batch results are indexed in the claims store in groups of this size
+CLAIM_INDEX_BATCH = 100
+
+# Batch Parse Emails Endpoint
+@app.post("/parse_emails")
+@limiter.limit(lambda request: get_config()['app']['rate_limit']['parse_emails'])
+async def parse_emails_endpoint(request: Request, api_key: str = Depends(api_key_dependency),
+                                email_parser: EmailParser = Depends(get_email_parser)):
+    """
+    Endpoint to parse many emails over a single connection.
+
+    Accepts either a JSON body (a list of emails, or {"emails": [...]}) or a streamed
+    NDJSON body (Content-Type: application/x-ndjson). Results are streamed back as
+    NDJSON, one line per email in completion order, each tagged with its input index.
+
+    Args:
+        request (Request): Incoming request.
+        api_key (str): Validated API key.
+        email_parser (EmailParser): Email parser instance.
+
+    Returns:
+        StreamingResponse: NDJSON stream of {"index", "result"} or {"index", "error"} lines.
+    """
+    # Set when a streamed body is cut short; reported after the results like an exhausted budget
+    truncated = {}
+    content_type = request.headers.get('content-type', '')
+    if content_type.startswith('application/x-ndjson'):
+        logger.info("Received streamed NDJSON batch parse request")
+        _check_content_length(request, MAX_BATCH_REQUEST_BYTES)
+        emails = _iter_ndjson_emails(request, truncated)
+    else:
+        data = await _read_json(request, MAX_BATCH_REQUEST_BYTES)
+        emails = _extract_batch_emails(data, get_config()['parser']['batch_processing'].get('max_emails', 1000))
+        logger.info(f"Received batch parse request with {len(emails)} emails")
+        emails = _iter_batch_emails(emails)
+
+    # Emails are charged and admitted one by one as they are scheduled (a whole batch would
+    # not fit in the token bucket); scheduling stops when a budget runs out
+    reservations = []
+    budget_exhausted = {}
+
+    async def charged(items):
+        index = 0
+        try:
+            async for content in items:
+                if isinstance(content, str):
+                    estimate = email_parser.estimate_request_tokens(content)
+                    try:
+                        decision = await try_charge_token_budget(api_key, estimate)
+                    except HTTPException as e:
+                        # This email alone exceeds the bucket; it can never be admitted
+                        budget_exhausted.update(next_index=index, detail=e.detail)
+                        return
+                    if decision is not None and not decision.allowed:
+                        budget_exhausted.update(next_index=index, retry_after=math.ceil(decision.retry_after))
+                        return
+                    admission = await try_admit_tokens(api_key, estimate)
+                    if admission is not None and not admission.allowed:
+                        await refund_token_budget(api_key, estimate)
+                        budget_exhausted.update(next_index=index, retry_after=math.ceil(admission.retry_after))
+                        return
+                    if admission is not None:
+                        reservations.append(admission.reservation)
+                index += 1
+                yield content
+        finally:
+            # Stop reading the request body once scheduling stops
+            await items.aclose()
+
+    async def result_stream():
+        completed = 0
+        parsed = []
+        source = charged(emails)
+        with usage_scope() as usage:
+            try:
+                async for index, result in email_parser.iter_parse_emails(source):
+                    completed += 1
+                    if isinstance(result, dict) and 'error' not in result:
+                        parsed.append(result)
+                        if len(parsed) >= CLAIM_INDEX_BATCH:
+                            await asyncio.to_thread(claim_store.add_many, parsed, _account_key(api_key))
+                            parsed = []
+                    yield _format_batch_result(index, result)
+                if parsed:
+                    await asyncio.to_thread(claim_store.add_many, parsed, _account_key(api_key))
+            finally:
+                await settle_tokens(reservations, usage, completed)
+        if budget_exhausted:
+            yield orjson.dumps({'error': "Token budget exceeded", **budget_exhausted}) + b'\n'
+        elif truncated:
+            yield orjson.dumps({'error': "Batch truncated", **truncated}) + b'\n'
+        logger.info(f"Batch parse request finished: {completed} emails processed")
+
+    return StreamingResponse(result_stream(), media_type='application/x-ndjson')
+
+# Submit Job Endpoint
+@app.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+@limiter.limit(lambda request: get_config()['app']['rate_limit']['jobs'])
+async def submit_job_endpoint(request: Request, api_key: str = Depends(api_key_dependency),
+                              email_parser: EmailParser = Depends(get_email_parser)):
+    """
+    Endpoint to submit emails for asynchronous parsing.
+
+    Workers charge each email against the key's token bucket as they schedule it,
+    so emails that could never fit in the bucket are rejected up front.
+
+    Args:
+        request (Request): Incoming request with a list of emails or {"emails": [...]}.
+        api_key (str): Validated API key.
+        email_parser (EmailParser): Email parser instance (for token estimates).
+
+    Returns:
+        ORJSONResponse: Job id and initial status.
+    """
+    data = await _read_json(request, MAX_BATCH_REQUEST_BYTES)
+    emails = _extract_batch_emails(data, get_config().get('jobs', {}).get('max_emails', 10000))
+    if any(not isinstance(email, str) or not email.strip() for email in emails):
+        raise HTTPException(status_code=400, detail="Invalid email content provided")
+    if token_limiter is not None:
+        for index, email in enumerate(emails):
+            if email_parser.estimate_request_tokens(email) > token_limiter.capacity:
+                raise HTTPException(status_code=413, detail=f"Email {index} exceeds the per-key token budget")
+
+    job_id = await asyncio.to_thread(job_queue.submit, emails, _account_key(api_key))
+    job_workers.notify()
+    return ORJSONResponse(
+        content={'job_id': job_id, 'status': 'queued', 'total': len(emails)},
+        status_code=status.HTTP_202_ACCEPTED
+    )
+
+# Job Status Endpoint
+@app.get("/jobs/{job_id}")
+async def get_job_endpoint(job_id: str, offset: int = 0, limit: int = 100,
+                           api_key: str = Depends(api_key_dependency)):
+    """
+    Endpoint to retrieve job progress and a page of results.
+
+    Only the API key that submitted the job can read it.
+
+    Args:
+        job_id (str): Job id returned by POST /jobs.
+        offset (int): Index of the first result to return.
+        limit (int): Maximum number of results to return (capped at 1000).
+        api_key (str): Validated API key.
+
+    Returns:
+        ORJSONResponse: Job status, progress counters and results.
+    """
+    job = await asyncio.to_thread(job_queue.get_job, job_id, max(offset, 0), min(max(limit, 1), 1000),
+                                  _account_key(api_key))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return ORJSONResponse(content=job)
+
+# Claims Search Endpoint
+@app.get("/claims")
+async def search_claims_endpoint(claim_number: Optional[str] = None, policy_number: Optional[str] = None,
+                                 insured_name: Optional[str] = None, carrier: Optional[str] = None,
+                                 loss_from: Optional[str] = None, loss_to: Optional[str] = None,
+                                 q: Optional[str] = None, limit: int = 50, cursor: Optional[int] = None,
+                                 api_key: str = Depends(api_key_dependency)):
+    """
+    Endpoint to search the caller's parsed claims. All given filters must match; results are newest first.
+
+    Args:
+        claim_number (str, optional): Exact claim number (case and spacing are ignored).
+        policy_number (str, optional): Exact policy number (case and spacing are ignored).
+        insured_name (str, optional): Insured name, case-insensitive; end with '*' for a prefix match.
+        carrier (str, optional): Insurance carrier, case-insensitive.
+        loss_from (str, optional): Earliest date of loss (YYYY-MM-DD).
+        loss_to (str, optional): Latest date of loss (YYYY-MM-DD).
+        q (str, optional): Words that must all appear in notes or services.
+        limit (int): Page size (capped at 500).
+        cursor (int, optional): next_cursor from the previous page.
+        api_key (str): Validated API key.
+
+    Returns:
+        ORJSONResponse: {'items': [...], 'next_cursor': int or None}.
+    """
+    page = await asyncio.to_thread(
+        claim_store.query, _account_key(api_key), claim_number, policy_number, insured_name, carrier,
+        loss_from, loss_to, q, min(max(limit, 1), 500), cursor
+    )
+    return ORJSONResponse(content=page)
+
+# Token Usage Endpoint
+@app.get("/usage")
+async def token_usage_endpoint(hours: int = 24, api_key: str = Depends(api_key_dependency)):
+    """
+    Endpoint to retrieve the caller's provider token usage per hour.
+
+    Args:
+        hours (int): Number of hours to return (capped at 720).
+        api_key (str): Validated API key.
+
+    Returns:
+        ORJSONResponse: Hourly usage (estimated, actual input/output and in-flight tokens) and the budgets.
+    """
+    if token_ledger is None:
+        raise HTTPException(status_code=404, detail="Token accounting is disabled")
+    hourly = await asyncio.to_thread(token_ledger.usage, _account_key(api_key), min(max(hours, 1), 720))
+    return ORJSONResponse(content={
+        'hourly': hourly,
+        'account_hourly_budget': token_ledger.account_hourly_budget or None,
+        'global_hourly_budget': token_ledger.global_hourly_budget or None
+    })
+
+# Worker Profiling Endpoints
+@app.get("/admin/profile")
+async def profile_endpoint(seconds: float = 10, profiler: str = 'sample', output: Optional[str] = None,
+                           interval_ms: float = 5, limit: int = 40, api_key: str = Depends(admin_key_dependency)):
+    """
+    Endpoint to profile the CPU use of the worker serving the request for a number of seconds.
+
+    The worker keeps serving other requests while it is profiled. Each worker process
+    profiles only itself; repeat the call to sample other workers.
+
+    Args:
+        seconds (float): Profile duration (capped at app.profiling.max_seconds).
+        profiler (str): 'sample' (stack sampling), 'cprofile' (event loop thread) or 'yappi' (all threads).
+        output (str): 'collapsed' or 'text' for 'sample'; 'pstats' or 'text' for the others.
+        interval_ms (float): Sampling interval ('sample' only).
+        limit (int): Rows in text output.
+        api_key (str): Validated admin API key.
+
+    Returns:
+        Response: Collapsed stacks, a pstats dump or a text report.
+    """
+    if profiler not in PROFILERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported profiler (expected one of {', '.join(PROFILERS)})")
+    output = output or ('collapsed' if profiler == 'sample' else 'pstats')
+    try:
+        body, media_type = await worker_profiler.profile_cpu(
+            seconds, profiler, output, interval=interval_ms / 1000, limit=min(max(limit, 1), 500)
+        )
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    extension = {'collapsed': 'folded', 'pstats': 'pstats', 'text': 'txt'}[output]
+    return Response(content=body, media_type=media_type, headers={
+        "Content-Disposition": f"attachment; filename=profile-{os.getpid()}.{extension}",
+        "X-Worker-Pid": str(os.getpid())
+    })
+
+@app.get("/admin/profile/memory")
+async def memory_profile_endpoint(seconds: float = 10, limit: int = 25, frames: int = 1, group_by: str = 'lineno',
+                                  api_key: str = Depends(admin_key_dependency)):
+    """
+    Endpoint to report allocation hotspots of the worker serving the request.
+
+    tracemalloc runs only between the two snapshots, so it costs nothing otherwise.
+
+    Args:
+        seconds (float): Time between the snapshots (capped at app.profiling.max_seconds).
+        limit (int): Number of hotspots returned.
+        frames (int): Stack frames recorded per allocation (capped at 25).
+        group_by (str): 'lineno', 'filename' or 'traceback'.
+        api_key (str): Validated admin API key.
+
+    Returns:
+        ORJSONResponse: Traced memory and the locations whose allocations grew the most.
+    """
+    try:
+        report = await worker_profiler.profile_memory(
+            seconds, limit=min(max(limit, 1), 500), frames=min(max(frames, 1), 25), group_by=group_by
+        )
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    report['pid'] = os.getpid()
+    report['rss_mb'] = _get_memory_usage()
+    return ORJSONResponse(content=report)
+
+# Merged Claim Record Endpoint
+@app.get("/claims/{identifier}/record")
+async def claim_record_endpoint(identifier: str, api_key: str = Depends(api_key_dependency)):
+    """
+    Endpoint to retrieve the current state of one of the caller's claims, merged from all of its emails.
+
+    Args:
+        identifier (str): Claim number, or a policy number (resolves to the policy's latest claim).
+        api_key (str): Validated API key.
+
+    Returns:
+        ORJSONResponse: Claim record with per-field provenance and the merged values under 'result'.
+    """
+    record = await asyncio.to_thread(claim_store.get_record, identifier, _account_key(api_key))
+    if record is None:
+        raise HTTPException(status_code=404, detail="Claim not found")
+    return ORJSONResponse(content=record)
+
+def _export_etag(kind: str, parsed_data: Any) -> str:
+    """
+    Compute the strong ETag of an export from its content.
+
+    Args:
+        kind (str): Export format.
+        parsed_data (Any): Data being exported.
+
+    Returns:
+        str: Quoted content hash.
+    """
+    return f'"{ExportCache.content_key(kind, parsed_data)}"'
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check a request's If-None-Match header against an ETag.
+
+    Args:
+        request (Request): Incoming request.
+        etag (str): Quoted ETag of the current representation.
+
+    Returns:
+        bool: True if the client's copy is current (respond 304).
+    """
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(',')]
+    return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
+
+async def _render_in_pool(func, *args) -> Any:
+    """
+    Run a picklable render function in the PDF process pool.
+
+    Falls back to a worker thread when the pool is not running (e.g. before startup).
+
+    Args:
+        func (Callable): Module-level render function.
+
+    Returns:
+        The function's return value.
+    """
+    if pdf_render_pool is None:
+        return await asyncio.to_thread(func, *args)
+    return await asyncio.get_running_loop().run_in_executor(pdf_render_pool, func, *args)
+
+async def _cached_export(kind: str, key: str, render) -> bytes:
+    """
+    Return a rendered export from the export cache, rendering it on a miss (traced).
+
+    Args:
+        kind (str): Export format ('pdf' or 'csv').
+        key (str): Content key of the export.
+        render (Callable): Zero-argument callable returning an awaitable of the rendered bytes.
+
+    Returns:
+        bytes: The rendered export.
+    """
+    with tracer.span("export", kind=kind) as span:
+        rendered = False
+
+        async def create() -> bytes:
+            nonlocal rendered
+            rendered = True
+            with tracer.span("export.render", kind=kind):
+                return await render()
+
+        content = await export_cache.get_or_create(key, create)
+        span.set_attributes(**{'cache.hit': not rendered, 'bytes': len(content)})
+        return content
+
 # Export PDF Endpoint
 @app.post("/export_pdf")
 async def export_pdf_endpoint(request: Request):
@@ -547,14 +1617,19 @@ async def export_pdf_endpoint(request: Request):
         Response: PDF file download or error message.
     """
     try:
-        data = await request.json()
+        data = await _read_json(request)
         if not data or 'parsed_data' not in data:
             raise HTTPException(status_code=400, detail="No parsed data provided")
 
-        # Assuming export_to_pdf is a synchronous function
-        pdf_bytes = await asyncio.to_thread(export_to_pdf, data['parsed_data'])
+        etag = _export_etag('pdf', data['parsed_data'])
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        pdf_bytes = await _cached_export(
+            'pdf', etag.strip('"'), lambda: _render_in_pool(export_to_pdf, data['parsed_data'])
+        )
         return Response(content=pdf_bytes, media_type='application/pdf',
-                        headers={"Content-Disposition": "attachment; filename=exported_data.pdf"})
+                        headers={"Content-Disposition": "attachment; filename=exported_data.pdf", "ETag": etag})
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -574,20 +1649,289 @@ async def export_csv_endpoint(request: Request):
         Response: CSV file download or error message.
     """
     try:
-        data = await request.json()
+        data = await _read_json(request)
         if not data or 'parsed_data' not in data:
             raise HTTPException(status_code=400, detail="No parsed data provided")
 
-        # Assuming export_to_csv is a synchronous function
-        csv_string = await asyncio.to_thread(export_to_csv, data['parsed_data'])
-        return Response(content=csv_string, media_type='text/csv',
-                        headers={"Content-Disposition": "attachment; filename=exported_data.csv"})
+        etag = _export_etag('csv', data['parsed_data'])
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        async def render_csv() -> bytes:
+            return (await asyncio.to_thread(export_to_csv, data['parsed_data'])).encode('utf-8')
+
+        csv_bytes = await _cached_export('csv', etag.strip('"'), render_csv)
+        return Response(content=csv_bytes, media_type='text/csv',
+                        headers={"Content-Disposition": "attachment; filename=exported_data.csv", "ETag": etag})
     except HTTPException as he:
         raise he
     except Exception as e:
         logger.error(f"Error exporting CSV: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to export CSV")
 
+# Stored results never change, so clients may keep them; ETags still allow revalidation
+RESULT_CACHE_CONTROL = "private, max-age=86400"
+
+async def _check_result_owner(result_id: str, api_key: str) -> None:
+    """
+    Fail with 404 unless the result exists and was stored with this API key.
+
+    Checked before conditional requests are answered, so a 304 never confirms
+    that someone else's result exists.
+
+    Args:
+        result_id (str): Result id returned by /parse_email.
+        api_key (str): Validated API key.
+    """
+    if not await asyncio.to_thread(result_store.owns, result_id, _account_key(api_key)):
+        raise HTTPException(status_code=404, detail="Result not found")
+
+async def _load_result(result_id: str) -> Dict[str, Any]:
+    """
+    Load a stored parse result or fail with 404.
+
+    Args:
+        result_id (str): Result id returned by /parse_email.
+
+    Returns:
+        dict: Parsed data.
+    """
+    result = await asyncio.to_thread(result_store.get, result_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Result not found")
+    return result
+
+async def _export_stored_result(request: Request, result_id: str, kind: str, api_key: str) -> Response:
+    """
+    Export a stored result as PDF or CSV, answering conditional requests without rendering.
+
+    Args:
+        request (Request): Incoming request.
+        result_id (str): Result id.
+        kind (str): 'pdf' or 'csv'.
+        api_key (str): Validated API key.
+
+    Returns:
+        Response: File download, or 304 if the client's copy is current.
+    """
+    await _check_result_owner(result_id, api_key)
+    # The id is a content hash, so the export's ETag is known before loading anything
+    etag = f'"{result_id}.{kind}"'
+    headers = {"ETag": etag, "Cache-Control": RESULT_CACHE_CONTROL}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    parsed_data = await _load_result(result_id)
+    cache_key = ExportCache.content_key(kind, parsed_data)
+    try:
+        if kind == 'pdf':
+            content = await _cached_export('pdf', cache_key, lambda: _render_in_pool(export_to_pdf, parsed_data))
+            media_type = 'application/pdf'
+        else:
+            async def render_csv() -> bytes:
+                return (await asyncio.to_thread(export_to_csv, parsed_data)).encode('utf-8')
+            content = await _cached_export('csv', cache_key, render_csv)
+            media_type = 'text/csv'
+    except Exception as e:
+        logger.error(f"Error exporting result {result_id[:12]} to {kind}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to export {kind.upper()}")
+    headers["Content-Disposition"] = f"attachment; filename=exported_data.{kind}"
+    return Response(content=content, media_type=media_type, headers=headers)
+
+# Stored Result Exports (declared before /results/{result_id} so the suffix routes match first)
+@app.get("/results/{result_id}.pdf")
+async def result_pdf_endpoint(request: Request, result_id: str, api_key: str = Depends(api_key_dependency)):
+    """
+    Endpoint to export a stored result to PDF.
+
+    Args:
+        request (Request): Incoming request.
+        result_id (str): Result id returned by /parse_email.
+        api_key (str): Validated API key (must be the one that stored the result).
+
+    Returns:
+        Response: PDF file download.
+    """
+    return await _export_stored_result(request, result_id, 'pdf', api_key)
+
+@app.get("/results/{result_id}.csv")
+async def result_csv_endpoint(request: Request, result_id: str, api_key: str = Depends(api_key_dependency)):
+    """
+    Endpoint to export a stored result to CSV.
+
+    Args:
+        request (Request): Incoming request.
+        result_id (str): Result id returned by /parse_email.
+        api_key (str): Validated API key (must be the one that stored the result).
+
+    Returns:
+        Response: CSV file download.
+    """
+    return await _export_stored_result(request, result_id, 'csv', api_key)
+
+# Stored Result Endpoint
+@app.get("/results/{result_id}")
+async def result_endpoint(request: Request, result_id: str, api_key: str = Depends(api_key_dependency)):
+    """
+    Endpoint to retrieve a stored parse result.
+
+    Args:
+        request (Request): Incoming request.
+        result_id (str): Result id returned by /parse_email.
+        api_key (str): Validated API key (must be the one that stored the result).
+
+    Returns:
+        ORJSONResponse: {'id', 'result'}, or 304 if the client's copy is current.
+    """
+    await _check_result_owner(result_id, api_key)
+    etag = f'"{result_id}"'
+    headers = {"ETag": etag, "Cache-Control": RESULT_CACHE_CONTROL}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse(content={'id': result_id, 'result': await _load_result(result_id)}, headers=headers)
+
+# Spooled batch PDFs stay in memory up to this size, then move to a temporary file
+EXPORT_SPOOL_BYTES = 8 * 1024 * 1024
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+async def _batch_export_source(request: Request, api_key: str) -> Any:
+    """
+    Resolve the results to export from a batch export request.
+
+    The body is either {"results": [...]} holding parsed_data objects (or the
+    {"index", "result"/"error"} lines produced by /parse_emails), or {"job_id": "..."}
+    to export a job's stored results (only jobs submitted by the same API key).
+
+    Args:
+        request (Request): Incoming request.
+        api_key (str): Validated API key.
+
+    Returns:
+        Iterable of {'index', 'result'} / {'index', 'error'} entries.
+    """
+    data = await _read_json(request, MAX_BATCH_REQUEST_BYTES)
+    if isinstance(data, dict) and data.get('job_id'):
+        job_id = str(data['job_id'])
+        job = await asyncio.to_thread(job_queue.get_job, job_id, 0, 1, _account_key(api_key))
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job_queue.iter_results(job_id)
+
+    results = data.get('results') if isinstance(data, dict) else None
+    if not isinstance(results, list) or not results:
+        raise HTTPException(status_code=400, detail="No results or job_id provided")
+    entries = []
+    for index, item in enumerate(results):
+        if not isinstance(item, dict):
+            raise HTTPException(status_code=400, detail=f"Result {index} is not an object")
+        if 'result' in item or 'error' in item:
+            entries.append({'index': item.get('index', index), **format_parse_result(item.get('result', item))})
+        else:
+            entries.append({'index': index, 'result': item})
+    return entries
+
+def _iter_spooled_file(spool) -> Any:
+    """
+    Yield a temporary file in chunks and close it afterwards.
+
+    Args:
+        spool: Rewound temporary file.
+    """
+    try:
+        while True:
+            chunk = spool.read(EXPORT_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spool.close()
+
+# Batch Export CSV Endpoint
+@app.post("/export_csv_batch")
+async def export_csv_batch_endpoint(request: Request, api_key: str = Depends(api_key_dependency)):
+    """
+    Endpoint to export many parsed results (or a job's results) as one CSV.
+
+    Rows are streamed as they are produced: Email, Section, Field, Value.
+
+    Args:
+        request (Request): Incoming request.
+        api_key (str): Validated API key.
+
+    Returns:
+        StreamingResponse: CSV file download.
+    """
+    entries = await _batch_export_source(request, api_key)
+    # A sync iterator is consumed in Starlette's thread pool, so job pages are read off the event loop
+    return StreamingResponse(iter_batch_csv(entries), media_type='text/csv',
+                             headers={"Content-Disposition": "attachment; filename=exported_batch.csv"})
+
+# Batch Export PDF Endpoint
+@app.post("/export_pdf_batch")
+async def export_pdf_batch_endpoint(request: Request, api_key: str = Depends(api_key_dependency)):
+    """
+    Endpoint to export many parsed results (or a job's results) as one PDF.
+
+    The PDF is laid out incrementally by a render pool worker into a temporary
+    file, then streamed in chunks. A job's results are read by the worker from
+    the job database, not passed through this process.
+
+    Args:
+        request (Request): Incoming request.
+        api_key (str): Validated API key.
+
+    Returns:
+        StreamingResponse: PDF file download.
+    """
+    entries = await _batch_export_source(request, api_key)
+    output = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+    output.close()
+    try:
+        # Job results (JobResults) are streamed from the job database by the render worker itself
+        await _render_in_pool(render_batch_pdf_to_file, entries, output.name)
+        spool = open(output.name, 'rb')
+    except Exception as e:
+        logger.error(f"Error exporting batch PDF: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to export PDF")
+    finally:
+        # Unlinking an open file keeps it readable until the stream closes it
+        os.unlink(output.name)
+    return StreamingResponse(_iter_spooled_file(spool), media_type='application/pdf',
+                             headers={"Content-Disposition": "attachment; filename=exported_batch.pdf"})
+
+# Columnar Batch Export Endpoint
+@app.post("/export_columnar_batch")
+async def export_columnar_batch_endpoint(request: Request, format: str = 'parquet',
+                                         api_key: str = Depends(api_key_dependency)):
+    """
+    Endpoint to export many parsed results (or a job's results) as Parquet or Arrow IPC.
+
+    One row per email, one typed column per registered field.
+
+    Args:
+        request (Request): Incoming request.
+        format (str): 'parquet' or 'arrow'.
+        api_key (str): Validated API key.
+
+    Returns:
+        StreamingResponse: Columnar file download.
+    """
+    if format not in COLUMNAR_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format (expected one of {', '.join(COLUMNAR_FORMATS)})")
+    entries = await _batch_export_source(request, api_key)
+    exporter = ColumnarExporter(get_config()['parser']['field_validation'])
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    try:
+        await asyncio.to_thread(exporter.write, entries, spool, format)
+        spool.seek(0)
+    except Exception as e:
+        spool.close()
+        logger.error(f"Error exporting {format}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to export {format}")
+    media_type = 'application/vnd.apache.parquet' if format == 'parquet' else 'application/vnd.apache.arrow.file'
+    return StreamingResponse(_iter_spooled_file(spool), media_type=media_type,
+                             headers={"Content-Disposition": f"attachment; filename=exported_batch.{format}"})
+
 # Error Handlers
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
@@ -599,12 +1943,13 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
         exc (StarletteHTTPException): Exception instance.
 
     Returns:
-        JSONResponse: JSON error message.
+        ORJSONResponse: JSON error message.
     """
     logger.warning(f"{exc.status_code} error: {exc.detail}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"error": exc.detail},
+        headers=getattr(exc, 'headers', None),
     )
 
 @app.exception_handler(Exception)
@@ -617,10 +1962,10 @@ async def unhandled_exception_handler(request: Request, exc: Exception):
         exc (Exception): Exception instance.
 
     Returns:
-        JSONResponse: JSON error message.
+        ORJSONResponse: JSON error message.
     """
     logger.error(f"Internal server error: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"error": "Internal server error"},
     )
@@ -634,10 +1979,6 @@ def periodic_health_check():
     health_data = perform_health_checks()
     log_health_data(health_data)
 
-# Schedule periodic health checks every 5 minutes
-scheduler.add_job(periodic_health_check, 'interval', minutes=5)
-scheduler.start()
-
 # Graceful Shutdown of ConfigLoader Observer and APScheduler
 async def shutdown_event():
     """
@@ -645,16 +1986,25 @@ async def shutdown_event():
     """
     logger.info("Shutting down application...")
     try:
-        config_loader.observer.stop()
-        config_loader.observer.join()
+        config_loader.stop()
         scheduler.shutdown(wait=False)
+        await secret_cache.stop()
+        await job_workers.stop()
+        job_queue.close()
+        if token_limiter is not None:
+            token_limiter.close()
+        result_store.close()
+        claim_store.close()
+        if token_ledger is not None:
+            token_ledger.close()
+        if pdf_render_pool is not None:
+            pdf_render_pool.shutdown(wait=False, cancel_futures=True)
         await email_parser.close()  # Ensure EmailParser.close() is async
+        await asyncio.to_thread(tracer.shutdown)
         logger.info("Shutdown complete.")
     except Exception as e:
         logger.error(f"Error during shutdown: {e}")
 
-app.add_event_handler("shutdown", shutdown_event)
-
 # Run the application with Uvicorn
 # This block is typically placed under `if __name__ == '__main__':`
 # but for better integration with ASGI servers, it's recommended to run via command line
@@ -0,0 +1,124 @@
+# chunked_extraction.py
+"""
+Map-reduce extraction for very long emails.
+
+Long forwarded threads and emails with pasted reports are split on message
+and section boundaries into chunks of bounded size. The parser extracts the
+form from each chunk concurrently, and merge_partial_forms() combines the
+partial forms with deterministic rules, so latency depends on the chunk size
+rather than on the length of the email.
+
+Merge rules per field, with chunks in email order (in a reply chain the top
+of the email is the newest message):
+- Missing values ("N/A", empty) never win.
+- Accumulating fields (notes, services, areas to inspect, attachments) join the
+  distinct values of all chunks in order.
+- Other fields take the first value that passes validation, or the first value
+  if none does.
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from claim_merge import ACCUMULATE_SEPARATOR, ACCUMULATING_FIELDS, MISSING_VALUES, field_key
+from token_predictor import QUOTE_HEADERS
+
+# Blank lines separate sections within a message
+_SECTION_BREAK = re.compile(r'\n\s*\n')
+
+def _split_on(text: str, pattern: re.Pattern) -> List[str]:
+    """
+    Splits text before every match of a pattern, keeping the matches.
+    """
+    starts = [match.start() for match in pattern.finditer(text) if match.start() > 0]
+    bounds = [0] + starts + [len(text)]
+    return [text[start:end] for start, end in zip(bounds, bounds[1:]) if text[start:end].strip()]
+
+def _hard_split(text: str, chunk_chars: int) -> List[str]:
+    """
+    Splits an oversized section on line boundaries, and overlong lines by length.
+    """
+    pieces, current = [], ''
+    for line in text.splitlines(keepends=True):
+        while len(current) + len(line) > chunk_chars:
+            if len(line) <= chunk_chars:
+                pieces.append(current)
+                current = ''
+                break
+            # A line longer than a chunk fills the current piece and continues in the next
+            room = chunk_chars - len(current)
+            pieces.append(current + line[:room])
+            current, line = '', line[room:]
+        current += line
+    if current.strip():
+        pieces.append(current)
+    return pieces
+
+def split_email(email_content: str, chunk_chars: int) -> List[str]:
+    """
+    Splits an email into chunks of at most chunk_chars characters.
+
+    Quoted and forwarded messages start new chunks; within a message, sections
+    (paragraphs) are packed into chunks in order. Only sections longer than a
+    chunk are cut, on line boundaries (overlong lines by length).
+
+    Args:
+        email_content (str): The email content.
+        chunk_chars (int): Maximum characters per chunk.
+
+    Returns:
+        List[str]: Chunks in email order.
+    """
+    chunks = []
+    for message in _split_on(email_content, QUOTE_HEADERS):
+        current = ''
+        for section in _split_on(message, _SECTION_BREAK):
+            pieces = [section] if len(section) <= chunk_chars else _hard_split(section, chunk_chars)
+            for piece in pieces:
+                if current and len(current) + len(piece) > chunk_chars:
+                    chunks.append(current)
+                    current = ''
+                current += piece
+        if current.strip():
+            chunks.append(current)
+    return chunks or [email_content]
+
+def merge_partial_forms(parts: List[Dict[str, Any]],
+                        is_valid: Optional[Callable[[str, str], bool]] = None) -> Dict[str, Any]:
+    """
+    Merges the forms extracted from the chunks of one email.
+
+    Args:
+        parts (List[Dict[str, Any]]): Parsed data of each chunk, in email order.
+        is_valid (Optional[Callable[[str, str], bool]]): Whether a field's value passes validation.
+
+    Returns:
+        Dict[str, Any]: The merged parsed data, in the parser's sectioned layout.
+    """
+    merged: Dict[str, Dict[str, str]] = {}
+    # Whether the value chosen for (section, key) passed validation
+    chosen_valid: Dict[tuple, bool] = {}
+    for part in parts:
+        for section, fields in part.items():
+            if not isinstance(fields, dict):
+                continue
+            target = merged.setdefault(section, {})
+            for key, value in fields.items():
+                if not isinstance(value, str):
+                    continue
+                value = value.strip()
+                current = target.get(key)
+                if value in MISSING_VALUES:
+                    if current is None:
+                        target[key] = value
+                    continue
+                if current is None or current in MISSING_VALUES:
+                    target[key] = value
+                    chosen_valid[section, key] = is_valid(key, value) if is_valid else True
+                elif field_key(key) in ACCUMULATING_FIELDS:
+                    if value.lower() not in current.lower():
+                        target[key] = current + ACCUMULATE_SEPARATOR + value
+                elif not chosen_valid[section, key] and is_valid and is_valid(key, value):
+                    target[key] = value
+                    chosen_valid[section, key] = True
+    return merged
@@ -0,0 +1,202 @@
+# claim_merge.py
+"""
+Incremental merge of parsed emails into one record per claim.
+
+Every email about a claim (the assignment, corrections, "please add tarp
+removal", ...) is parsed on its own. merge_result() folds one parse into the
+claim's current record in O(fields), so the state of a claim never requires
+re-parsing its thread. Each merged field keeps its provenance: the result it
+came from, when it was received, its confidence and how often it changed.
+
+Merge rules per field:
+- Missing values ("N/A", empty) never overwrite anything.
+- Accumulating fields (notes, services) append new text that is not already present.
+- Other fields take the newer value unless it has lower confidence than the
+  current one (a value that failed validation does not replace a valid one).
+"""
+
+import re
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Confidence of a parsed value: validated values beat values the parser flagged
+CONFIDENCE_VALID = 1.0
+CONFIDENCE_FLAGGED = 0.5
+
+MISSING_VALUES = ('', 'N/A')
+_VALUE_MARKERS = re.compile(r'\s*\((Invalid Format|Loop Detected)\)$')
+
+# Fields whose values accumulate across emails instead of being replaced
+ACCUMULATING_FIELDS = frozenset({
+    'notes_comments', 'notes', 'describe_the_services_needed', 'services_needed',
+    'areas_of_property_to_inspect', 'attachments',
+})
+ACCUMULATE_SEPARATOR = '; '
+
+# Fields compared and stored in normalized form
+IDENTIFIER_FIELDS = frozenset({'claim_number', 'policy_number'})
+
+def field_key(key: str) -> str:
+    """
+    Normalizes a parsed field name ("Insured's Name*" -> 'insured_name').
+
+    Args:
+        key (str): Field name as produced by the parser.
+
+    Returns:
+        str: Lowercase, underscore-separated name without markers.
+    """
+    return re.sub(r'[^a-z0-9]+', '_', key.lower().replace("'s", '')).strip('_')
+
+# Normalized form labels whose field_validation registry name differs (see parser.field_validation)
+FIELD_ALIASES = {
+    'client_assigner_company': 'client_company',
+    'insured_phone_number_1': 'insured_phone',
+    'insured_phone_number_2': 'insured_phone',
+    'address_of_risk_location': 'risk_location',
+    'is_this_related_to_a_cat_event': 'cat_event_related',
+    'describe_the_services_needed': 'services_needed',
+    'type_of_expert_needed': 'expert_needed',
+    'type_of_damage': 'damage_type',
+    'areas_of_property_to_inspect': 'property_inspect',
+    'is_a_budget_required_before_proceeding': 'budget_required',
+    'number_of_buildings_units_if_commercial': 'number_of_buildings',
+    'call_required_before_inspection': 'call_before_inspection',
+    'call_required_after_inspection': 'call_after_inspection',
+    'repair_recommendations_needed': 'repair_recommendations',
+    'cost_estimate_required': 'cost_estimate',
+    'permission_for_third_party_tarp_removal': 'permission_tarp_removal',
+    'tile_matching_information_for_tile_roof': 'tile_matching',
+    'roof_diagram_needed': 'roof_diagram',
+}
+
+def registry_field(key: str) -> str:
+    """
+    Maps a parsed field name to its name in the field_validation registry.
+
+    ("Insured's Phone Number 1*" -> 'insured_phone', "Date of Loss*" -> 'date_of_loss').
+
+    Args:
+        key (str): Field name as produced by the parser.
+
+    Returns:
+        str: Registry name (the '<name>_pattern' key without its suffix).
+    """
+    name = field_key(key)
+    return FIELD_ALIASES.get(name, name)
+
+def normalize_identifier(value: Optional[str]) -> Optional[str]:
+    """
+    Normalizes a claim or policy number for lookups ('bx- 12345678' -> 'BX-12345678').
+
+    Args:
+        value (Optional[str]): Identifier as written in the email.
+
+    Returns:
+        Optional[str]: Uppercase identifier without whitespace.
+    """
+    if not value:
+        return None
+    return re.sub(r'\s+', '', value).upper() or None
+
+def assess_value(value: Any) -> Tuple[Optional[str], float]:
+    """
+    Strips parser markers from a value and rates it.
+
+    Args:
+        value (Any): Parsed value.
+
+    Returns:
+        Tuple[Optional[str], float]: Cleaned value (None if missing) and its confidence.
+    """
+    if not isinstance(value, str):
+        return None, 0.0
+    text = value.strip()
+    cleaned = _VALUE_MARKERS.sub('', text)
+    if cleaned in MISSING_VALUES:
+        return None, 0.0
+    return cleaned, CONFIDENCE_VALID if cleaned == text else CONFIDENCE_FLAGGED
+
+def iter_fields(result: Dict[str, Any]) -> Iterator[Tuple[str, str, str, float]]:
+    """
+    Iterates over the filled fields of a sectioned parse result.
+
+    Args:
+        result (Dict[str, Any]): Parsed data ({section: {field: value}}).
+
+    Yields:
+        Tuple[str, str, str, float]: Section, normalized field name, cleaned value, confidence.
+    """
+    for section, fields in result.items():
+        if not isinstance(fields, dict):
+            continue
+        for key, value in fields.items():
+            cleaned, confidence = assess_value(value)
+            if cleaned is not None:
+                yield section, field_key(key), cleaned, confidence
+
+def new_record(key: str) -> Dict[str, Any]:
+    """
+    Creates an empty claim record.
+
+    Args:
+        key (str): Record key.
+
+    Returns:
+        Dict[str, Any]: Record with no fields.
+    """
+    return {'key': key, 'fields': {}, 'sources': [], 'updated_at': None}
+
+def merge_result(record: Dict[str, Any], result: Dict[str, Any], result_id: str, received_at: float) -> int:
+    """
+    Folds one parse result into a claim record in place.
+
+    Args:
+        record (Dict[str, Any]): Current claim record (see new_record).
+        result (Dict[str, Any]): Parsed data of the new email.
+        result_id (str): Id of the parse result (provenance).
+        received_at (float): Time the result was received.
+
+    Returns:
+        int: Number of fields that changed.
+    """
+    fields = record['fields']
+    changed = 0
+    for section, name, value, confidence in iter_fields(result):
+        if name in IDENTIFIER_FIELDS:
+            value = normalize_identifier(value)
+        current = fields.get(name)
+        if current is None:
+            fields[name] = {'value': value, 'section': section, 'source': result_id,
+                            'received_at': received_at, 'confidence': confidence, 'revisions': 0}
+            changed += 1
+            continue
+        if current['value'] == value:
+            continue
+        if name in ACCUMULATING_FIELDS:
+            if value.lower() in current['value'].lower():
+                continue
+            value = current['value'] + ACCUMULATE_SEPARATOR + value
+            confidence = min(confidence, current['confidence'])
+        elif confidence < current['confidence']:
+            continue
+        current.update(value=value, section=section, source=result_id, received_at=received_at,
+                       confidence=confidence, revisions=current['revisions'] + 1)
+        changed += 1
+    record['sources'].append(result_id)
+    record['updated_at'] = received_at
+    return changed
+
+def to_sections(record: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+    """
+    Renders a claim record's current values in the parser's sectioned layout (for export).
+
+    Args:
+        record (Dict[str, Any]): Claim record.
+
+    Returns:
+        Dict[str, Dict[str, str]]: {section: {field: value}}.
+    """
+    sections: Dict[str, Dict[str, str]] = {}
+    for name, field in record['fields'].items():
+        sections.setdefault(field['section'], {})[name] = field['value']
+    return sections
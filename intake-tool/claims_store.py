@@ -0,0 +1,524 @@
+# claims_store.py
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from claim_merge import iter_fields, merge_result, new_record, normalize_identifier, to_sections
+
+logger = logging.getLogger("app")
+
+# Every lookup column is indexed together with the account and id, so an equality
+# filter is answered straight from the index in id order (newest first) and a page
+# is a bounded index range scan no matter how many rows the table holds.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS claims (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account TEXT,
+    result_id TEXT NOT NULL,
+    claim_number TEXT,
+    policy_number TEXT,
+    insured_name TEXT COLLATE NOCASE,
+    carrier TEXT COLLATE NOCASE,
+    date_of_loss TEXT,
+    created_at REAL NOT NULL,
+    data BLOB NOT NULL,
+    UNIQUE (account, result_id)
+);
+CREATE INDEX IF NOT EXISTS claims_account ON claims (account, id);
+CREATE INDEX IF NOT EXISTS claims_claim_number ON claims (account, claim_number, id);
+CREATE INDEX IF NOT EXISTS claims_policy_number ON claims (account, policy_number, id);
+CREATE INDEX IF NOT EXISTS claims_insured_name ON claims (account, insured_name, id);
+CREATE INDEX IF NOT EXISTS claims_carrier ON claims (account, carrier, id);
+CREATE INDEX IF NOT EXISTS claims_date_of_loss ON claims (account, date_of_loss, id);
+CREATE VIRTUAL TABLE IF NOT EXISTS claims_fts USING fts5(notes, services, content='', tokenize='porter unicode61');
+CREATE TABLE IF NOT EXISTS claim_records (
+    account TEXT NOT NULL,
+    key TEXT NOT NULL,
+    claim_number TEXT,
+    policy_number TEXT,
+    data BLOB NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (account, key)
+);
+CREATE TABLE IF NOT EXISTS claim_aliases (
+    account TEXT NOT NULL,
+    alias TEXT NOT NULL,
+    record_key TEXT NOT NULL,
+    PRIMARY KEY (account, alias)
+);
+"""
+
+# Claims deleted per transaction by prune()
+PRUNE_BATCH = 500
+
+# Indexes of the claims table before rows were scoped to an account
+_UNSCOPED_INDEXES = ('claims_claim_number', 'claims_policy_number', 'claims_insured_name',
+                     'claims_carrier', 'claims_date_of_loss')
+
+_ORDINAL_SUFFIX = re.compile(r'(\d)(st|nd|rd|th)\b')
+_DATE_FORMATS = ('%B %d, %Y', '%Y-%m-%d', '%m/%d/%Y')
+
+# Indexed column -> normalized field names it is read from (first match wins)
+INDEXED_FIELDS = {
+    'claim_number': ('claim_number',),
+    'policy_number': ('policy_number',),
+    'insured_name': ('insured_name',),
+    'carrier': ('insurance_carrier', 'carrier'),
+    'date_of_loss': ('date_of_loss',),
+}
+# Full-text column -> normalized field names concatenated into it
+TEXT_FIELDS = {
+    'notes': ('notes_comments', 'notes'),
+    'services': ('describe_the_services_needed', 'services_needed', 'type_of_expert_needed',
+                 'type_of_damage', 'areas_of_property_to_inspect'),
+}
+
+def normalize_date(value: Optional[str]) -> Optional[str]:
+    """
+    Converts a parsed date ("March 3rd, 2024") to ISO format so ranges sort correctly.
+
+    Args:
+        value (Optional[str]): Date as written in the email.
+
+    Returns:
+        Optional[str]: ISO date, or the value unchanged if it cannot be read.
+    """
+    if not value:
+        return None
+    text = _ORDINAL_SUFFIX.sub(r'\1', value)
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return value
+
+def flatten_fields(result: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Flattens a sectioned parse result into normalized field names and cleaned values.
+
+    Args:
+        result (Dict[str, Any]): Parsed data ({section: {field: value}}).
+
+    Returns:
+        Dict[str, str]: Filled fields only.
+    """
+    flat = {}
+    for _, name, value, _ in iter_fields(result):
+        flat.setdefault(name, value)
+    return flat
+
+def _fts_texts(flat: Dict[str, str]) -> List[str]:
+    """
+    Builds the full-text columns (notes, services) of a flattened result.
+
+    The full-text table is contentless, so deleting a row needs these exact values again.
+    """
+    return [' '.join(flat[name] for name in names if name in flat) for names in TEXT_FIELDS.values()]
+
+def _first(flat: Dict[str, str], names: Tuple[str, ...]) -> Optional[str]:
+    for name in names:
+        if name in flat:
+            return flat[name]
+    return None
+
+def fts_query(text: str) -> str:
+    """
+    Builds an FTS5 query matching all words of free text, each quoted so user input is never parsed as syntax.
+
+    Args:
+        text (str): Search text.
+
+    Returns:
+        str: FTS5 MATCH expression.
+    """
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """
+    Upgrades a claims database created before rows were scoped to an account.
+
+    The claims table's unique constraint and indexes change, so it is copied rather
+    than altered. Ids are kept, so full-text rows still point at their claims. Copied
+    rows have no account and are never returned by searches; prune() removes them
+    with the retention period. Claim records are derived from the claims and cannot
+    be attributed to an account, so they are dropped.
+
+    Args:
+        conn (sqlite3.Connection): Open claims database.
+    """
+    record_columns = {row[1] for row in conn.execute("PRAGMA table_info(claim_records)")}
+    if record_columns and 'account' not in record_columns:
+        logger.warning("Dropping claim records stored before records were scoped to an account")
+        conn.execute("DROP TABLE claim_records")
+        conn.execute("DROP TABLE IF EXISTS claim_aliases")
+
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(claims)")}
+    if not columns or 'account' in columns:
+        return
+    logger.warning("Migrating the claims table to per-account rows; existing claims are no longer searchable")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("ALTER TABLE claims RENAME TO claims_unscoped")
+        for index in _UNSCOPED_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {index}")
+        for statement in SCHEMA.split(';'):
+            if statement.strip():
+                conn.execute(statement)
+        conn.execute(
+            "INSERT INTO claims (id, result_id, claim_number, policy_number, insured_name, carrier, "
+            "date_of_loss, created_at, data) SELECT id, result_id, claim_number, policy_number, "
+            "insured_name, carrier, date_of_loss, created_at, data FROM claims_unscoped"
+        )
+        conn.execute("DROP TABLE claims_unscoped")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+class ClaimStore:
+    """
+    Searchable store of parsed claims backed by SQLite in WAL mode.
+
+    Each parse result is one row with indexed claim number, policy number,
+    insured name, carrier and date of loss columns; notes and services are
+    full-text indexed with FTS5. Pages use keyset pagination (id cursor), so
+    deep pages cost the same as the first. Rows belong to the account (hashed
+    API key) that stored them, and every lookup is scoped to one account.
+    """
+
+    def __init__(self, db_path: str = 'data/claims.db') -> None:
+        """
+        Opens (and creates if needed) the claims database.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        _migrate(self._conn)
+        self._conn.executescript(SCHEMA)
+        logger.debug(f"Claims store opened at {db_path}")
+
+    def add_many(self, results: Iterable[Dict[str, Any]], account: Optional[str]) -> int:
+        """
+        Indexes parse results in one transaction. Results the account already stored are skipped.
+
+        Args:
+            results (Iterable[Dict[str, Any]]): Parsed data objects.
+            account (Optional[str]): Account (hashed API key) the results belong to.
+
+        Returns:
+            int: Number of new rows.
+        """
+        rows = []
+        for result in results:
+            data = orjson.dumps(result, option=orjson.OPT_SORT_KEYS)
+            flat = flatten_fields(result)
+            texts = _fts_texts(flat)
+            rows.append((
+                result,
+                hashlib.sha256(data).hexdigest(),
+                normalize_identifier(_first(flat, INDEXED_FIELDS['claim_number'])),
+                normalize_identifier(_first(flat, INDEXED_FIELDS['policy_number'])),
+                _first(flat, INDEXED_FIELDS['insured_name']),
+                _first(flat, INDEXED_FIELDS['carrier']),
+                normalize_date(_first(flat, INDEXED_FIELDS['date_of_loss'])),
+                data,
+                texts
+            ))
+        if not rows:
+            return 0
+
+        added = 0
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for result, *columns, data, texts in rows:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO claims (account, result_id, claim_number, policy_number, "
+                        "insured_name, carrier, date_of_loss, created_at, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (account, *columns, now, data)
+                    )
+                    if cursor.rowcount:
+                        self._conn.execute(
+                            "INSERT INTO claims_fts (rowid, notes, services) VALUES (?, ?, ?)",
+                            (cursor.lastrowid, *texts)
+                        )
+                        if account is not None:
+                            self._merge(account, result, columns[0], columns[1], columns[2], now)
+                        added += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def _resolve_record(self, account: str, claim_number: Optional[str],
+                        policy_number: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Finds the claim record an email belongs to, or starts a new one.
+
+        The claim number decides. A policy number alone (which may cover several
+        claims) resolves to the policy's latest record; a record started from a
+        policy number is adopted by the first email that names its claim number.
+        Records never span accounts, even for the same claim number.
+
+        Args:
+            account (str): Account the email belongs to.
+            claim_number (Optional[str]): Normalized claim number.
+            policy_number (Optional[str]): Normalized policy number.
+
+        Returns:
+            Optional[Dict[str, Any]]: Record, or None if the email names neither.
+        """
+        record_key = self._alias(account, f"claim:{claim_number}") if claim_number else None
+        if record_key is not None:
+            row = self._conn.execute(
+                "SELECT data FROM claim_records WHERE account = ? AND key = ?", (account, record_key)
+            ).fetchone()
+            if row:
+                return orjson.loads(row[0])
+        elif policy_number:
+            record_key = self._alias(account, f"policy:{policy_number}")
+            if record_key is not None:
+                row = self._conn.execute(
+                    "SELECT claim_number, data FROM claim_records WHERE account = ? AND key = ?", (account, record_key)
+                ).fetchone()
+                if row and (not claim_number or row[0] is None):
+                    return orjson.loads(row[1])
+        if claim_number:
+            return new_record(f"claim:{claim_number}")
+        if policy_number:
+            return new_record(f"policy:{policy_number}")
+        return None
+
+    def _alias(self, account: str, alias: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT record_key FROM claim_aliases WHERE account = ? AND alias = ?", (account, alias)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _merge(self, account: str, result: Dict[str, Any], result_id: str, claim_number: Optional[str],
+               policy_number: Optional[str], received_at: float) -> None:
+        """
+        Folds a newly stored result into its claim record (inside the caller's transaction).
+
+        Args:
+            account (str): Account the result belongs to.
+            result (Dict[str, Any]): Parsed data.
+            result_id (str): Result id.
+            claim_number (Optional[str]): Normalized claim number.
+            policy_number (Optional[str]): Normalized policy number.
+            received_at (float): Time the result was stored.
+        """
+        record = self._resolve_record(account, claim_number, policy_number)
+        if record is None:
+            return
+        merge_result(record, result, result_id, received_at)
+        record['claim_number'] = claim_number or record.get('claim_number')
+        record['policy_number'] = policy_number or record.get('policy_number')
+        self._conn.execute(
+            "INSERT INTO claim_records (account, key, claim_number, policy_number, data, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(account, key) DO UPDATE SET claim_number = excluded.claim_number, "
+            "policy_number = excluded.policy_number, data = excluded.data, updated_at = excluded.updated_at",
+            (account, record['key'], record['claim_number'], record['policy_number'], orjson.dumps(record), received_at)
+        )
+        for alias in (f"claim:{record['claim_number']}" if record['claim_number'] else None,
+                      f"policy:{record['policy_number']}" if record['policy_number'] else None):
+            if alias:
+                self._conn.execute(
+                    "INSERT INTO claim_aliases (account, alias, record_key) VALUES (?, ?, ?) "
+                    "ON CONFLICT(account, alias) DO UPDATE SET record_key = excluded.record_key",
+                    (account, alias, record['key'])
+                )
+
+    def get_record(self, identifier: str, account: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the merged record of one of an account's claims.
+
+        Args:
+            identifier (str): Claim number, or a policy number (resolves to the policy's latest claim).
+            account (str): Account (hashed API key) whose records are searched.
+
+        Returns:
+            Optional[Dict[str, Any]]: Record with per-field provenance and the merged
+            values in sectioned form under 'result', or None if unknown.
+        """
+        normalized = normalize_identifier(identifier)
+        if not normalized:
+            return None
+        with self._lock:
+            record_key = self._alias(account, f"claim:{normalized}") or self._alias(account, f"policy:{normalized}")
+            row = None
+            if record_key is not None:
+                row = self._conn.execute(
+                    "SELECT data FROM claim_records WHERE account = ? AND key = ?", (account, record_key)
+                ).fetchone()
+        if not row:
+            return None
+        record = orjson.loads(row[0])
+        record['result'] = to_sections(record)
+        return record
+
+    def add(self, result: Dict[str, Any], account: Optional[str]) -> int:
+        """
+        Indexes one parse result.
+
+        Args:
+            result (Dict[str, Any]): Parsed data.
+            account (Optional[str]): Account (hashed API key) the result belongs to.
+
+        Returns:
+            int: 1 if the result was new, else 0.
+        """
+        return self.add_many([result], account)
+
+    def query(self, account: str, claim_number: Optional[str] = None, policy_number: Optional[str] = None,
+              insured_name: Optional[str] = None, carrier: Optional[str] = None,
+              loss_from: Optional[str] = None, loss_to: Optional[str] = None, text: Optional[str] = None,
+              limit: int = 50, cursor: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Returns one page of an account's claims matching all given filters, newest first.
+
+        Args:
+            account (str): Account (hashed API key) whose claims are searched.
+            claim_number (Optional[str]): Exact claim number (normalized before lookup).
+            policy_number (Optional[str]): Exact policy number (normalized before lookup).
+            insured_name (Optional[str]): Insured name, case-insensitive; a trailing '*' matches a prefix.
+            carrier (Optional[str]): Insurance carrier, case-insensitive.
+            loss_from (Optional[str]): Earliest date of loss (ISO, inclusive).
+            loss_to (Optional[str]): Latest date of loss (ISO, inclusive).
+            text (Optional[str]): Words that must all appear in notes or services.
+            limit (int): Page size.
+            cursor (Optional[int]): next_cursor from the previous page.
+
+        Returns:
+            Dict[str, Any]: {'items': [...], 'next_cursor': int or None}.
+        """
+        clauses, params = ["claims.account = ?"], [account]
+        if claim_number:
+            clauses.append("claim_number = ?")
+            params.append(normalize_identifier(claim_number))
+        if policy_number:
+            clauses.append("policy_number = ?")
+            params.append(normalize_identifier(policy_number))
+        if insured_name:
+            if insured_name.endswith('*'):
+                # Upper bound instead of LIKE, so the NOCASE index serves the prefix scan
+                prefix = insured_name[:-1]
+                clauses.append("insured_name >= ? AND insured_name < ?")
+                params.extend((prefix, prefix + '\uffff'))
+            else:
+                clauses.append("insured_name = ?")
+                params.append(insured_name)
+        if carrier:
+            clauses.append("carrier = ?")
+            params.append(carrier)
+        if loss_from:
+            clauses.append("date_of_loss >= ?")
+            params.append(loss_from)
+        if loss_to:
+            clauses.append("date_of_loss <= ?")
+            params.append(loss_to)
+        sql = ("SELECT claims.id, result_id, claim_number, policy_number, insured_name, carrier, date_of_loss, "
+               "created_at, data FROM claims")
+        order_column = "claims.id"
+        if text and text.split():
+            # Walk the full-text matches newest first and stop at the page size
+            sql = sql.replace("FROM claims", "FROM claims_fts JOIN claims ON claims.id = claims_fts.rowid")
+            order_column = "claims_fts.rowid"
+            clauses.append("claims_fts MATCH ?")
+            params.append(fts_query(text))
+        if cursor is not None:
+            clauses.append(f"{order_column} < ?")
+            params.append(cursor)
+
+        sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order_column} DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        items = [{
+            'id': row[0],
+            'result_id': row[1],
+            'claim_number': row[2],
+            'policy_number': row[3],
+            'insured_name': row[4],
+            'carrier': row[5],
+            'date_of_loss': row[6],
+            'created_at': row[7],
+            'result': orjson.loads(row[8])
+        } for row in rows[:limit]]
+        return {'items': items, 'next_cursor': items[-1]['id'] if len(rows) > limit else None}
+
+    def prune(self, retention_days: float) -> int:
+        """
+        Deletes claims, and claim records not updated, within the retention period.
+
+        Claims copy parse results (insured PII), so they follow the results store's
+        retention. Their full-text rows are deleted with them, in batches so searches
+        are not blocked for long.
+
+        Args:
+            retention_days (float): Age after which claims and records are removed.
+
+        Returns:
+            int: Number of claims deleted.
+        """
+        cutoff = time.time() - retention_days * 86400
+        deleted = 0
+        while True:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    rows = self._conn.execute(
+                        "SELECT id, data FROM claims WHERE created_at < ? LIMIT ?", (cutoff, PRUNE_BATCH)
+                    ).fetchall()
+                    for claim_id, data in rows:
+                        self._conn.execute(
+                            "INSERT INTO claims_fts (claims_fts, rowid, notes, services) VALUES ('delete', ?, ?, ?)",
+                            (claim_id, *_fts_texts(flatten_fields(orjson.loads(data))))
+                        )
+                    self._conn.executemany("DELETE FROM claims WHERE id = ?", ((row[0],) for row in rows))
+                    if len(rows) < PRUNE_BATCH:
+                        records = self._conn.execute(
+                            "DELETE FROM claim_records WHERE updated_at < ?", (cutoff,)
+                        ).rowcount
+                        self._conn.execute(
+                            "DELETE FROM claim_aliases WHERE NOT EXISTS (SELECT 1 FROM claim_records WHERE "
+                            "claim_records.account = claim_aliases.account AND claim_records.key = claim_aliases.record_key)"
+                        )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            deleted += len(rows)
+            if len(rows) < PRUNE_BATCH:
+                break
+        if deleted or records:
+            logger.info(f"Pruned {deleted} claims and {records} claim records older than {retention_days} days")
+        return deleted
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,240 @@
+# columnar_exporter.py
+"""
+Columnar export of parsed results for analytics.
+
+Writes one row per email and one typed column per registered field (the keys
+of parser.field_validation) into Parquet or Arrow IPC files. Parsed field names
+(the form labels, e.g. "insured's_phone_number_1*") are mapped to registry names
+with claim_merge.registry_field(). Rows are
+converted and written in fixed-size record batches, so memory stays bounded
+no matter how many results are exported. Arrow IPC files can be memory-mapped
+by readers (pyarrow.memory_map + pyarrow.ipc.open_file).
+
+Usage:
+    python columnar_exporter.py results.jsonl -o results.parquet
+    python columnar_exporter.py results.jsonl -o results.arrow --format arrow
+"""
+
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from claim_merge import registry_field
+
+logger = logging.getLogger("exporter")
+
+FORMATS = ('parquet', 'arrow')
+
+# Values the parser uses for fields it could not fill
+MISSING_VALUES = ('', 'N/A')
+
+_ORDINAL_SUFFIX = re.compile(r'(\d)(st|nd|rd|th)\b')
+
+def _to_int(value: str) -> Optional[int]:
+    return int(value) if value.isdigit() else None
+
+def _to_bool(value: str) -> Optional[bool]:
+    return {'yes': True, 'no': False}.get(value.lower())
+
+def _to_date(value: str) -> Optional[date]:
+    try:
+        return datetime.strptime(_ORDINAL_SUFFIX.sub(r'\1', value), '%B %d, %Y').date()
+    except ValueError:
+        return None
+
+def _to_str(value: str) -> Optional[str]:
+    return value
+
+def field_type(name: str, pattern: str) -> Tuple[pa.DataType, Callable[[str], Any]]:
+    """
+    Infers a column type and converter for a registered field from its validation pattern.
+
+    Args:
+        name (str): Field name.
+        pattern (str): Validation regex for the field.
+
+    Returns:
+        Tuple[pa.DataType, Callable[[str], Any]]: Arrow type and value converter.
+    """
+    if pattern == r'^\d+$':
+        return pa.int64(), _to_int
+    if pattern == '^(Yes|No)$':
+        return pa.bool_(), _to_bool
+    if name.startswith('date_') or name.endswith('_date'):
+        return pa.date32(), _to_date
+    return pa.string(), _to_str
+
+class ColumnarExporter:
+    """
+    Converts parsed results into typed record batches and writes them to Parquet or Arrow IPC.
+    """
+
+    def __init__(self, field_validation: Dict[str, str], batch_size: int = 10000) -> None:
+        """
+        Args:
+            field_validation (Dict[str, str]): Field registry ('<field>_pattern' -> regex).
+            batch_size (int): Rows per record batch (and Parquet row group).
+        """
+        self.batch_size = batch_size
+        self.fields: List[Tuple[str, pa.DataType, Callable[[str], Any]]] = []
+        for key, pattern in field_validation.items():
+            name = key[:-len('_pattern')] if key.endswith('_pattern') else key
+            self.fields.append((name, *field_type(name, pattern)))
+        self.schema = pa.schema(
+            [pa.field('id', pa.string()), pa.field('error', pa.string())]
+            + [pa.field(name, arrow_type) for name, arrow_type, _ in self.fields]
+            # Fields the AI returned that are not in the registry, as a JSON object
+            + [pa.field('extra_fields', pa.string())]
+        )
+
+    def _flatten(self, result: Dict[str, Any], registered: set) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Splits a parsed result into values by registry column and unregistered fields.
+
+        When two parsed fields map to the same column (e.g. the insured's first and second
+        phone number), the first fills the column and the others stay in the extra fields.
+        """
+        flat, extra = {}, {}
+        for fields in result.values():
+            if not isinstance(fields, dict):
+                continue
+            for key, value in fields.items():
+                name = registry_field(key)
+                if name in registered and name not in flat:
+                    flat[name] = value
+                else:
+                    extra[key] = value
+        return flat, extra
+
+    def iter_batches(self, results: Iterable[Dict[str, Any]]) -> Iterator[pa.RecordBatch]:
+        """
+        Converts result entries into record batches of at most batch_size rows.
+
+        Args:
+            results (Iterable[Dict[str, Any]]): Entries with an 'index' or 'id' and a 'result' or 'error'.
+
+        Yields:
+            pa.RecordBatch: Typed batch matching self.schema.
+        """
+        registered = {name for name, _, _ in self.fields}
+        columns: Dict[str, List[Any]] = {name: [] for name in self.schema.names}
+        rows = 0
+        for entry in results:
+            columns['id'].append(str(entry.get('id', entry.get('index'))))
+            result = entry.get('result')
+            if not isinstance(result, dict):
+                columns['error'].append(str(entry.get('error', result)))
+                result = {}
+            else:
+                columns['error'].append(None)
+            flat, extra = self._flatten(result, registered)
+            for name, _, convert in self.fields:
+                value = flat.get(name)
+                if value is None or not isinstance(value, str) or value in MISSING_VALUES:
+                    columns[name].append(None)
+                else:
+                    columns[name].append(convert(value))
+            columns['extra_fields'].append(json.dumps(extra) if extra else None)
+            rows += 1
+            if rows == self.batch_size:
+                yield self._batch(columns)
+                columns = {name: [] for name in self.schema.names}
+                rows = 0
+        if rows:
+            yield self._batch(columns)
+
+    def _batch(self, columns: Dict[str, List[Any]]) -> pa.RecordBatch:
+        arrays = [pa.array(columns[field.name], type=field.type) for field in self.schema]
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def write(self, results: Iterable[Dict[str, Any]], sink: Any, file_format: str = 'parquet',
+              compression: Optional[str] = None) -> int:
+        """
+        Writes results to a Parquet or Arrow IPC file.
+
+        Args:
+            results (Iterable[Dict[str, Any]]): Result entries.
+            sink (Any): Output path or writable binary file object.
+            file_format (str): 'parquet' or 'arrow'.
+            compression (Optional[str]): Codec ('zstd', 'lz4' or 'none'). Defaults to zstd for
+                Parquet and none for Arrow, so Arrow files can be memory-mapped without decoding.
+
+        Returns:
+            int: Number of rows written.
+        """
+        if file_format not in FORMATS:
+            raise ValueError(f"Unsupported columnar format: {file_format}")
+        if compression is None:
+            compression = 'zstd' if file_format == 'parquet' else 'none'
+        codec = None if compression == 'none' else compression
+        rows = 0
+        if file_format == 'parquet':
+            writer = pq.ParquetWriter(sink, self.schema, compression=codec)
+        else:
+            writer = pa.ipc.new_file(sink, self.schema, options=pa.ipc.IpcWriteOptions(compression=codec))
+        with writer:
+            for batch in self.iter_batches(results):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        return rows
+
+def iter_jsonl_results(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Reads result records ({'id', 'result'} or {'id', 'error'}) from a JSONL file, such as ingest.py output.
+
+    Args:
+        path (str): JSONL file path.
+
+    Yields:
+        Dict[str, Any]: Result entries.
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping invalid JSON on line {line_number} of {path}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point.
+
+    Args:
+        argv (Optional[List[str]]): Arguments (defaults to sys.argv).
+
+    Returns:
+        int: Exit code.
+    """
+    from config_loader import ConfigLoader
+
+    arg_parser = argparse.ArgumentParser(description="Convert parsed results (JSONL) to Parquet or Arrow IPC.")
+    arg_parser.add_argument('input', help="JSONL results, e.g. ingest.py output")
+    arg_parser.add_argument('-o', '--output', required=True, help="Output file")
+    arg_parser.add_argument('--format', choices=FORMATS, default='parquet', help="Output format")
+    arg_parser.add_argument('--compression', default=None, choices=('zstd', 'lz4', 'none'),
+                            help="Codec (default: zstd for Parquet, none for Arrow)")
+    arg_parser.add_argument('--batch-size', type=int, default=10000, help="Rows per record batch")
+    arg_parser.add_argument('--config', default='config.yaml', help="Configuration file (field registry)")
+    args = arg_parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    config = ConfigLoader.read_config(args.config)
+    exporter = ColumnarExporter(config['parser']['field_validation'], args.batch_size)
+    start = time.monotonic()
+    rows = exporter.write(iter_jsonl_results(args.input), args.output, args.format, args.compression)
+    logger.info(f"Wrote {rows} rows to {args.output} in {time.monotonic() - start:.2f}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+# compression.py
+
+import zlib
+import logging
+from typing import Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger("app")
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; fall back to gzip only
+    brotli = None
+
+# Media types that are already compressed and not worth recompressing
+UNCOMPRESSIBLE_PREFIXES = ('image/', 'video/', 'audio/', 'application/pdf', 'application/zip',
+                           'application/gzip', 'application/octet-stream', 'application/vnd.apache.parquet')
+
+class _Encoder:
+    """
+    Incremental response encoder that flushes after every chunk.
+
+    Flushing per chunk keeps streamed responses (NDJSON results) flowing to the
+    client as they are produced instead of waiting for the compressor buffer to fill.
+    """
+
+    def __init__(self, encoding: str, level: int) -> None:
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=min(level, 11))
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+class CompressionMiddleware:
+    """
+    ASGI middleware for gzip/brotli response compression and gzip request decompression.
+
+    Responses are compressed with brotli when the client accepts it (and the brotli
+    package is installed), otherwise gzip. Request bodies sent with
+    'Content-Encoding: gzip' are decompressed incrementally, and the decompressed
+    size is capped to guard against compression bombs.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, level: int = 6,
+                 max_decompressed_bytes: int = 10 * 1024 * 1024) -> None:
+        """
+        Args:
+            app: The wrapped ASGI application.
+            minimum_size (int): Responses smaller than this are sent uncompressed.
+            level (int): Compression level.
+            max_decompressed_bytes (int): Cap on decompressed request body size.
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.max_decompressed_bytes = max_decompressed_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope['headers']}
+        if headers.get('content-encoding', '').strip().lower() == 'gzip':
+            receive = self._decompressing_receive(receive)
+            scope = dict(scope)
+            scope['headers'] = [(key, value) for key, value in scope['headers']
+                                if key.lower() not in (b'content-encoding', b'content-length')]
+
+        encoding = self._select_encoding(headers.get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, self._compressing_send(send, encoding))
+
+    def _select_encoding(self, accept_encoding: str) -> Optional[str]:
+        """
+        Picks the response encoding from the Accept-Encoding header.
+
+        Args:
+            accept_encoding (str): Accept-Encoding header value.
+
+        Returns:
+            Optional[str]: 'br', 'gzip' or None.
+        """
+        accepted = {item.split(';')[0].strip().lower() for item in accept_encoding.split(',')}
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    def _decompressing_receive(self, receive):
+        """
+        Wraps an ASGI receive callable to gunzip the request body on the fly.
+        """
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        total = 0
+
+        async def wrapped():
+            nonlocal total
+            message = await receive()
+            if message['type'] != 'http.request':
+                return message
+            try:
+                body = decompressor.decompress(message.get('body', b''), self.max_decompressed_bytes - total + 1)
+                if not message.get('more_body', False):
+                    body += decompressor.flush()
+            except zlib.error:
+                raise HTTPException(status_code=400, detail="Invalid gzip request body")
+            total += len(body)
+            if total > self.max_decompressed_bytes or decompressor.unconsumed_tail:
+                raise HTTPException(status_code=413, detail="Request body too large")
+            return {**message, 'body': body}
+
+        return wrapped
+
+    def _compressing_send(self, send, encoding: str):
+        """
+        Wraps an ASGI send callable to compress eligible responses.
+        """
+        state = {'start': None, 'encoder': None, 'passthrough': False}
+
+        async def wrapped(message):
+            if message['type'] == 'http.response.start':
+                state['start'] = message
+                return
+            if message['type'] != 'http.response.body' or state['passthrough']:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+            if state['encoder'] is None:
+                start = state['start']
+                headers = {key.lower(): value for key, value in start['headers']}
+                content_type = headers.get(b'content-type', b'').decode('latin-1')
+                if (b'content-encoding' in headers
+                        or content_type.startswith(UNCOMPRESSIBLE_PREFIXES)
+                        or (not more_body and len(body) < self.minimum_size)):
+                    state['passthrough'] = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                state['encoder'] = _Encoder(encoding, self.level)
+                new_headers = [(key, value) for key, value in start['headers'] if key.lower() != b'content-length']
+                new_headers.append((b'content-encoding', encoding.encode('latin-1')))
+                vary = headers.get(b'vary')
+                if vary is None:
+                    new_headers.append((b'vary', b'Accept-Encoding'))
+                elif b'accept-encoding' not in vary.lower():
+                    new_headers = [(key, value + b', Accept-Encoding' if key.lower() == b'vary' else value)
+                                   for key, value in new_headers]
+                await send({**start, 'headers': new_headers})
+
+            data = state['encoder'].compress(body) if body else b''
+            if not more_body:
+                data += state['encoder'].finish()
+            await send({'type': 'http.response.body', 'body': data, 'more_body': more_body})
+
+        return wrapped
@@ -2,10 +2,16 @@
 
 import os
 import json
+import time
 import yaml
+import hashlib
 import logging
 import sys
-from threading import Lock
+from threading import Lock, Timer
+from types import MappingProxyType
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Optional
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from cerberus import Validator
@@ -21,6 +27,15 @@ handler = logging.StreamHandler(sys.stdout)
 handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s: %(message)s'))
 logger.addHandler(handler)
 
+# Thread prompt used when parser.thread_prompt_template is not configured
+DEFAULT_THREAD_PROMPT_TEMPLATE = (
+    "[INST] You are a precise email parsing assistant. A claim's intake form has already been filled in "
+    "from earlier messages in an email thread. Report only the fields the new message adds or changes, "
+    "under the same section headings and field labels, formatted as \"- Field Label: value\". "
+    "Do not repeat unchanged fields. If nothing changed, output NONE.\n\n"
+    "Current fields:\n{{current_fields}}\n\nNew message:\n{{email_content}} [/INST]"
+)
+
 # Configuration Schema using Cerberus
 CONFIG_SCHEMA = {
     'ai': {
@@ -106,6 +121,93 @@ CONFIG_SCHEMA = {
             'enable_cloud_storage': {'type': 'boolean', 'required': True}
         }
     },
+    'secret_cache': {
+        'type': 'dict',
+        'required': False,
+        'schema': {
+            'default_ttl': {'type': 'number', 'min': 1, 'required': False, 'default': 300},
+            'refresh_margin': {'type': 'number', 'min': 0, 'max': 0.9, 'required': False, 'default': 0.2},
+            'ttls': {'type': 'dict', 'required': False, 'keysrules': {'type': 'string'}, 'valuesrules': {'type': 'number', 'min': 1}}
+        }
+    },
+    'retry': {
+        'type': 'dict',
+        'required': False,
+        'schema': {
+            'max_attempts': {'type': 'integer', 'min': 1, 'required': False, 'default': 3},
+            'base_delay': {'type': 'number', 'min': 0, 'required': False, 'default': 0.5},
+            'max_delay': {'type': 'number', 'min': 0, 'required': False, 'default': 10},
+            'budget_ratio': {'type': 'number', 'min': 0, 'required': False, 'default': 0.1},
+            'min_retries_per_second': {'type': 'number', 'min': 0, 'required': False, 'default': 1},
+            'budget_window': {'type': 'number', 'min': 1, 'required': False, 'default': 10}
+        }
+    },
+    'jobs': {
+        'type': 'dict',
+        'required': False,
+        'schema': {
+            'db_path': {'type': 'string', 'required': False, 'default': 'data/jobs.db'},
+            'workers': {'type': 'integer', 'min': 1, 'required': False, 'default': 2},
+            'poll_interval': {'type': 'number', 'min': 0.1, 'required': False, 'default': 2},
+            'lease_seconds': {'type': 'number', 'min': 5, 'required': False, 'default': 60},
+            'max_emails': {'type': 'integer', 'min': 1, 'required': False, 'default': 10000}
+        }
+    },
+    'results': {
+        'type': 'dict',
+        'required': False,
+        'schema': {
+            'db_path': {'type': 'string', 'required': False, 'default': 'data/results.db'},
+            'retention_days': {'type': 'number', 'min': 0, 'required': False, 'default': 30}
+        }
+    },
+    'claims': {
+        'type': 'dict',
+        'required': False,
+        'schema': {
+            'db_path': {'type': 'string', 'required': False, 'default': 'data/claims.db'}
+        }
+    },
+    'tracing': {
+        'type': 'dict',
+        'required': False,
+        'default': {},
+        'schema': {
+            'enabled': {'type': 'boolean', 'required': False, 'default': False},
+            'service_name': {'type': 'string', 'required': False, 'default': 'intake-tool'},
+            'sample_ratio': {'type': 'number', 'min': 0, 'max': 1, 'required': False, 'default': 1.0},
+            'queue_size': {'type': 'integer', 'min': 1, 'required': False, 'default': 10000},
+            'batch_size': {'type': 'integer', 'min': 1, 'required': False, 'default': 256},
+            'flush_interval': {'type': 'number', 'min': 0.1, 'required': False, 'default': 2.0},
+            'exporters': {
+                'type': 'dict',
+                'required': False,
+                'default': {},
+                'schema': {
+                    'jsonl': {
+                        'type': 'dict',
+                        'required': False,
+                        'default': {},
+                        'schema': {
+                            'enabled': {'type': 'boolean', 'required': False, 'default': True},
+                            'path': {'type': 'string', 'required': False, 'default': 'logs/traces.jsonl'}
+                        }
+                    },
+                    'otlp': {
+                        'type': 'dict',
+                        'required': False,
+                        'default': {},
+                        'schema': {
+                            'enabled': {'type': 'boolean', 'required': False, 'default': False},
+                            'endpoint': {'type': 'string', 'required': False, 'default': 'http://localhost:4318/v1/traces'},
+                            'headers': {'type': 'dict', 'required': False, 'default': {}},
+                            'timeout': {'type': 'number', 'min': 0.1, 'required': False, 'default': 5.0}
+                        }
+                    }
+                }
+            }
+        }
+    },
     'app': {
         'type': 'dict',
         'required': True,
@@ -130,12 +232,75 @@ CONFIG_SCHEMA = {
                     }
                 }
             },
+            'max_request_bytes': {'type': 'integer', 'min': 1, 'required': False, 'default': 10485760},
+            'max_batch_request_bytes': {'type': 'integer', 'min': 1, 'required': False, 'default': 104857600},
+            'compression': {
+                'type': 'dict',
+                'required': False,
+                'schema': {
+                    'minimum_size': {'type': 'integer', 'min': 0, 'required': False, 'default': 1024},
+                    'level': {'type': 'integer', 'min': 1, 'max': 11, 'required': False, 'default': 6}
+                }
+            },
+            'request_timeout': {
+                'type': 'dict',
+                'required': False,
+                'default': {},
+                'schema': {
+                    'default': {'type': 'number', 'min': 1, 'required': False, 'default': 60},
+                    'max': {'type': 'number', 'min': 1, 'required': False, 'default': 300}
+                }
+            },
+            'token_rate_limit': {
+                'type': 'dict',
+                'required': False,
+                'default': {},
+                'schema': {
+                    'enabled': {'type': 'boolean', 'required': False, 'default': True},
+                    'db_path': {'type': 'string', 'required': False, 'default': 'data/rate_limits.db'},
+                    'capacity': {'type': 'integer', 'min': 1, 'required': False, 'default': 60000},
+                    'refill_per_minute': {'type': 'integer', 'min': 1, 'required': False, 'default': 30000}
+                }
+            },
+            'token_budget': {
+                'type': 'dict',
+                'required': False,
+                'default': {},
+                'schema': {
+                    'enabled': {'type': 'boolean', 'required': False, 'default': True},
+                    'db_path': {'type': 'string', 'required': False, 'default': 'data/token_usage.db'},
+                    'account_hourly': {'type': 'integer', 'min': 0, 'required': False, 'default': 0},
+                    'global_hourly': {'type': 'integer', 'min': 0, 'required': False, 'default': 0},
+                    'retention_hours': {'type': 'integer', 'min': 1, 'required': False, 'default': 720}
+                }
+            },
+            'profiling': {
+                'type': 'dict',
+                'required': False,
+                'default': {},
+                'schema': {
+                    'enabled': {'type': 'boolean', 'required': False, 'default': False},
+                    'max_seconds': {'type': 'integer', 'min': 1, 'required': False, 'default': 120},
+                    'admin_key_hashes': {'type': 'list', 'schema': {'type': 'string'}, 'required': False, 'default': []}
+                }
+            },
+            'export': {
+                'type': 'dict',
+                'required': False,
+                'default': {},
+                'schema': {
+                    'pdf_workers': {'type': 'integer', 'min': 1, 'required': False, 'default': 2},
+                    'cache_max_bytes': {'type': 'integer', 'min': 0, 'required': False, 'default': 67108864}
+                }
+            },
             'rate_limit': {
                 'type': 'dict',
                 'required': True,
                 'schema': {
                     'default': {'type': 'string', 'required': True},
-                    'parse_email': {'type': 'string', 'required': True}
+                    'parse_email': {'type': 'string', 'required': True},
+                    'parse_emails': {'type': 'string', 'required': False, 'default': '2 per minute'},
+                    'jobs': {'type': 'string', 'required': False, 'default': '10 per minute'}
                 }
             }
         }
@@ -145,6 +310,27 @@ CONFIG_SCHEMA = {
         'required': True,
         'schema': {
             'prompt_template': {'type': 'string', 'required': True},
+            'thread_prompt_template': {'type': 'string', 'required': False, 'default': DEFAULT_THREAD_PROMPT_TEMPLATE},
+            'chunking': {
+                'type': 'dict',
+                'required': False,
+                'default': {},
+                'schema': {
+                    'enabled': {'type': 'boolean', 'required': False, 'default': True},
+                    'threshold_chars': {'type': 'integer', 'min': 1, 'required': False, 'default': 12000},
+                    'chunk_chars': {'type': 'integer', 'min': 500, 'required': False, 'default': 6000}
+                }
+            },
+            'field_repair': {
+                'type': 'dict',
+                'required': False,
+                'default': {},
+                'schema': {
+                    'enabled': {'type': 'boolean', 'required': False, 'default': True},
+                    'max_tokens_per_field': {'type': 'integer', 'min': 1, 'required': False, 'default': 30},
+                    'snippet_chars': {'type': 'integer', 'min': 50, 'required': False, 'default': 300}
+                }
+            },
             'field_validation': {'type': 'dict', 'required': True},
             'logging': {
                 'type': 'dict',
@@ -169,14 +355,28 @@ CONFIG_SCHEMA = {
                 'required': True,
                 'schema': {
                     'enabled': {'type': 'boolean', 'required': True},
-                    'max_tokens_threshold': {'type': 'integer', 'min': 1, 'required': True}
+                    'max_tokens_threshold': {'type': 'integer', 'min': 1, 'required': True},
+                    'learned': {
+                        'type': 'dict',
+                        'required': False,
+                        'default': {},
+                        'schema': {
+                            'enabled': {'type': 'boolean', 'required': False, 'default': False},
+                            'db_path': {'type': 'string', 'required': False, 'default': 'data/token_model.db'},
+                            'min_samples': {'type': 'integer', 'min': 1, 'required': False, 'default': 50},
+                            'stddevs': {'type': 'number', 'min': 0, 'required': False, 'default': 2.0},
+                            'safety_margin': {'type': 'number', 'min': 1, 'required': False, 'default': 1.15},
+                            'min_tokens': {'type': 'integer', 'min': 1, 'required': False, 'default': 256}
+                        }
+                    }
                 }
             },
             'batch_processing': {
                 'type': 'dict',
                 'required': True,
                 'schema': {
-                    'batch_size': {'type': 'integer', 'min': 1, 'required': True}
+                    'batch_size': {'type': 'integer', 'min': 1, 'required': True},
+                    'max_emails': {'type': 'integer', 'min': 1, 'required': False, 'default': 1000}
                 }
             },
             'environment_specific': {
@@ -192,66 +392,241 @@ CONFIG_SCHEMA = {
     }
 }
 
+class ConfigError(Exception):
+    """
+    Raised when a configuration file cannot be read or fails validation.
+    """
+
+def freeze(value):
+    """
+    Recursively converts dicts to read-only mappings and lists to tuples.
+
+    Args:
+        value: Validated configuration value.
+
+    Returns:
+        Read-only equivalent of the value.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def thaw(value):
+    """
+    Converts a frozen configuration value back into plain dicts and lists.
+
+    Args:
+        value: Frozen configuration value.
+
+    Returns:
+        Mutable copy of the value.
+    """
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+def config_digest(value) -> str:
+    """
+    Computes a stable content hash of a (possibly frozen) configuration value.
+
+    Args:
+        value: Configuration value.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    encoded = json.dumps(thaw(value), sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    One immutable, validated version of the configuration.
+    """
+    version: int
+    config: Mapping[str, Any]
+    digest: str
+    loaded_at: float
+
 class ConfigLoader(FileSystemEventHandler):
     """
     Singleton class to load and watch the configuration file.
     Validates the configuration using Cerberus schema.
+
+    The configuration is held as an immutable, versioned ConfigSnapshot that is
+    replaced atomically on reload, so readers never need a lock and always see a
+    complete configuration. File events are debounced, and an invalid edit is
+    logged and ignored while the previous snapshot stays in service.
     """
     _instance = None
     _lock = Lock()
 
+    # Seconds to wait for further file events before reloading
+    RELOAD_DEBOUNCE = 0.5
+
     def __init__(self, config_path='config.yaml'):
         if ConfigLoader._instance is not None:
             raise Exception("This class is a singleton!")
         else:
             self.config_path = config_path
-            self.load_config()
+            self._abs_path = os.path.abspath(config_path)
+            self._reload_lock = Lock()
+            self._reload_timer = None
+            self.last_reload_error = None
+            self.snapshot = ConfigSnapshot(version=1, config=freeze(ConfigLoader.read_config(config_path)),
+                                           digest=self._file_digest(), loaded_at=time.time())
             self.observer = Observer()
-            self.observer.schedule(self, path=os.path.dirname(os.path.abspath(config_path)) or '.', recursive=False)
+            self.observer.schedule(self, path=os.path.dirname(self._abs_path), recursive=False)
             self.observer.start()
             ConfigLoader._instance = self
 
     @staticmethod
-    def get_instance():
+    def get_instance(config_path='config.yaml'):
         """
         Retrieves the singleton instance of ConfigLoader.
+
+        Args:
+            config_path (str): Configuration file used if the instance does not exist yet.
         """
         if ConfigLoader._instance is None:
-            with Lock():
+            with ConfigLoader._lock:
                 if ConfigLoader._instance is None:
-                    ConfigLoader()
+                    ConfigLoader(config_path)
         return ConfigLoader._instance
 
-    def load_config(self):
+    @property
+    def config(self):
+        """
+        The current configuration (read-only view of the latest snapshot).
+        """
+        return self.snapshot.config
+
+    @property
+    def version(self) -> int:
         """
-        Loads and validates the configuration file.
-        Logs detailed errors and exits gracefully if validation fails.
+        Version number of the current snapshot, incremented on every applied reload.
         """
+        return self.snapshot.version
+
+    def _file_digest(self) -> Optional[str]:
         try:
-            with open(self.config_path, 'r') as file:
+            with open(self._abs_path, 'rb') as file:
+                return hashlib.sha256(file.read()).hexdigest()
+        except OSError:
+            return None
+
+    def load_config(self) -> bool:
+        """
+        Reloads the configuration file and swaps in a new snapshot if it changed.
+        An invalid file is logged and the current snapshot is kept.
+
+        Returns:
+            bool: True if a new snapshot was installed.
+        """
+        with self._reload_lock:
+            digest = self._file_digest()
+            if digest is None or digest == self.snapshot.digest:
+                return False
+            try:
+                config = ConfigLoader.parse_config(self.config_path)
+            except ConfigError as e:
+                self.last_reload_error = str(e)
+                logger.error(f"Configuration reload rejected; keeping version {self.snapshot.version}: {e}")
+                return False
+            self.last_reload_error = None
+            self.snapshot = ConfigSnapshot(version=self.snapshot.version + 1, config=freeze(config),
+                                           digest=digest, loaded_at=time.time())
+            logger.info(f"Configuration version {self.snapshot.version} loaded.")
+            return True
+
+    @staticmethod
+    def parse_config(config_path):
+        """
+        Reads and validates a configuration file.
+
+        Args:
+            config_path (str): Path to the configuration file.
+
+        Returns:
+            dict: The validated configuration.
+        """
+        try:
+            with open(config_path, 'r') as file:
                 config = yaml.safe_load(file)
-            validator = Validator(CONFIG_SCHEMA, purge_unknown=True)
-            if not validator.validate(config):
-                error_messages = validator.errors
-                logger.critical(f"Configuration validation failed: {json.dumps(error_messages, indent=2)}")
-                sys.exit(1)
-            self.config = validator.document
-            logger.info("Configuration loaded and validated successfully.")
         except FileNotFoundError:
-            logger.critical(f"Configuration file '{self.config_path}' not found.")
-            sys.exit(1)
+            raise ConfigError(f"Configuration file '{config_path}' not found.")
         except yaml.YAMLError as e:
-            logger.critical(f"Error parsing configuration file: {e}")
+            raise ConfigError(f"Error parsing configuration file: {e}")
+        validator = Validator(CONFIG_SCHEMA, purge_unknown=True)
+        if not isinstance(config, dict) or not validator.validate(config):
+            errors = validator.errors if isinstance(config, dict) else "top level must be a mapping"
+            raise ConfigError(f"Configuration validation failed: {json.dumps(errors, indent=2)}")
+        return validator.document
+
+    @staticmethod
+    def read_config(config_path):
+        """
+        Reads and validates a configuration file without watching it.
+        Used at startup and where no watcher thread may be started (e.g. a pre-fork master).
+        Exits if the configuration is missing or invalid.
+
+        Args:
+            config_path (str): Path to the configuration file.
+
+        Returns:
+            dict: The validated configuration.
+        """
+        try:
+            config = ConfigLoader.parse_config(config_path)
+            logger.info("Configuration loaded and validated successfully.")
+            return config
+        except ConfigError as e:
+            logger.critical(str(e))
             sys.exit(1)
         except Exception as e:
             logger.critical(f"Unexpected error loading configuration: {e}")
             sys.exit(1)
 
-    def on_modified(self, event):
+    def _is_config_event(self, event) -> bool:
+        paths = [getattr(event, 'src_path', None), getattr(event, 'dest_path', None)]
+        return not event.is_directory and any(path and os.path.abspath(path) == self._abs_path for path in paths)
+
+    def _schedule_reload(self):
         """
-        Event handler for configuration file modifications.
-        Reloads and validates the configuration upon changes.
+        Debounces bursts of file events (editor save sequences) into a single reload.
         """
-        if event.src_path.endswith(self.config_path):
-            logger.info("Configuration file changed. Reloading...")
+        with self._reload_lock:
+            if self._reload_timer is not None:
+                self._reload_timer.cancel()
+            self._reload_timer = Timer(self.RELOAD_DEBOUNCE, self._reload)
+            self._reload_timer.daemon = True
+            self._reload_timer.start()
+
+    def _reload(self):
+        try:
             self.load_config()
+        except Exception as e:
+            logger.error(f"Unexpected error reloading configuration: {e}")
+
+    def on_any_event(self, event):
+        """
+        Event handler for configuration file changes (writes, atomic renames, re-creation).
+        Events for other files in the directory (swap files, logs) are ignored.
+        """
+        if event.event_type in ('modified', 'created', 'moved') and self._is_config_event(event):
+            logger.debug("Configuration file changed. Scheduling reload...")
+            self._schedule_reload()
+
+    def stop(self):
+        """
+        Stops the file watcher and any pending reload.
+        """
+        with self._reload_lock:
+            if self._reload_timer is not None:
+                self._reload_timer.cancel()
+        self.observer.stop()
+        self.observer.join()
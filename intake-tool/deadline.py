@@ -0,0 +1,74 @@
+# deadline.py
+
+import time
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Awaitable, Iterator, Optional
+
+# Absolute deadline (time.monotonic()) of the request being served. Context variables are
+# copied into tasks and worker threads, so the deadline follows the request everywhere.
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('deadline', default=None)
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a request's deadline passes before its work completes.
+    """
+
+@contextmanager
+def deadline_scope(timeout: Optional[float]) -> Iterator[None]:
+    """
+    Sets the deadline for the enclosed work. A nested scope can only shorten it.
+
+    Args:
+        timeout (Optional[float]): Seconds from now, or None for no deadline.
+    """
+    deadline = _deadline.get()
+    if timeout is not None:
+        candidate = time.monotonic() + timeout
+        deadline = candidate if deadline is None else min(deadline, candidate)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining_time() -> Optional[float]:
+    """
+    Returns the seconds left before the current deadline.
+
+    Returns:
+        Optional[float]: Remaining seconds (may be negative), or None without a deadline.
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def check_deadline() -> None:
+    """
+    Raises DeadlineExceeded if the current deadline has passed.
+    """
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+async def run_with_deadline(awaitable: Awaitable[Any]) -> Any:
+    """
+    Awaits with a timeout equal to the remaining deadline budget.
+
+    Args:
+        awaitable (Awaitable[Any]): Work to run.
+
+    Returns:
+        Any: The awaitable's result.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return await awaitable
+    if remaining <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Request deadline exceeded")
+    try:
+        return await asyncio.wait_for(awaitable, timeout=remaining)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("Request deadline exceeded")
@@ -0,0 +1,101 @@
+# export_cache.py
+
+import asyncio
+import hashlib
+import logging
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict
+
+import orjson
+from cachetools import LRUCache
+
+logger = logging.getLogger("app")
+
+class ExportCache:
+    """
+    In-memory cache of rendered exports keyed by a hash of the exported content.
+
+    The same parsed data always renders to the same file, so repeated downloads
+    of a report are served from memory. Concurrent requests for a report that is
+    still rendering share the one render. The cache is bounded by total bytes.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        """
+        Args:
+            max_bytes (int): Maximum total size of cached files.
+        """
+        self._cache = LRUCache(maxsize=max_bytes, getsizeof=len)
+        self._lock = Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def content_key(kind: str, data: Any) -> str:
+        """
+        Computes the cache key (also usable as an ETag) for an export.
+
+        Args:
+            kind (str): Export format, e.g. 'pdf' or 'csv'.
+            data (Any): JSON-serializable content being exported.
+
+        Returns:
+            str: Hex SHA-256 of the format and canonical JSON content.
+        """
+        return hashlib.sha256(kind.encode('utf-8') + b'|' + orjson.dumps(data, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+    async def get_or_create(self, key: str, create: Callable[[], Awaitable[bytes]]) -> bytes:
+        """
+        Returns the cached export for key, rendering it with create() on a miss.
+
+        Args:
+            key (str): Content key.
+            create (Callable[[], Awaitable[bytes]]): Renders the export.
+
+        Returns:
+            bytes: Rendered file.
+        """
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            pending = self._inflight.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            content = await create()
+            future.set_result(content)
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved so it is not reported when nobody else waited
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            self._inflight.pop(key, None)
+
+        with self._lock:
+            try:
+                self._cache[key] = content
+            except ValueError:
+                logger.debug(f"Export {key[:12]} too large to cache ({len(content)} bytes)")
+        return content
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns hit/miss counters and the current cache size.
+
+        Returns:
+            Dict[str, int]: Cache statistics.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._cache),
+                    'bytes': int(self._cache.currsize)}
@@ -3,10 +3,45 @@
 import io
 import csv
 from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Tuple
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet
+from xml.sax.saxutils import escape
+
+# Section table style, shared by every table in every document
+SECTION_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+])
+
+# Paragraph styles, built once per process by get_styles()
+_styles = None
+
+def get_styles():
+    """
+    Returns the shared reportlab stylesheet, building it on first use.
+
+    Returns:
+        StyleSheet1: Sample stylesheet.
+    """
+    global _styles
+    if _styles is None:
+        _styles = getSampleStyleSheet()
+    return _styles
+
+def init_render_worker() -> None:
+    """
+    Process-pool initializer: builds the stylesheet before the first render.
+    """
+    get_styles()
 
 def export_to_pdf(parsed_data: dict) -> bytes:
     """
@@ -21,48 +56,119 @@ def export_to_pdf(parsed_data: dict) -> bytes:
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter, leftMargin=50, rightMargin=50, topMargin=50, bottomMargin=50)
     elements = []
-    styles = getSampleStyleSheet()
-    section_style = styles['Heading2']
-    key_style = styles['Normal']
-    value_style = styles['BodyText']
+    styles = get_styles()
 
     # Add Title
     title = Paragraph("Parsed Email Report", styles['Title'])
     elements.append(title)
     elements.append(Spacer(1, 20))
+    elements.extend(_section_flowables(parsed_data, styles))
+
+    # Build PDF
+    doc.build(elements)
+    pdf = buffer.getvalue()
+    buffer.close()
+    return pdf
+
+def _section_flowables(parsed_data: dict, styles) -> List[Any]:
+    """
+    Builds the heading and field table flowables for each section of one parsed email.
+
+    Args:
+        parsed_data (dict): Parsed email data.
+        styles: Stylesheet from getSampleStyleSheet().
+
+    Returns:
+        List[Any]: Flowables for the email's sections.
+    """
+    elements = []
+    section_style = styles['Heading2']
+    key_style = styles['Normal']
+    value_style = styles['BodyText']
 
     # Loop through sections and add formatted content
     for section, fields in parsed_data.items():
-        elements.append(Paragraph(section.replace('_', ' ').upper(), section_style))
+        elements.append(Paragraph(escape(section.replace('_', ' ').upper()), section_style))
         elements.append(Spacer(1, 10))
         
         # Format each key-value pair
         table_data = []
         for key, value in fields.items():
             formatted_key = key.replace('_', ' ').title()
-            table_data.append([Paragraph(f"<b>{formatted_key}:</b>", key_style), Paragraph(str(value), value_style)])
+            table_data.append([Paragraph(f"<b>{escape(formatted_key)}:</b>", key_style),
+                               Paragraph(escape(str(value)), value_style)])
 
         # Create a table for each section's content with improved styling
         table = Table(table_data, colWidths=[150, 350])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ]))
+        table.setStyle(SECTION_TABLE_STYLE)
         
         elements.append(table)
         elements.append(Spacer(1, 20))
 
-    # Build PDF
-    doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
-    return pdf
+    return elements
+
+class _FlowableStream(list):
+    """
+    Flowable list for SimpleDocTemplate.build() that is filled lazily from a generator.
+
+    Platypus consumes flowables from the front of the list, so only a small window
+    of flowables exists at a time regardless of batch size.
+    """
+
+    def __init__(self, source: Iterable[Any], window: int = 64) -> None:
+        super().__init__()
+        self._source = iter(source)
+        self._window = window
+
+    def __len__(self) -> int:
+        while list.__len__(self) < self._window:
+            try:
+                list.append(self, next(self._source))
+            except StopIteration:
+                break
+        return list.__len__(self)
+
+def export_batch_to_pdf(results: Iterable[Dict[str, Any]], output: BinaryIO) -> None:
+    """
+    Writes many parsed emails into one PDF, one titled block per email.
+
+    Flowables are generated per email as the layout engine reaches them, so the
+    input is never materialized as flowables. The reportlab canvas still keeps the
+    content stream of every finished page until the document is saved, so memory
+    grows by roughly 10 KB per email.
+
+    Args:
+        results (Iterable[Dict[str, Any]]): Entries shaped {'index', 'result'} or {'index', 'error'}.
+        output (BinaryIO): File-like object the PDF is written to.
+    """
+    doc = SimpleDocTemplate(output, pagesize=letter, leftMargin=50, rightMargin=50, topMargin=50, bottomMargin=50)
+    styles = get_styles()
+
+    def flowables():
+        yield Paragraph("Parsed Email Report", styles['Title'])
+        yield Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal'])
+        yield Spacer(1, 20)
+        for entry in results:
+            yield Paragraph(f"Email {entry['index']}", styles['Heading1'])
+            if 'error' in entry:
+                yield Paragraph(f"Error: {escape(str(entry['error']))}", styles['BodyText'])
+                yield Spacer(1, 20)
+            else:
+                yield from _section_flowables(entry['result'], styles)
+
+    doc.build(_FlowableStream(flowables()))
+
+def render_batch_pdf_to_file(results: Iterable[Dict[str, Any]], path: str) -> None:
+    """
+    Writes a batch PDF to a file path. Picklable entry point for process-pool workers.
+
+    Args:
+        results (Iterable[Dict[str, Any]]): Entries shaped {'index', 'result'} or {'index', 'error'}:
+            a list, or a job_queue.JobResults, which the worker reads from the job database itself.
+        path (str): Output file path.
+    """
+    with open(path, 'wb') as output:
+        export_batch_to_pdf(results, output)
 
 def export_to_csv(parsed_data: dict) -> str:
     """
@@ -105,3 +211,55 @@ def export_to_csv(parsed_data: dict) -> str:
 
     # Return CSV string
     return output.getvalue()
+
+def _flatten_fields(fields: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """
+    Yields (field label, value) pairs, expanding nested dictionaries into sub-fields.
+
+    Args:
+        fields (Dict[str, Any]): Fields of one section.
+    """
+    for key, value in fields.items():
+        formatted_key = key.replace('_', ' ').title()
+        if isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                yield f"{formatted_key} - {sub_key.replace('_', ' ').title()}", sub_value
+        else:
+            yield formatted_key, value
+
+def iter_batch_csv(results: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Streams many parsed emails as CSV, one row per field.
+
+    Columns are Email, Section, Field and Value. Output is yielded per email so a
+    response can start immediately and memory stays flat.
+
+    Args:
+        results (Iterable[Dict[str, Any]]): Entries shaped {'index', 'result'} or {'index', 'error'}.
+
+    Yields:
+        str: CSV text for the header or one email.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain() -> str:
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    writer.writerow(['Email', 'Section', 'Field', 'Value'])
+    yield drain()
+    for entry in results:
+        if 'error' in entry:
+            writer.writerow([entry['index'], 'ERROR', '', entry['error']])
+        else:
+            for section, fields in entry['result'].items():
+                section_name = section.replace('_', ' ').upper()
+                if not isinstance(fields, dict):
+                    writer.writerow([entry['index'], section_name, '', fields])
+                    continue
+                for label, value in _flatten_fields(fields):
+                    writer.writerow([entry['index'], section_name, label, value])
+        yield drain()
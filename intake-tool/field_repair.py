@@ -0,0 +1,116 @@
+# field_repair.py
+"""
+Targeted repair of fields that fail validation.
+
+Instead of re-running the whole extraction when a few values do not match
+their patterns, the parser sends one small prompt listing only the failed
+fields, their patterns and the lines of the email they were taken from, and
+patches the values that come back valid.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List
+
+# Words that say nothing about where a field appears in an email
+_GENERIC_TERMS = frozenset({'number', 'name', 'information', 'needed', 'required', 'the', 'of', 'for', 'if', 'is', 'this'})
+
+@dataclass(frozen=True)
+class FieldFailure:
+    """
+    A parsed field whose value does not match its validation pattern.
+    """
+    section: str
+    key: str
+    value: str
+    pattern: str
+    snippet: str
+
+def field_terms(key: str) -> List[str]:
+    """
+    Splits a parsed field key into words that may label it in an email.
+
+    Args:
+        key (str): Parsed field key (e.g. "insured's_phone_number_1*").
+
+    Returns:
+        List[str]: Distinctive lowercase words.
+    """
+    words = re.split(r"[^a-z0-9]+", key.lower().replace("'s", ''))
+    return [word for word in words if len(word) > 2 and word not in _GENERIC_TERMS]
+
+def find_snippet(email_content: str, key: str, value: str, max_chars: int = 300) -> str:
+    """
+    Finds the part of an email a field's value was most likely taken from.
+
+    The line containing the extracted value wins; otherwise the line mentioning
+    most of the field's words. The line is returned with its neighbours.
+
+    Args:
+        email_content (str): The email content.
+        key (str): Parsed field key.
+        value (str): Extracted (invalid) value.
+        max_chars (int): Maximum snippet length.
+
+    Returns:
+        str: The snippet (the start of the email if nothing matches).
+    """
+    lines = [line.strip() for line in email_content.splitlines()]
+    terms = field_terms(key)
+    needle = value.strip().lower()
+    best, best_score = None, 0
+    for index, line in enumerate(lines):
+        lowered = line.lower()
+        score = sum(1 for term in terms if term in lowered)
+        if needle and needle in lowered:
+            score += len(terms) + 1
+        if score > best_score:
+            best, best_score = index, score
+    if best is None:
+        return email_content[:max_chars].strip()
+    snippet = ' / '.join(line for line in lines[max(best - 1, 0):best + 2] if line)
+    if len(snippet) > max_chars:
+        # Keep the matching line in view when the neighbours are long
+        start = max(snippet.find(lines[best]) - max_chars // 4, 0)
+        snippet = snippet[start:start + max_chars]
+    return snippet
+
+def build_repair_prompt(failures: List[FieldFailure]) -> str:
+    """
+    Builds the prompt asking the provider to correct only the failed fields.
+
+    Args:
+        failures (List[FieldFailure]): Fields to correct.
+
+    Returns:
+        str: The repair prompt.
+    """
+    items = '\n\n'.join(
+        f"Field: {failure.key}\nExtracted: {failure.value}\nPattern: {failure.pattern}\nEmail excerpt: {failure.snippet}"
+        for failure in failures
+    )
+    return (
+        "[INST] These values were extracted from an email but do not match the required format. "
+        "Rewrite each value so it matches its regular expression, using only the email excerpt. "
+        "Answer with one line per field, exactly \"- field: value\", and \"- field: N/A\" if the excerpt "
+        "has no such value.\n\n" + items + " [/INST]"
+    )
+
+def parse_repair_response(completion: str) -> Dict[str, str]:
+    """
+    Reads the corrected values from a repair completion.
+
+    Args:
+        completion (str): Provider completion.
+
+    Returns:
+        Dict[str, str]: Corrected value by field key.
+    """
+    values = {}
+    for line in completion.splitlines():
+        line = line.strip()
+        if not line.startswith('-') or ':' not in line:
+            continue
+        key, value = line[1:].split(':', 1)
+        values[key.strip().lower()] = value.strip()
+    return values
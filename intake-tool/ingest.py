@@ -0,0 +1,339 @@
+# ingest.py
+"""
+Offline bulk ingestion of historical mailboxes.
+
+Streams messages from mbox files, Maildir folders, or directories of .eml and
+JSONL files, parses them across a process pool (one EmailParser per process)
+and appends results to a JSONL file. The output file doubles as the checkpoint:
+with --resume, messages whose id is already in the output are skipped; add
+--retry-errors to parse the ones that failed again (their new record is appended
+and supersedes the error). A message that cannot be read is written as an error
+record and the run continues.
+
+Usage:
+    python ingest.py archive.mbox maildir/ emails/ -o results.jsonl --workers 4 --resume --retry-errors
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import mailbox
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Any, Iterator, List, Optional, Set, Tuple, Union
+
+from mime_extractor import extract_email_text
+
+logger = logging.getLogger("ingest")
+
+# Per-process state, created once by _init_worker so caches stay warm across chunks
+_worker_parser = None
+_worker_loop = None
+
+@dataclass(frozen=True)
+class UnreadableMessage:
+    """
+    Stands in for the content of a message that could not be read or decoded.
+    """
+    error: str
+
+def _read_message(email_id: str, read: Callable[[], bytes]) -> Tuple[str, Union[str, UnreadableMessage]]:
+    """
+    Reads and flattens one message, turning failures into an UnreadableMessage.
+
+    Args:
+        email_id (str): Message id.
+        read (Callable[[], bytes]): Returns the raw message.
+
+    Returns:
+        Tuple[str, Union[str, UnreadableMessage]]: Message id and flattened content.
+    """
+    try:
+        return email_id, extract_email_text(read())
+    except Exception as e:
+        logger.warning(f"Could not read {email_id}: {e}")
+        return email_id, UnreadableMessage(f"Unreadable message: {e}")
+
+def iter_mbox(path: str) -> Iterator[Tuple[str, Union[str, UnreadableMessage]]]:
+    """
+    Yields messages from an mbox file one at a time.
+
+    Args:
+        path (str): Path to the mbox file.
+
+    Yields:
+        Tuple[str, Union[str, UnreadableMessage]]: Message id and flattened content.
+    """
+    box = mailbox.mbox(path, factory=None, create=False)
+    try:
+        for key in box.iterkeys():
+            yield _read_message(f"{path}#{key}", lambda: box.get_bytes(key))
+    finally:
+        box.close()
+
+def iter_maildir(path: str) -> Iterator[Tuple[str, Union[str, UnreadableMessage]]]:
+    """
+    Yields messages from a Maildir folder one at a time.
+
+    Args:
+        path (str): Path to the Maildir folder.
+
+    Yields:
+        Tuple[str, Union[str, UnreadableMessage]]: Message id and flattened content.
+    """
+    box = mailbox.Maildir(path, factory=None, create=False)
+    for key in box.iterkeys():
+        yield _read_message(f"{path}#{key}", lambda: box.get_bytes(key))
+
+def iter_jsonl(path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yields emails from a JSONL file, one JSON string or {"id", "email_content"} object per line.
+
+    Args:
+        path (str): Path to the JSONL file.
+
+    Yields:
+        Tuple[str, str]: Email id and content.
+    """
+    # Undecodable bytes are replaced so one bad line does not end the file
+    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping malformed JSON at {path}:{line_number}")
+                continue
+            if isinstance(item, dict):
+                yield str(item.get('id') or f"{path}:{line_number}"), item.get('email_content')
+            else:
+                yield f"{path}:{line_number}", item
+
+def iter_directory(path: str) -> Iterator[Tuple[str, Union[str, UnreadableMessage]]]:
+    """
+    Yields emails from .eml and .jsonl files under a directory, in a stable order.
+
+    Args:
+        path (str): Directory to walk.
+
+    Yields:
+        Tuple[str, Union[str, UnreadableMessage]]: Email id and content.
+    """
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            if name.lower().endswith('.eml'):
+                yield _read_message(file_path, lambda: _read_file(file_path))
+            elif name.lower().endswith('.jsonl'):
+                yield from iter_jsonl(file_path)
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as file:
+        return file.read()
+
+def iter_source(path: str) -> Iterator[Tuple[str, Union[str, UnreadableMessage]]]:
+    """
+    Detects the source type and yields its emails.
+
+    Args:
+        path (str): mbox file, Maildir folder, JSONL file or directory.
+
+    Yields:
+        Tuple[str, Union[str, UnreadableMessage]]: Email id and content.
+    """
+    if os.path.isdir(path):
+        if all(os.path.isdir(os.path.join(path, sub)) for sub in ('cur', 'new', 'tmp')):
+            return iter_maildir(path)
+        return iter_directory(path)
+    if path.lower().endswith('.jsonl'):
+        return iter_jsonl(path)
+    return iter_mbox(path)
+
+def load_checkpoint(output_path: str, retry_errors: bool = False) -> Set[str]:
+    """
+    Collects ids already written to the output file.
+
+    When an id has several records (it was retried), the last one counts.
+
+    Args:
+        output_path (str): Results JSONL file.
+        retry_errors (bool): Leave out ids whose last record is an error, so they are parsed again.
+
+    Returns:
+        Set[str]: Ids of processed emails.
+    """
+    failed: Dict[str, bool] = {}
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+                failed[record['id']] = 'error' in record
+            except (ValueError, KeyError, TypeError):
+                # A torn final line from an interrupted run; the email is re-parsed
+                continue
+    return {email_id for email_id, error in failed.items() if not (retry_errors and error)}
+
+def _init_worker(config_path: str) -> None:
+    """
+    Process pool initializer: builds this process's EmailParser and event loop.
+
+    Args:
+        config_path (str): Configuration file path.
+    """
+    global _worker_parser, _worker_loop
+    from config_loader import ConfigLoader
+    from parser import EmailParser
+
+    ConfigLoader.get_instance(config_path)
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+    _worker_parser = EmailParser(config_path=config_path)
+
+def _parse_chunk(chunk: List[Tuple[str, Union[str, UnreadableMessage]]]) -> List[Dict[str, Any]]:
+    """
+    Parses a chunk of emails in a worker process.
+
+    Args:
+        chunk (List[Tuple[str, Union[str, UnreadableMessage]]]): (id, content) pairs.
+
+    Returns:
+        List[Dict[str, Any]]: Output records, in chunk order.
+    """
+    from parser import format_parse_result
+
+    readable = [content for _, content in chunk if not isinstance(content, UnreadableMessage)]
+    results = iter(_worker_loop.run_until_complete(_worker_parser.parse_emails(readable)))
+    records = []
+    for email_id, content in chunk:
+        if isinstance(content, UnreadableMessage):
+            records.append({'id': email_id, 'error': content.error})
+        else:
+            records.append({'id': email_id, **format_parse_result(next(results))})
+    return records
+
+def _iter_chunks(sources: List[str], done: Set[str],
+                 chunk_size: int) -> Iterator[List[Tuple[str, Union[str, UnreadableMessage]]]]:
+    """
+    Groups pending emails from all sources into chunks.
+
+    Args:
+        sources (List[str]): Source paths.
+        done (Set[str]): Ids to skip.
+        chunk_size (int): Emails per chunk.
+
+    Yields:
+        List[Tuple[str, Union[str, UnreadableMessage]]]: Chunk of (id, content) pairs.
+    """
+    chunk = []
+    for source in sources:
+        for email_id, content in iter_source(source):
+            if email_id in done:
+                continue
+            chunk.append((email_id, content))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def run(sources: List[str], output_path: str, workers: int, chunk_size: int,
+        config_path: str, resume: bool, report_interval: float = 10.0,
+        retry_errors: bool = False) -> Dict[str, Any]:
+    """
+    Runs the ingestion pipeline.
+
+    At most two chunks per worker are in flight, so memory stays bounded
+    regardless of mailbox size.
+
+    Args:
+        sources (List[str]): Source paths.
+        output_path (str): Results JSONL file (appended to).
+        workers (int): Number of worker processes.
+        chunk_size (int): Emails per task sent to a worker.
+        config_path (str): Configuration file path.
+        resume (bool): Skip emails already present in the output file.
+        report_interval (float): Seconds between throughput reports.
+        retry_errors (bool): With resume, parse emails whose last record is an error again.
+
+    Returns:
+        Dict[str, Any]: Run statistics.
+    """
+    done = load_checkpoint(output_path, retry_errors) if resume else set()
+    if done:
+        logger.info(f"Resuming: {len(done)} emails already processed")
+
+    stats = {'processed': 0, 'failed': 0, 'skipped': len(done), 'elapsed_s': 0.0, 'emails_per_s': 0.0}
+    start = time.monotonic()
+    last_report = start
+    chunks = _iter_chunks(sources, done, chunk_size)
+
+    with open(output_path, 'a' if resume else 'w', encoding='utf-8') as output, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config_path,)) as pool:
+        in_flight = set()
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                else:
+                    in_flight.add(pool.submit(_parse_chunk, chunk))
+            if not in_flight:
+                break
+
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for record in future.result():
+                    output.write(json.dumps(record) + '\n')
+                    stats['processed'] += 1
+                    if 'error' in record:
+                        stats['failed'] += 1
+            output.flush()
+
+            now = time.monotonic()
+            if now - last_report >= report_interval:
+                logger.info(f"Processed {stats['processed']} emails "
+                            f"({stats['processed'] / (now - start):.1f} emails/s, {stats['failed']} failed)")
+                last_report = now
+
+    stats['elapsed_s'] = round(time.monotonic() - start, 2)
+    stats['emails_per_s'] = round(stats['processed'] / stats['elapsed_s'], 2) if stats['elapsed_s'] else 0.0
+    return stats
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point.
+
+    Args:
+        argv (Optional[List[str]]): Arguments (defaults to sys.argv).
+
+    Returns:
+        int: Exit code.
+    """
+    arg_parser = argparse.ArgumentParser(description="Bulk-parse historical mailboxes into JSONL.")
+    arg_parser.add_argument('sources', nargs='+', help="mbox files, Maildir folders, JSONL files or directories of .eml/.jsonl")
+    arg_parser.add_argument('-o', '--output', required=True, help="Output JSONL file")
+    arg_parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    arg_parser.add_argument('--chunk-size', type=int, default=20, help="Emails per worker task")
+    arg_parser.add_argument('--config', default='config.yaml', help="Configuration file")
+    arg_parser.add_argument('--resume', action='store_true', help="Skip emails already in the output file")
+    arg_parser.add_argument('--retry-errors', action='store_true', help="With --resume, parse emails that failed again")
+    arg_parser.add_argument('--report-interval', type=float, default=10.0, help="Seconds between throughput reports")
+    args = arg_parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    stats = run(args.sources, args.output, args.workers, args.chunk_size,
+                args.config, args.resume, args.report_interval, args.retry_errors)
+    logger.info(f"Ingestion complete: {json.dumps(stats)}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
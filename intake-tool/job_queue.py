@@ -0,0 +1,567 @@
+# job_queue.py
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import logging
+from threading import Lock
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from token_accounting import usage_scope
+from tracing import tracer
+
+logger = logging.getLogger("app")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    error TEXT,
+    account TEXT,
+    owner TEXT,
+    lease_expires REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    email_content TEXT,
+    result TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+"""
+
+# Columns added after the first release; added in place to existing databases
+MIGRATIONS = {
+    'account': "ALTER TABLE jobs ADD COLUMN account TEXT",
+    'owner': "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    'lease_expires': "ALTER TABLE jobs ADD COLUMN lease_expires REAL",
+}
+
+class LeaseLost(Exception):
+    """
+    Raised when a worker's lease on a job expired and another worker claimed it.
+    """
+
+class JobQueue:
+    """
+    Persistent queue of parsing jobs backed by SQLite in WAL mode.
+
+    Each job is split into items (one per email). Results are written back per
+    chunk, so a job interrupted by a restart resumes from its last checkpoint
+    instead of starting over.
+
+    Several processes can share the database: a claimed job is leased to the
+    claiming queue (owner id) until lease_expires, and the lease is renewed by a
+    heartbeat while the job runs. Only jobs whose lease expired (their worker
+    died) are taken over by another process.
+    """
+
+    def __init__(self, db_path: str = 'data/jobs.db', lease_seconds: float = 60.0) -> None:
+        """
+        Opens (and creates if needed) the job database.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+            lease_seconds (float): How long a claimed job stays owned without a heartbeat.
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self._lock = Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, statement in MIGRATIONS.items():
+            if columns and column not in columns:
+                self._conn.execute(statement)
+        self._conn.executescript(SCHEMA)
+        self.lease_seconds = lease_seconds
+        # Identifies this process's claims; a respawned worker gets a new id
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        logger.debug(f"Job queue opened at {db_path}")
+
+    def submit(self, email_contents: List[str], account: Optional[str] = None) -> str:
+        """
+        Enqueues a new job.
+
+        Args:
+            email_contents (List[str]): Emails to parse.
+            account (Optional[str]): Account (hashed API key) the job belongs to.
+
+        Returns:
+            str: The new job id.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO jobs (id, status, total, created_at, updated_at, account) VALUES (?, 'queued', ?, ?, ?, ?)",
+                    (job_id, len(email_contents), now, now, account)
+                )
+                self._conn.executemany(
+                    "INSERT INTO job_items (job_id, idx, email_content) VALUES (?, ?, ?)",
+                    ((job_id, index, content) for index, content in enumerate(email_contents))
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        logger.info(f"Job {job_id} queued with {len(email_contents)} emails")
+        return job_id
+
+    def claim_next_job(self) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Atomically leases the oldest queued job (or running job whose lease expired) to this queue.
+
+        Returns:
+            Optional[Tuple[str, Optional[str]]]: The claimed job id and the account it was
+            submitted by, or None if the queue is empty.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT id, account FROM jobs WHERE status = 'queued' "
+                    "OR (status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', owner = ?, lease_expires = ?, updated_at = ? WHERE id = ?",
+                        (self.owner_id, now + self.lease_seconds, now, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return (row[0], row[1]) if row else None
+
+    def renew_lease(self, job_id: str) -> bool:
+        """
+        Extends this queue's lease on a running job (heartbeat).
+
+        Args:
+            job_id (str): Job id.
+
+        Returns:
+            bool: False if the lease was lost to another worker.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND owner = ? AND status = 'running'",
+                (now + self.lease_seconds, now, job_id, self.owner_id)
+            )
+        return cursor.rowcount > 0
+
+    def pending_items(self, job_id: str, limit: int) -> List[Tuple[int, str]]:
+        """
+        Fetches the next unprocessed items of a job.
+
+        Args:
+            job_id (str): Job id.
+            limit (int): Maximum number of items to return.
+
+        Returns:
+            List[Tuple[int, str]]: (index, email content) pairs.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT idx, email_content FROM job_items WHERE job_id = ? AND result IS NULL ORDER BY idx LIMIT ?",
+                (job_id, limit)
+            ).fetchall()
+
+    def record_results(self, job_id: str, results: List[Tuple[int, Any]]) -> None:
+        """
+        Checkpoints a chunk of results and updates job progress.
+
+        The email content of finished items is dropped to keep the database small.
+        The checkpoint also renews the lease.
+
+        Args:
+            job_id (str): Job id.
+            results (List[Tuple[int, Any]]): (index, parse result) pairs.
+
+        Raises:
+            LeaseLost: If another worker owns the job now; nothing is written.
+        """
+        # Imported here so processes that only read results (PDF render workers) do not load the parser
+        from parser import format_parse_result
+
+        entries = [(index, format_parse_result(result)) for index, result in results]
+        failed = sum(1 for _, entry in entries if 'error' in entry)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                claimed = self._conn.execute(
+                    "UPDATE jobs SET lease_expires = ? WHERE id = ? AND owner = ? AND status = 'running'",
+                    (now + self.lease_seconds, job_id, self.owner_id)
+                ).rowcount
+                if not claimed:
+                    raise LeaseLost(f"Lease on job {job_id} was lost")
+                self._conn.executemany(
+                    "UPDATE job_items SET result = ?, email_content = NULL WHERE job_id = ? AND idx = ?",
+                    ((json.dumps(entry), job_id, index) for index, entry in entries)
+                )
+                self._conn.execute(
+                    "UPDATE jobs SET completed = completed + ?, failed = failed + ?, updated_at = ? WHERE id = ?",
+                    (len(entries), failed, now, job_id)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def finish_job(self, job_id: str, error: Optional[str] = None) -> None:
+        """
+        Marks a job as completed, or failed if an error is given.
+
+        Args:
+            job_id (str): Job id.
+            error (Optional[str]): Error message for failed jobs.
+        """
+        status = 'failed' if error else 'completed'
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND owner = ?",
+                (status, error, time.time(), job_id, self.owner_id)
+            )
+        if cursor.rowcount:
+            logger.info(f"Job {job_id} {status}")
+
+    def requeue_expired(self) -> int:
+        """
+        Returns running jobs whose lease expired (their worker died) to the queue.
+
+        Jobs leased by live workers, in this or another process, are left alone.
+
+        Returns:
+            int: Number of jobs requeued.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)",
+                (now, now)
+            )
+        if cursor.rowcount:
+            logger.info(f"Requeued {cursor.rowcount} jobs with expired leases")
+        return cursor.rowcount
+
+    def release(self, job_id: str) -> None:
+        """
+        Gives up this queue's lease on a running job so another worker can resume it at once.
+
+        Args:
+            job_id (str): Job id.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = 'running'",
+                (time.time(), job_id, self.owner_id)
+            )
+
+    def get_job(self, job_id: str, offset: int = 0, limit: int = 100,
+                account: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Returns job progress and a page of its finished results.
+
+        Args:
+            job_id (str): Job id.
+            offset (int): Index of the first result to return.
+            limit (int): Maximum number of results to return.
+            account (Optional[str]): If given, only a job submitted by this account is returned.
+
+        Returns:
+            Optional[Dict[str, Any]]: Job status and results, or None if unknown (or another account's).
+        """
+        with self._lock:
+            job = self._conn.execute(
+                "SELECT status, total, completed, failed, created_at, updated_at, error, account FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+            if not job or (account is not None and job[7] != account):
+                return None
+            rows = self._conn.execute(
+                "SELECT idx, result FROM job_items WHERE job_id = ? AND idx >= ? AND result IS NOT NULL "
+                "ORDER BY idx LIMIT ?",
+                (job_id, offset, limit)
+            ).fetchall()
+        status, total, completed, failed, created_at, updated_at, error, _ = job
+        return {
+            'job_id': job_id,
+            'status': status,
+            'total': total,
+            'completed': completed,
+            'failed': failed,
+            'created_at': created_at,
+            'updated_at': updated_at,
+            'error': error,
+            'results': [{'index': index, **json.loads(result)} for index, result in rows]
+        }
+
+    def iter_results(self, job_id: str, page_size: int = 500) -> 'JobResults':
+        """
+        Returns a job's finished results in index order, read one page at a time when iterated.
+
+        Args:
+            job_id (str): Job id.
+            page_size (int): Results fetched per query.
+
+        Returns:
+            JobResults: Iterable of {'index', 'result'} or {'index', 'error'} entries.
+        """
+        return JobResults(self.db_path, job_id, page_size)
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._conn.close()
+
+def iter_job_results(db_path: str, job_id: str, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """
+    Streams a job's finished results from the database with a private connection.
+
+    Used by processes that do not own the queue (PDF render workers), so results
+    never pass through the API process.
+
+    Args:
+        db_path (str): Path to the job database.
+        job_id (str): Job id.
+        page_size (int): Results fetched per query.
+
+    Yields:
+        Dict[str, Any]: {'index', 'result'} or {'index', 'error'} entries in index order.
+    """
+    # Streaming responses advance the iterator from different threadpool threads
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    try:
+        offset = 0
+        while True:
+            rows = conn.execute(
+                "SELECT idx, result FROM job_items WHERE job_id = ? AND idx >= ? AND result IS NOT NULL "
+                "ORDER BY idx LIMIT ?",
+                (job_id, offset, page_size)
+            ).fetchall()
+            if not rows:
+                return
+            for index, result in rows:
+                yield {'index': index, **json.loads(result)}
+            offset = rows[-1][0] + 1
+    finally:
+        conn.close()
+
+class JobResults:
+    """
+    A job's stored results, read from the database in pages when iterated.
+
+    Only the database path and job id are pickled, so handing it to a worker
+    process lets that process stream the results itself.
+    """
+
+    def __init__(self, db_path: str, job_id: str, page_size: int = 500) -> None:
+        self.db_path = db_path
+        self.job_id = job_id
+        self.page_size = page_size
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter_job_results(self.db_path, self.job_id, self.page_size)
+
+class JobWorkerPool:
+    """
+    Background workers that drain the job queue using EmailParser.parse_emails.
+
+    Work runs independently of any client connection; each chunk of results is
+    checkpointed to the queue before the next chunk starts.
+    """
+
+    def __init__(self, queue: JobQueue, email_parser, workers: int = 2,
+                 batch_size: int = 20, poll_interval: float = 2.0, claim_store=None,
+                 token_ledger=None, token_limiter=None) -> None:
+        """
+        Args:
+            queue (JobQueue): Queue to drain.
+            email_parser (EmailParser): Parser used for the jobs.
+            workers (int): Number of jobs processed concurrently.
+            batch_size (int): Emails parsed per checkpoint.
+            poll_interval (float): Seconds between queue polls when idle.
+            claim_store (ClaimStore, optional): Store that indexes successful results.
+            token_ledger (TokenLedger, optional): Ledger whose budget defers chunks instead of rejecting them.
+            token_limiter (TokenBucketLimiter, optional): Per-key bucket charged as chunks are scheduled.
+        """
+        self.queue = queue
+        self.email_parser = email_parser
+        self.claim_store = claim_store
+        self.token_ledger = token_ledger
+        self.token_limiter = token_limiter
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    def start(self) -> None:
+        """
+        Requeues jobs whose worker died and starts the worker tasks.
+        """
+        self.queue.requeue_expired()
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        logger.info(f"Started {self.workers} job workers")
+
+    def notify(self) -> None:
+        """
+        Wakes idle workers after a job has been submitted.
+        """
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        """
+        Cancels the workers and releases their jobs, which resume from the last checkpoint.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Job workers stopped")
+
+    async def _worker(self, worker_id: int) -> None:
+        """
+        Worker loop: claim a job, process it chunk by chunk, repeat.
+
+        Args:
+            worker_id (int): Worker number, for logging.
+        """
+        while True:
+            try:
+                claimed = await asyncio.to_thread(self.queue.claim_next_job)
+                if claimed is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                job_id, account = claimed
+                logger.info(f"Worker {worker_id} processing job {job_id}")
+                await self._process_job(job_id, account)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} error: {e}", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _parse_chunk(self, contents: List[str], account: Optional[str]) -> List[Any]:
+        """
+        Parses one chunk, first waiting for the account's token bucket and hourly budget
+        (when configured).
+
+        Args:
+            contents (List[str]): Email contents.
+            account (Optional[str]): Account the job was submitted by; jobs queued before
+                accounts were recorded share the '' account.
+
+        Returns:
+            List[Any]: Parse results in input order.
+        """
+        estimates = [self.email_parser.estimate_request_tokens(content) for content in contents]
+        if self.token_limiter is not None:
+            # Charged email by email: a whole chunk may not fit in the bucket
+            for estimate in estimates:
+                await self.token_limiter.wait_for_tokens(account or '', estimate)
+        if self.token_ledger is None:
+            return await self.email_parser.parse_emails(contents)
+        reservation = await self.token_ledger.wait_for_budget(account or '', sum(estimates))
+        with usage_scope() as usage:
+            try:
+                return await self.email_parser.parse_emails(contents)
+            finally:
+                await asyncio.to_thread(self.token_ledger.settle, [reservation], usage, len(contents))
+
+    async def _heartbeat(self, job_id: str, job_task: asyncio.Task) -> None:
+        """
+        Renews the lease on a job while it is processed; cancels the job if the lease was lost.
+
+        Args:
+            job_id (str): Job id.
+            job_task (asyncio.Task): Task processing the job.
+        """
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            if not await asyncio.to_thread(self.queue.renew_lease, job_id):
+                logger.warning(f"Lease on job {job_id} was lost; stopping")
+                job_task.cancel()
+                return
+
+    async def _process_job(self, job_id: str, account: Optional[str]) -> None:
+        """
+        Parses all pending items of a job, checkpointing after each chunk.
+
+        Args:
+            job_id (str): Job id.
+            account (Optional[str]): Account the job was submitted by.
+        """
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, asyncio.current_task()))
+        try:
+            await self._process_items(job_id, account)
+        except LeaseLost as e:
+            logger.warning(f"{e}; another worker resumes the job")
+        except asyncio.CancelledError:
+            if heartbeat.done():
+                # Cancelled by the heartbeat because another worker took over the job
+                return
+            # Shutting down: let another worker resume from the last checkpoint at once
+            self.queue.release(job_id)
+            raise
+        finally:
+            heartbeat.cancel()
+
+    async def _process_items(self, job_id: str, account: Optional[str]) -> None:
+        """
+        Parses the pending items of a leased job chunk by chunk.
+
+        Args:
+            job_id (str): Job id.
+            account (Optional[str]): Account the job was submitted by (owner of its indexed claims).
+        """
+        try:
+            while True:
+                items = await asyncio.to_thread(self.queue.pending_items, job_id, self.batch_size)
+                if not items:
+                    break
+                indexes = [index for index, _ in items]
+                contents = [content for _, content in items]
+                # Each chunk is its own trace; no request is waiting on it
+                with tracer.span("job.chunk", job_id=job_id, emails=len(contents)):
+                    results = await self._parse_chunk(contents, account)
+                await asyncio.to_thread(self.queue.record_results, job_id, list(zip(indexes, results)))
+                if self.claim_store is not None:
+                    parsed = [result for result in results if isinstance(result, dict) and 'error' not in result]
+                    await asyncio.to_thread(self.claim_store.add_many, parsed, account)
+            await asyncio.to_thread(self.queue.finish_job, job_id)
+        except (asyncio.CancelledError, LeaseLost):
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+            await asyncio.to_thread(self.queue.finish_job, job_id, str(e))
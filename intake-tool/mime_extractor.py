@@ -0,0 +1,195 @@
+# mime_extractor.py
+
+import re
+import logging
+from email import policy
+from email.feedparser import BytesFeedParser
+from email.message import EmailMessage
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger("parser")
+
+# Headers carried over into the text handed to the AI provider
+DEFAULT_HEADERS = ('From', 'To', 'Cc', 'Date', 'Subject')
+
+# Content types whose payloads are kept; everything else is dropped while parsing
+TEXT_CONTENT_TYPES = ('text/plain', 'text/html')
+
+class _PayloadSkippingMessage(EmailMessage):
+    """
+    EmailMessage that discards non-text payloads as soon as the parser sets them.
+
+    Attachment bodies are never decoded and their encoded text is released at the
+    end of each part, so a message with multi-MB attachments costs little more
+    memory than its text parts. Only the encoded size is remembered.
+    """
+
+    skipped_payload_size = 0
+
+    def set_payload(self, payload, charset=None):
+        if isinstance(payload, str) and not self._keeps_payload():
+            self.skipped_payload_size = len(payload)
+            payload = ''
+        super().set_payload(payload, charset)
+
+    def _keeps_payload(self) -> bool:
+        if self.is_attachment():
+            return False
+        # Defective multiparts (missing boundary) arrive as a single text payload
+        return self.get_content_type() in TEXT_CONTENT_TYPES or self.get_content_maintype() == 'multipart'
+
+class _HTMLToText(HTMLParser):
+    """
+    Minimal HTML-to-text converter that keeps block structure as line breaks.
+    """
+
+    BLOCK_TAGS = {'p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'table', 'blockquote'}
+    SKIP_TAGS = {'script', 'style', 'head', 'title'}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+        elif tag == 'td':
+            self.parts.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+def html_to_text(html: str) -> str:
+    """
+    Converts HTML to plain text, dropping scripts, styles and markup.
+
+    Args:
+        html (str): HTML content.
+
+    Returns:
+        str: Plain text with collapsed whitespace.
+    """
+    converter = _HTMLToText()
+    converter.feed(html)
+    converter.close()
+    text = ''.join(converter.parts)
+    text = re.sub(r'[ \t\r\f\v]+', ' ', text)
+    text = re.sub(r' *\n *', '\n', text)
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+def new_message_parser() -> BytesFeedParser:
+    """
+    Creates an incremental parser for raw RFC 822 bytes.
+
+    Feed it chunks as they arrive and call close() to get the message, so the
+    raw body never has to be buffered in full.
+
+    Returns:
+        BytesFeedParser: Parser producing payload-skipping EmailMessage objects.
+    """
+    return BytesFeedParser(_factory=_PayloadSkippingMessage, policy=policy.default)
+
+def parse_message(raw_email: bytes) -> EmailMessage:
+    """
+    Parses raw RFC 822 bytes, skipping attachment payloads.
+
+    Args:
+        raw_email (bytes): Raw message.
+
+    Returns:
+        EmailMessage: Parsed message.
+    """
+    feed = new_message_parser()
+    feed.feed(raw_email)
+    return feed.close()
+
+def _best_text_part(msg: EmailMessage) -> Tuple[Optional[EmailMessage], List[str]]:
+    """
+    Finds the best body part and collects attachment names.
+
+    Args:
+        msg (EmailMessage): Parsed message.
+
+    Returns:
+        Tuple[Optional[EmailMessage], List[str]]: Preferred text part (plain over HTML) and attachment filenames.
+    """
+    plain = html = None
+    attachments = []
+    for part in msg.walk():
+        if part.is_multipart():
+            continue
+        if part.is_attachment() or part.get_content_type() not in TEXT_CONTENT_TYPES:
+            attachments.append(part.get_filename() or part.get_content_type())
+        elif part.get_content_type() == 'text/plain' and plain is None:
+            plain = part
+        elif part.get_content_type() == 'text/html' and html is None:
+            html = part
+    return plain or html, attachments
+
+def _decode_text_part(part: EmailMessage) -> str:
+    """
+    Decodes a text part using its declared charset.
+
+    Parts without a charset, or with one Python does not know, are read as UTF-8;
+    undecodable bytes are replaced rather than failing the message.
+
+    Args:
+        part (EmailMessage): text/plain or text/html part.
+
+    Returns:
+        str: Decoded text.
+    """
+    payload = part.get_payload(decode=True) or b''
+    charset = part.get_content_charset() or 'utf-8'
+    try:
+        return payload.decode(charset, errors='replace')
+    except LookupError:
+        logger.warning(f"Unknown charset '{charset}' in message body; decoding as UTF-8")
+        return payload.decode('utf-8', errors='replace')
+
+def message_to_text(msg: EmailMessage, headers: Tuple[str, ...] = DEFAULT_HEADERS) -> str:
+    """
+    Flattens a message into the plain-text form expected by EmailParser.
+
+    Args:
+        msg (EmailMessage): Parsed message.
+        headers (Tuple[str, ...]): Headers to keep.
+
+    Returns:
+        str: Selected headers, attachment names and the best text body.
+    """
+    lines = [f"{name}: {msg[name]}" for name in headers if msg[name]]
+    part, attachments = _best_text_part(msg)
+    if attachments:
+        lines.append(f"Attachments: {', '.join(attachments)}")
+
+    body = ''
+    if part is not None:
+        body = _decode_text_part(part)
+        if part.get_content_type() == 'text/html':
+            body = html_to_text(body)
+    return ('\n'.join(lines) + '\n\n' + body.strip()).strip()
+
+def extract_email_text(raw_email: bytes, headers: Tuple[str, ...] = DEFAULT_HEADERS) -> str:
+    """
+    Extracts prompt-ready text from a raw .eml message.
+
+    Args:
+        raw_email (bytes): Raw message.
+        headers (Tuple[str, ...]): Headers to keep.
+
+    Returns:
+        str: Flattened message text.
+    """
+    return message_to_text(parse_message(raw_email), headers)
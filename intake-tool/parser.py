@@ -7,9 +7,9 @@ import re
 import time
 import spacy
 import asyncio
-from dataclasses import dataclass
-from typing import Dict, Any, Union, List
-from cachetools import TTLCache, cachedmethod
+from dataclasses import dataclass, field
+from typing import Dict, Any, Union, List, Optional, Tuple, Iterable, AsyncIterable, AsyncIterator
+from cachetools import TTLCache
 from functools import wraps
 from tenacity import (
     retry,
@@ -30,7 +30,19 @@ import json
 import requests
 
 # Configuration Loader with Dynamic Reloading
-from config_loader import ConfigLoader  # Avoid circular imports by importing from config_loader.py
+from config_loader import ConfigLoader, ConfigSnapshot, config_digest  # Avoid circular imports by importing from config_loader.py
+from mime_extractor import extract_email_text
+from deadline import DeadlineExceeded, check_deadline, remaining_time, run_with_deadline
+from retry_budget import retry_coordinator
+from prompt_template import (CHARS_PER_TOKEN, CompiledPrompt, CompiledThreadPrompt, PromptCacheStats,
+                             compile_prompt_template, compile_thread_prompt_template)
+from token_accounting import record_usage
+from token_predictor import CompletionLengthModel, EmailFeatures, email_features
+from thread_parsing import merge_changes, render_current_fields, strip_quoted_history
+from field_repair import FieldFailure, build_repair_prompt, find_snippet, parse_repair_response
+from chunked_extraction import merge_partial_forms, split_email
+from claim_merge import registry_field
+from tracing import current_span, tracer
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
@@ -116,6 +128,62 @@ def performance_monitor(func):
             raise e
     return wrapper
 
+# Read-only artifacts shared by every EmailParser in the process. A pre-fork master
+# fills these before forking so workers share the pages copy-on-write.
+_shared_nlp = None
+_pattern_registry: Dict[tuple, Dict[str, re.Pattern]] = {}
+
+def load_spacy_model() -> spacy.language.Language:
+    """
+    Loads the spaCy model for entity recognition, downloading it if missing.
+
+    Returns:
+        spacy.language.Language: The loaded spaCy model.
+    """
+    try:
+        nlp = spacy.load("en_core_web_sm")
+        logger.debug("spaCy model loaded successfully.")
+        return nlp
+    except OSError:
+        logger.info("Downloading spaCy 'en_core_web_sm' model...")
+        from spacy.cli import download
+        download("en_core_web_sm")
+        nlp = spacy.load("en_core_web_sm")
+        logger.debug("spaCy model downloaded and loaded successfully.")
+        return nlp
+
+def compile_field_patterns(field_validation: Dict[str, str]) -> Dict[str, re.Pattern]:
+    """
+    Compiles the field validation patterns, reusing a previous compilation of the same set.
+
+    Args:
+        field_validation (Dict[str, str]): Mapping of '<field>_pattern' keys to regexes.
+
+    Returns:
+        Dict[str, re.Pattern]: Compiled patterns by key.
+    """
+    registry_key = tuple(sorted(field_validation.items()))
+    patterns = _pattern_registry.get(registry_key)
+    if patterns is None:
+        patterns = {key: re.compile(pattern) for key, pattern in field_validation.items()}
+        _pattern_registry[registry_key] = patterns
+    return patterns
+
+def preload_shared_artifacts(field_validation: Dict[str, str]) -> None:
+    """
+    Loads the spaCy model and compiles the field registry once for the whole process.
+
+    Called by the pre-fork master before forking workers; EmailParser instances
+    created afterwards reuse these objects instead of loading their own.
+
+    Args:
+        field_validation (Dict[str, str]): Field validation patterns from the configuration.
+    """
+    global _shared_nlp
+    if _shared_nlp is None:
+        _shared_nlp = load_spacy_model()
+    compile_field_patterns(field_validation)
+
 @dataclass
 class ParserConfig:
     generative_ai: Dict[str, Any]
@@ -125,10 +193,154 @@ class ParserConfig:
     dynamic_token_adjustment: Dict[str, Any]
     caching: Dict[str, Any]
     prompt_template: str
+    thread_prompt_template: str
+    field_repair: Dict[str, Any]
+    chunking: Dict[str, Any]
     field_validation: Dict[str, str]
     environment_specific: Dict[str, Any]
     max_tokens: int
     strict_mode: bool
+    generation_config: Dict[str, Any] = field(default_factory=dict)
+
+def _usage_metadata(response: Any) -> Optional[Dict[str, int]]:
+    """
+    Reads input, output and prefix-cached token counts from a provider response, if it reports them.
+
+    Args:
+        response (Any): Provider response.
+
+    Returns:
+        Optional[Dict[str, int]]: {'input_tokens', 'output_tokens', 'cached_tokens'} or None.
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return None
+    return {
+        'input_tokens': getattr(usage, 'prompt_token_count', 0) or 0,
+        'output_tokens': getattr(usage, 'candidates_token_count', 0) or 0,
+        'cached_tokens': getattr(usage, 'cached_content_token_count', 0) or 0,
+    }
+
+def _finish_reason(response: Any) -> Optional[str]:
+    """
+    Reads why the provider stopped generating (e.g. 'STOP', 'MAX_TOKENS'), if it reports it.
+
+    Args:
+        response (Any): Provider response.
+
+    Returns:
+        Optional[str]: The finish reason name, or None.
+    """
+    candidates = getattr(response, 'candidates', None)
+    if not candidates:
+        return None
+    reason = getattr(candidates[0], 'finish_reason', None)
+    if reason is None:
+        return None
+    return getattr(reason, 'name', None) or str(reason)
+
+def _is_truncated(response: Dict[str, Any], output_tokens: int, max_tokens: int) -> bool:
+    """
+    Whether a completion stopped because it reached max_tokens.
+
+    Args:
+        response (Dict[str, Any]): Provider response.
+        output_tokens (int): Tokens the completion used.
+        max_tokens (int): Limit the request was sent with.
+
+    Returns:
+        bool: True if the completion was cut off.
+    """
+    reason = response.get('finish_reason')
+    if reason:
+        return reason.upper() in ('MAX_TOKENS', 'LENGTH')
+    return output_tokens >= max_tokens
+
+def current_environment() -> str:
+    """
+    Resolves the deployment environment used for environment-specific settings.
+
+    Returns:
+        str: 'development' or 'production'.
+    """
+    return 'development' if os.getenv('FLASK_ENV', 'development') == 'development' else 'production'
+
+@dataclass(frozen=True)
+class ParserArtifacts:
+    """
+    Parser settings derived from one configuration snapshot.
+
+    Each artifact records the configuration inputs it was built from and is only
+    rebuilt when those inputs change between snapshots.
+    """
+    version: int
+    parser_config: ParserConfig
+    field_patterns: Dict[str, re.Pattern]
+    prompt: CompiledPrompt
+    thread_prompt: CompiledThreadPrompt
+    concurrency_limit: int
+    cache_namespace: str
+    inputs: Dict[str, Any]
+
+def build_parser_artifacts(snapshot: ConfigSnapshot, previous: Optional[ParserArtifacts] = None) -> ParserArtifacts:
+    """
+    Builds the parser artifacts for a snapshot, reusing unchanged ones from the previous version.
+
+    Args:
+        snapshot (ConfigSnapshot): Configuration snapshot.
+        previous (Optional[ParserArtifacts]): Artifacts of the previous snapshot.
+
+    Returns:
+        ParserArtifacts: Artifacts for the snapshot.
+    """
+    config = snapshot.config
+    parser_section = config['parser']
+    inputs = {
+        'parser_config': (config['ai'], parser_section),
+        'field_patterns': parser_section['field_validation'],
+        'prompt': parser_section['prompt_template'],
+        'thread_prompt': parser_section['thread_prompt_template'],
+        'concurrency_limit': (parser_section['environment_specific'], current_environment()),
+        # Cached results are only valid for the prompt, validation and model that produced them
+        'cache_namespace': (parser_section['prompt_template'], parser_section['thread_prompt_template'],
+                            parser_section['field_validation'],
+                            parser_section.get('generation_config', {}), parser_section['max_tokens'],
+                            config['ai']['generative_ai'], config['ai']['vertex_ai'].get('model_name')),
+    }
+    builders = {
+        'parser_config': lambda: ParserConfig(
+            generative_ai=config['ai']['generative_ai'],
+            vertex_ai=config['ai']['vertex_ai'],
+            logging=parser_section['logging'],
+            batch_processing=parser_section['batch_processing'],
+            dynamic_token_adjustment=parser_section['dynamic_token_adjustment'],
+            caching=parser_section['caching'],
+            prompt_template=parser_section['prompt_template'],
+            thread_prompt_template=parser_section['thread_prompt_template'],
+            field_repair=parser_section.get('field_repair', {}),
+            chunking=parser_section.get('chunking', {}),
+            field_validation=parser_section['field_validation'],
+            environment_specific=parser_section['environment_specific'],
+            max_tokens=parser_section['max_tokens'],
+            strict_mode=parser_section['strict_mode'],
+            generation_config=parser_section.get('generation_config', {})
+        ),
+        'field_patterns': lambda: compile_field_patterns(parser_section['field_validation']),
+        'prompt': lambda: compile_prompt_template(parser_section['prompt_template']),
+        'thread_prompt': lambda: compile_thread_prompt_template(parser_section['thread_prompt_template']),
+        'concurrency_limit': lambda: parser_section['environment_specific'].get(current_environment(), {}).get('concurrency_limit', 10),
+        'cache_namespace': lambda: config_digest(inputs['cache_namespace'])[:16],
+    }
+
+    values = {}
+    for name, build in builders.items():
+        if previous is not None and previous.inputs[name] == inputs[name]:
+            values[name] = getattr(previous, name)
+        else:
+            values[name] = build()
+            if previous is not None:
+                logger.info(f"Rebuilt parser artifact '{name}' for configuration version {snapshot.version}")
+    return ParserArtifacts(version=snapshot.version, inputs=inputs, **values)
 
 class EmailParser:
     """
@@ -143,27 +355,29 @@ class EmailParser:
             config_path (str): Path to the configuration YAML file.
         """
         self.config_loader = ConfigLoader.get_instance()
-        self.config = self.config_loader.config
-        self.parser_config = self._load_parser_config()
+        # Settings are read through self.artifacts, which follows configuration reloads
+        try:
+            self._artifacts = build_parser_artifacts(self.config_loader.snapshot)
+        except KeyError as e:
+            log_exception(e, f"Missing required configuration field: {e}", self.config['parser'].get('strict_mode', True))
         setup_logger(self.parser_config.logging)
-        self.field_validation = self.parser_config.field_validation
-        self.prompt_template = self.parser_config.prompt_template
-        self.generation_config = self.config['parser'].get('generation_config', {})
-        self.dynamic_token_adjustment = self.parser_config.dynamic_token_adjustment
-        self.batch_size = self.parser_config.batch_processing.get('batch_size', 10)
-        self.cache_ttl = self.parser_config.caching['ttl']
-        self.strict_mode = self.parser_config.strict_mode
-
-        # Initialize aiohttp session for asynchronous HTTP requests
-        self.session = ClientSession(
-            headers={
-                "Content-Type": "application/json"
-            },
-            timeout=ClientTimeout(total=200)  # Timeout set to 200 seconds
-        )
+        retry_coordinator.configure(self.config.get('retry', {}))
+
+        # aiohttp session for asynchronous HTTP requests, created on first use so the
+        # parser can be constructed outside the event loop (e.g. in a startup thread)
+        self.session = None
 
         # Initialize cache with hash-based keys and configurable TTL
-        self.cache = TTLCache(maxsize=500, ttl=self.cache_ttl)
+        self.cache = TTLCache(maxsize=500, ttl=self.parser_config.caching['ttl'])
+
+        # Prompt size and provider prefix-cache savings per request
+        self.prompt_stats = PromptCacheStats()
+
+        # Learned completion lengths that set a tight max_tokens per request
+        self.token_model = self._init_token_model()
+
+        # Targeted repair calls for fields that fail validation
+        self.repair_stats = {'calls': 0, 'fields': 0, 'repaired': 0}
 
         # Initialize AI provider client based on config
         self.ai_provider = self.config['ai']['generative_ai']['provider']
@@ -178,48 +392,96 @@ class EmailParser:
         # Initialize spaCy model for entity recognition
         self.nlp = self._load_spacy_model()
 
-    def _load_parser_config(self) -> ParserConfig:
+    @property
+    def config(self):
+        """
+        The current configuration snapshot (read-only).
+        """
+        return self.config_loader.config
+
+    @property
+    def artifacts(self) -> ParserArtifacts:
+        """
+        Derived settings for the current configuration version.
+
+        Reading this is lock-free: when the loader has swapped in a new snapshot,
+        the artifacts are rebuilt incrementally and swapped in the same way.
+        """
+        artifacts = self._artifacts
+        snapshot = self.config_loader.snapshot
+        if artifacts.version != snapshot.version:
+            try:
+                previous, artifacts = artifacts, build_parser_artifacts(snapshot, artifacts)
+            except KeyError as e:
+                logger.error(f"Ignoring configuration version {snapshot.version}: missing field {e}")
+                return artifacts
+            self._artifacts = artifacts
+            self._apply_config_change(previous, artifacts)
+        return artifacts
+
+    @property
+    def parser_config(self) -> ParserConfig:
+        """
+        The parser-specific configuration for the current version.
+        """
+        return self.artifacts.parser_config
+
+    @property
+    def strict_mode(self) -> bool:
         """
-        Extracts the parser-specific configuration.
+        Whether errors are raised instead of logged.
+        """
+        return self.parser_config.strict_mode
+
+    def _apply_config_change(self, previous: ParserArtifacts, current: ParserArtifacts) -> None:
+        """
+        Applies side effects of a configuration change (logging, retry policy, cache TTL).
+
+        Args:
+            previous (ParserArtifacts): Artifacts before the change.
+            current (ParserArtifacts): Artifacts after the change.
+        """
+        logger.info(f"Parser switched to configuration version {current.version}")
+        if current.parser_config.logging != previous.parser_config.logging:
+            setup_logger(current.parser_config.logging)
+        retry_coordinator.configure(self.config.get('retry', {}))
+        if current.parser_config.caching['ttl'] != previous.parser_config.caching['ttl']:
+            self.cache = TTLCache(maxsize=500, ttl=current.parser_config.caching['ttl'])
+
+    def _init_token_model(self) -> Optional[CompletionLengthModel]:
+        """
+        Opens the learned completion length model if it is enabled.
 
         Returns:
-            ParserConfig: The parser configuration.
+            Optional[CompletionLengthModel]: The model, or None if disabled.
         """
+        learned = self.parser_config.dynamic_token_adjustment.get('learned', {})
+        if not learned.get('enabled', False):
+            return None
         try:
-            return ParserConfig(
-                generative_ai=self.config['ai']['generative_ai'],
-                vertex_ai=self.config['ai']['vertex_ai'],
-                logging=self.config['parser']['logging'],
-                batch_processing=self.config['parser']['batch_processing'],
-                dynamic_token_adjustment=self.config['parser']['dynamic_token_adjustment'],
-                caching=self.config['parser']['caching'],
-                prompt_template=self.config['parser']['prompt_template'],
-                field_validation=self.config['parser']['field_validation'],
-                environment_specific=self.config['parser']['environment_specific'],
-                max_tokens=self.config['parser']['max_tokens'],
-                strict_mode=self.config['parser']['strict_mode']
+            return CompletionLengthModel(
+                db_path=learned.get('db_path', 'data/token_model.db'),
+                min_samples=learned.get('min_samples', 50),
+                stddevs=learned.get('stddevs', 2.0),
+                safety_margin=learned.get('safety_margin', 1.15),
+                floor=learned.get('min_tokens', 256)
             )
-        except KeyError as e:
-            log_exception(e, f"Missing required configuration field: {e}", self.config['parser'].get('strict_mode', True))
+        except Exception as e:
+            log_exception(e, "Failed to open completion length model", self.strict_mode)
+            return None
 
     def _load_spacy_model(self) -> spacy.language.Language:
         """
-        Loads the spaCy model for entity recognition.
+        Returns the spaCy model for entity recognition, reusing the preloaded shared model if present.
 
         Returns:
             spacy.language.Language: The loaded spaCy model.
         """
+        if _shared_nlp is not None:
+            logger.debug("Using preloaded spaCy model.")
+            return _shared_nlp
         try:
-            nlp = spacy.load("en_core_web_sm")
-            logger.debug("spaCy model loaded successfully.")
-            return nlp
-        except OSError:
-            logger.info("Downloading spaCy 'en_core_web_sm' model...")
-            from spacy.cli import download
-            download("en_core_web_sm")
-            nlp = spacy.load("en_core_web_sm")
-            logger.debug("spaCy model downloaded and loaded successfully.")
-            return nlp
+            return load_spacy_model()
         except Exception as e:
             log_exception(e, "Failed to load spaCy model", self.strict_mode)
 
@@ -258,11 +520,54 @@ class EmailParser:
             log_exception(e, "Failed to initialize Vertex AI client.", self.strict_mode)
 
     @performance_monitor
-    @cachedmethod(lambda self: self.cache, key=lambda self, email_content, chat_mode=False: self._generate_cache_key(email_content, chat_mode))
-    async def parse_email(self, email_content: str, chat_mode: bool = False) -> Union[Dict[str, Any], str]:
+    async def parse_email(self, email_content: str, chat_mode: bool = False,
+                          previous_state: Optional[Dict[str, Any]] = None) -> Union[Dict[str, Any], str]:
         """
         Parses a single email content using the configured AI provider with caching and performance monitoring.
 
+        Only successful results are cached, under a key that includes the
+        configuration's cache namespace, so a prompt or model change never serves
+        results produced by the previous configuration.
+
+        In chat mode with a previous state, the email is treated as a reply in a thread:
+        only the new message and the current field values are sent, and the changed
+        fields are merged into the previous state.
+
+        Args:
+            email_content (str): The content of the email to parse.
+            chat_mode (bool): Flag to enable chat-specific parsing (default: False).
+            previous_state (Optional[Dict[str, Any]]): Parsed data of the thread so far (chat mode only).
+
+        Returns:
+            Union[Dict[str, Any], str]: Parsed and validated data or error message.
+        """
+        with tracer.span("parser.parse_email", **{'email.chars': len(email_content), 'chat_mode': chat_mode,
+                                                  'thread.incremental': bool(chat_mode and previous_state)}) as span:
+            with tracer.span("cache.lookup") as lookup:
+                cache_key = self._generate_cache_key(email_content, chat_mode, previous_state)
+                cached = self.cache.get(cache_key)
+                lookup.set_attribute('cache.hit', cached is not None)
+            if cached is not None:
+                logger.debug("Returning cached parse result.")
+                return cached
+
+            if chat_mode and previous_state:
+                result = await self._parse_thread_reply(email_content, previous_state)
+            else:
+                result = await self._parse_email_uncached(email_content, chat_mode)
+            success = isinstance(result, dict) and 'error' not in result
+            span.set_attribute('parse.success', success)
+            if success:
+                self.cache[cache_key] = result
+            return result
+
+    async def _parse_email_uncached(self, email_content: str, chat_mode: bool = False) -> Union[Dict[str, Any], str]:
+        """
+        Parses a single email with the AI provider, bypassing the cache.
+
+        Emails longer than chunking.threshold_chars are extracted chunk by chunk
+        (see _extract_chunked); shorter ones in a single request.
+
         Args:
             email_content (str): The content of the email to parse.
             chat_mode (bool): Flag to enable chat-specific parsing (default: False).
@@ -271,26 +576,164 @@ class EmailParser:
             Union[Dict[str, Any], str]: Parsed and validated data or error message.
         """
         try:
-            tokens = self._determine_token_limit(email_content)
+            chunking = self.parser_config.chunking
+            if chunking.get('enabled', True) and len(email_content) > chunking.get('threshold_chars', 12000):
+                parsed_data = await self._extract_chunked(email_content)
+            else:
+                parsed_data = await self._extract_fields(email_content)
+            if not isinstance(parsed_data, dict) or 'error' in parsed_data:
+                return parsed_data
+
+            parsed_data = await self._repair_invalid_fields(email_content, parsed_data)
+            validated_data = self._validate_parsed_fields(parsed_data)
+            return validated_data
+
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            log_exception(e, "Unexpected error during parsing", self.strict_mode)
+            return "Internal error during parsing."
+
+    async def _extract_fields(self, email_content: str) -> Union[Dict[str, Any], str]:
+        """
+        Extracts the form from an email (or one chunk of it) in a single provider request.
+
+        Args:
+            email_content (str): The email content.
+
+        Returns:
+            Union[Dict[str, Any], str]: Parsed (not yet validated) data, {'error': ...} or error message.
+        """
+        with tracer.span("extract.fields", **{'email.chars': len(email_content)}) as span:
+            tokens, features, predicted = self._determine_token_limit(email_content)
+            span.set_attributes(max_tokens=tokens, **{'max_tokens.predicted': predicted})
             prompt = self._prepare_prompt(email_content)
             response = await self.send_request_with_retry(prompt, tokens)
             if 'error' in response:
                 logger.error(f"AI provider error: {response['error']}")
                 return {'error': response['error']}
-            
+
             completion = self._extract_completion(response)
+            if features is not None and self.token_model is not None:
+                truncated = await self._observe_completion(features, response, completion, tokens, predicted)
+                span.set_attribute('truncated', truncated)
+                if truncated and predicted:
+                    # The learned limit was too tight for this email: retry once with the configured ceiling
+                    tokens = self._token_ceiling()
+                    logger.info(f"Completion truncated at a predicted limit; retrying with max_tokens={tokens}")
+                    response = await self.send_request_with_retry(prompt, tokens)
+                    if 'error' in response:
+                        logger.error(f"AI provider error: {response['error']}")
+                        return {'error': response['error']}
+                    completion = self._extract_completion(response)
+                    await self._observe_completion(features, response, completion, tokens, False)
+
             if not completion:
                 logger.warning("Empty completion received from AI provider.")
                 return "No valid completion generated."
 
-            parsed_data = self._parse_response(completion)
-            validated_data = self._validate_parsed_fields(parsed_data)
-            return validated_data
+            return self._parse_response(completion)
+
+    async def _extract_chunked(self, email_content: str) -> Union[Dict[str, Any], str]:
+        """
+        Extracts the form from a long email chunk by chunk and merges the partial forms.
+
+        Chunks are split on message and section boundaries and extracted concurrently
+        within the concurrency limit, so latency follows the chunk size rather than the
+        email length. If any chunk fails the whole parse fails, so no field is silently lost.
+
+        Args:
+            email_content (str): The email content.
+
+        Returns:
+            Union[Dict[str, Any], str]: Merged parsed (not yet validated) data, {'error': ...} or error message.
+        """
+        chunks = split_email(email_content, self.parser_config.chunking.get('chunk_chars', 6000))
+        logger.info(f"Extracting {len(email_content)} characters in {len(chunks)} chunks")
+        current_span().set_attribute('chunks', len(chunks))
+        semaphore = asyncio.Semaphore(self._get_concurrency_limit())
+
+        async def extract(chunk: str) -> Union[Dict[str, Any], str]:
+            async with semaphore:
+                return await self._extract_fields(chunk)
+
+        parts = await asyncio.gather(*(extract(chunk) for chunk in chunks))
+        for index, part in enumerate(parts):
+            if isinstance(part, dict) and 'error' in part:
+                return {'error': f"Chunk {index + 1} of {len(chunks)}: {part['error']}"}
+            if not isinstance(part, dict):
+                logger.warning(f"Chunk {index + 1} of {len(chunks)} produced no fields: {part}")
+                return part if isinstance(part, str) else "Internal error during parsing."
+
+        patterns = self.artifacts.field_patterns
+
+        def is_valid(key: str, value: str) -> bool:
+            pattern = patterns.get(f"{registry_field(key)}_pattern")
+            return pattern is None or bool(pattern.match(value))
+
+        return merge_partial_forms(parts, is_valid)
+
+    async def _parse_thread_reply(self, email_content: str, previous_state: Dict[str, Any]) -> Union[Dict[str, Any], str]:
+        """
+        Parses a reply incrementally against the thread's previous state.
+
+        Args:
+            email_content (str): The reply as received (quoted history is removed).
+            previous_state (Dict[str, Any]): Parsed data of the thread so far.
+
+        Returns:
+            Union[Dict[str, Any], str]: The merged parsed data or error message.
+        """
+        try:
+            new_message = strip_quoted_history(email_content)
+            logger.debug(f"Thread reply: {len(new_message)} of {len(email_content)} characters are new.")
+            current_span().set_attribute('thread.new_chars', len(new_message))
+            with tracer.span("prompt.build", template='thread') as span:
+                prompt = self.artifacts.thread_prompt.render(render_current_fields(previous_state), new_message)
+                span.set_attribute('prompt.chars', len(prompt))
+            response = await self.send_request_with_retry(prompt, self.parser_config.max_tokens)
+            if 'error' in response:
+                logger.error(f"AI provider error: {response['error']}")
+                return {'error': response['error']}
 
+            completion = self._extract_completion(response)
+            if not completion:
+                logger.warning("Empty completion received from AI provider.")
+                return "No valid completion generated."
+
+            changes = await self._repair_invalid_fields(new_message, self._parse_response(completion))
+            changes = self._validate_parsed_fields(changes)
+            logger.debug(f"Thread reply changed {sum(len(fields) for fields in changes.values())} fields.")
+            return merge_changes(previous_state, changes)
+
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            log_exception(e, "Unexpected error during parsing", self.strict_mode)
+            log_exception(e, "Unexpected error during thread parsing", self.strict_mode)
             return "Internal error during parsing."
 
+    async def parse_raw_email(self, raw_email: bytes, chat_mode: bool = False,
+                              previous_state: Optional[Dict[str, Any]] = None) -> Union[Dict[str, Any], str]:
+        """
+        Parses a raw RFC 822 (.eml) message.
+
+        Only the selected headers and the best text part (HTML converted to text) are
+        sent to the AI provider; attachment payloads are skipped without being decoded.
+
+        Args:
+            raw_email (bytes): The raw message bytes.
+            chat_mode (bool): Flag to enable chat-specific parsing (default: False).
+            previous_state (Optional[Dict[str, Any]]): Parsed data of the thread so far (chat mode only).
+
+        Returns:
+            Union[Dict[str, Any], str]: Parsed and validated data or error message.
+        """
+        email_content = extract_email_text(raw_email)
+        logger.debug(f"Extracted {len(email_content)} characters of text from {len(raw_email)} byte message.")
+        if not email_content.strip():
+            return {'error': "No text content found in message"}
+        return await self.parse_email(email_content, chat_mode, previous_state)
+
     async def parse_emails(self, email_contents: List[str], chat_mode: bool = False) -> List[Union[Dict[str, Any], str]]:
         """
         Parses multiple email contents in batch using the configured AI provider with caching and performance monitoring.
@@ -308,40 +751,137 @@ class EmailParser:
                 tasks.append(self.parse_email(content, chat_mode))
             
             # Limit concurrency based on configuration
-            semaphore = asyncio.Semaphore(self.config['parser']['environment_specific'].get('development', {}).get('concurrency_limit', 10) if os.getenv('FLASK_ENV', 'development') == 'development' else self.config['parser']['environment_specific'].get('production', {}).get('concurrency_limit', 10))
+            semaphore = asyncio.Semaphore(self._get_concurrency_limit())
             async def sem_task(task):
                 async with semaphore:
                     return await task
 
             wrapped_tasks = [sem_task(task) for task in tasks]
-            results = await asyncio.gather(*wrapped_tasks, return_exceptions=False)
-            return results
+            results = await asyncio.gather(*wrapped_tasks, return_exceptions=True)
+            # Isolate per-email failures so one bad email does not fail the whole batch
+            return [{'error': str(result)} if isinstance(result, Exception) else result for result in results]
 
         except Exception as e:
             log_exception(e, "Unexpected error during batch parsing", self.strict_mode)
             return [f"Internal error during parsing: {e}"] * len(email_contents)
 
+    async def iter_parse_emails(self, email_contents: Union[Iterable[str], AsyncIterable[str]],
+                                chat_mode: bool = False) -> AsyncIterator[Tuple[int, Union[Dict[str, Any], str]]]:
+        """
+        Parses emails concurrently and yields results as soon as each one finishes.
+
+        Results are yielded out of order, tagged with the position of the email in the input.
+        At most ``concurrency_limit`` parses are in flight, and the input is consumed only as
+        fast as slots free up, so large (or streamed) inputs are never fully buffered.
+
+        Args:
+            email_contents (Union[Iterable[str], AsyncIterable[str]]): Email contents to parse.
+            chat_mode (bool): Flag to enable chat-specific parsing (default: False).
+
+        Yields:
+            Tuple[int, Union[Dict[str, Any], str]]: Input index and parsed data or error.
+        """
+        limit = self._get_concurrency_limit()
+        items = _aiterate(email_contents)
+        pending = set()
+        next_item = None  # Task reading the next input item, while a slot is free
+        exhausted = False
+        index = 0
+        try:
+            while pending or not exhausted:
+                if not exhausted and next_item is None and len(pending) < limit:
+                    next_item = asyncio.ensure_future(items.__anext__())
+                # Wait for input and parses together, so a finished parse is never held
+                # back behind a slow (streamed) input read
+                waiting = pending | {next_item} if next_item is not None else pending
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is next_item:
+                        next_item = None
+                        try:
+                            content = task.result()
+                        except StopAsyncIteration:
+                            exhausted = True
+                            continue
+                        pending.add(asyncio.create_task(self._parse_indexed(index, content, chat_mode)))
+                        index += 1
+                    else:
+                        pending.discard(task)
+                        yield task.result()
+        finally:
+            # Consumer went away (e.g. client disconnected); drop work nobody will read
+            if next_item is not None:
+                next_item.cancel()
+                # A generator cannot be closed while the read is still running in it
+                await asyncio.wait({next_item})
+            for task in pending:
+                task.cancel()
+            # Close the input now rather than on garbage collection, so its cleanup runs
+            # (e.g. token budget settling in a caller's generator)
+            await items.aclose()
+            if hasattr(email_contents, 'aclose'):
+                await email_contents.aclose()
+
+    async def _parse_indexed(self, index: int, email_content: str,
+                             chat_mode: bool) -> Tuple[int, Union[Dict[str, Any], str]]:
+        """
+        Parses a single email for batch processing, converting exceptions into error results.
+
+        Args:
+            index (int): Position of the email in the batch.
+            email_content (str): The content of the email to parse.
+            chat_mode (bool): Chat mode flag.
+
+        Returns:
+            Tuple[int, Union[Dict[str, Any], str]]: Input index and parsed data or error.
+        """
+        if not isinstance(email_content, str) or not email_content.strip():
+            return index, {'error': "Invalid email content provided"}
+        try:
+            return index, await self.parse_email(email_content, chat_mode)
+        except Exception as e:
+            logger.error(f"Batch item {index} failed: {e}")
+            return index, {'error': str(e)}
+
+    def _get_concurrency_limit(self) -> int:
+        """
+        Resolves the concurrency limit for the current environment.
+
+        Returns:
+            int: Maximum number of concurrent parsing tasks.
+        """
+        return self.artifacts.concurrency_limit
+
     async def send_request_with_retry(self, prompt: str, max_tokens: int) -> Dict[str, Any]:
         """
         Sends a request to the configured AI provider with retry logic.
 
+        This is the only layer that retries provider calls; retries go through the
+        process-wide retry coordinator (jittered backoff, shared retry budget).
+
         Args:
             prompt (str): The prompt to send to the AI provider.
             max_tokens (int): Maximum number of tokens for the AI response.
 
         Returns:
-            Dict[str, Any]: Response from the AI provider.
+            Dict[str, Any]: Response from the AI provider, or {'error': ...} on failure.
         """
         try:
-            response = await self._send_ai_request(prompt, max_tokens)
+            with tracer.span("provider.request", max_tokens=max_tokens, **{'prompt.chars': len(prompt)}):
+                response = await retry_coordinator.run(self._send_ai_request, prompt, max_tokens)
             return response
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             log_exception(e, "AI request failed after retries", self.strict_mode)
+            return {'error': f"AI request failed: {e}"}
 
     async def _send_ai_request(self, prompt: str, max_tokens: int) -> Dict[str, Any]:
         """
         Sends a request to the AI provider based on the configured provider.
 
+        The call is bounded by the remaining request deadline and is cancelled once it passes.
+
         Args:
             prompt (str): The prompt to send.
             max_tokens (int): Maximum tokens for the response.
@@ -349,14 +889,29 @@ class EmailParser:
         Returns:
             Dict[str, Any]: AI provider response.
         """
-        if self.ai_provider == "google":
-            return await self._send_google_generative_ai_request(prompt, max_tokens)
-        elif self.ai_provider == "vertex_ai":
-            return await self._send_vertex_ai_request(prompt, max_tokens)
-        else:
-            error_msg = f"Unsupported AI provider: {self.ai_provider}"
-            logger.error(error_msg)
-            raise ValueError(error_msg)
+        with tracer.span("provider.attempt", provider=self.ai_provider, max_tokens=max_tokens) as span:
+            check_deadline()
+            start = time.perf_counter()
+            if self.ai_provider == "google":
+                response = await run_with_deadline(self._send_google_generative_ai_request(prompt, max_tokens))
+            elif self.ai_provider == "vertex_ai":
+                response = await run_with_deadline(self._send_vertex_ai_request(prompt, max_tokens))
+            else:
+                error_msg = f"Unsupported AI provider: {self.ai_provider}"
+                logger.error(error_msg)
+                raise ValueError(error_msg)
+            usage = response.get('usage') if isinstance(response, dict) else None
+            span.set_attributes(**{f'tokens.{key}': value for key, value in (usage or {}).items()})
+            if isinstance(response, dict):
+                span.set_attribute('finish_reason', response.get('finish_reason'))
+            self.prompt_stats.record(len(prompt), self.artifacts.prompt.prefix_tokens, time.perf_counter() - start, usage)
+            # Provider-reported token counts when available, otherwise estimated from the text lengths
+            completion = response.get('text') if isinstance(response, dict) else None
+            record_usage(
+                (usage or {}).get('input_tokens') or len(prompt) // CHARS_PER_TOKEN + 1,
+                (usage or {}).get('output_tokens') or len(completion or '') // CHARS_PER_TOKEN
+            )
+            return response
 
     async def _send_google_generative_ai_request(self, prompt: str, max_tokens: int) -> Dict[str, Any]:
         """
@@ -373,11 +928,12 @@ class EmailParser:
             response = await self.client.generate_text(
                 prompt=prompt,
                 max_tokens=max_tokens,
-                **self.generation_config
+                **self.parser_config.generation_config
             )
-            return {"text": response.text}
+            return {"text": response.text, "usage": _usage_metadata(response), "finish_reason": _finish_reason(response)}
         except Exception as e:
-            log_exception(e, "Google Generative AI request failed", self.strict_mode)
+            logger.warning(f"Google Generative AI request failed: {e}")
+            raise
 
     async def _send_vertex_ai_request(self, prompt: str, max_tokens: int) -> Dict[str, Any]:
         """
@@ -392,46 +948,140 @@ class EmailParser:
         """
         try:
             instances = [{"prompt": prompt}]
-            parameters = {"max_tokens": max_tokens, **self.generation_config}
+            parameters = {"max_tokens": max_tokens, **self.parser_config.generation_config}
             request = PredictRequest(
                 endpoint=self.config['ai']['vertex_ai']['model_name'],
                 instances=instances,
                 parameters=parameters
             )
-            response = self.client.predict(request=request)
+            # The blocking gRPC call runs off the event loop with the remaining deadline as its timeout
+            remaining = remaining_time()
+            timeout_kwargs = {'timeout': remaining} if remaining is not None else {}
+            response = await asyncio.to_thread(self.client.predict, request=request, **timeout_kwargs)
             if not response.predictions:
                 raise ValueError("Empty response from Vertex AI")
             return response.predictions[0]
         except Exception as e:
-            log_exception(e, "Vertex AI request failed", self.strict_mode)
+            logger.warning(f"Vertex AI request failed: {e}")
+            raise
+
+    def _token_ceiling(self) -> int:
+        """
+        The largest max_tokens a request may be sent with.
 
-    def _determine_token_limit(self, email_content: str) -> int:
+        Returns:
+            int: max_tokens_threshold when dynamic adjustment is enabled, otherwise max_tokens.
+        """
+        parser_config = self.parser_config
+        if parser_config.dynamic_token_adjustment.get('enabled', False):
+            return max(parser_config.max_tokens,
+                       parser_config.dynamic_token_adjustment.get('max_tokens_threshold', parser_config.max_tokens))
+        return parser_config.max_tokens
+
+    def _determine_token_limit(self, email_content: str) -> Tuple[int, Optional[EmailFeatures], bool]:
         """
         Determines the token limit based on email content characteristics.
 
+        Once the learned completion length model has enough observations, the limit is
+        its prediction plus a safety margin; until then the entity/keyword heuristic applies.
+
         Args:
             email_content (str): The email content.
 
         Returns:
-            int: The determined token limit.
+            Tuple[int, Optional[EmailFeatures], bool]: The token limit, the email features
+            (None when dynamic adjustment is disabled) and whether the limit was predicted.
         """
         try:
-            if self.dynamic_token_adjustment.get('enabled', False):
-                doc = self.nlp(email_content)
-                num_entities = len(doc.ents)
-                keyword_density = self._calculate_keyword_density(doc)
-
-                logger.debug(f"Number of entities: {num_entities}, Keyword density: {keyword_density}")
+            if self.parser_config.dynamic_token_adjustment.get('enabled', False):
+                with tracer.span("nlp.analyze", **{'email.chars': len(email_content)}) as span:
+                    doc = self.nlp(email_content)
+                    num_entities = len(doc.ents)
+                    keyword_density = self._calculate_keyword_density(doc)
+                    features = email_features(email_content, num_entities, keyword_density)
+                    span.set_attributes(entities=num_entities, keyword_density=round(keyword_density, 4),
+                                        quoted_messages=features.quoted_messages)
+
+                logger.debug(f"Number of entities: {num_entities}, Keyword density: {keyword_density}, "
+                             f"Quoted messages: {features.quoted_messages}")
+
+                if self.token_model is not None:
+                    predicted = self.token_model.predict(features, self._token_ceiling())
+                    if predicted is not None:
+                        logger.debug(f"Predicted max_tokens {predicted} from learned completion lengths.")
+                        return predicted, features, True
 
                 tokens = self.parser_config.max_tokens
                 if num_entities > 10 or keyword_density > 0.05:
-                    tokens = min(tokens + 500, self.dynamic_token_adjustment.get('max_tokens_threshold', 2000))
+                    tokens = min(tokens + 500, self.parser_config.dynamic_token_adjustment.get('max_tokens_threshold', 2000))
                     logger.debug(f"Dynamically adjusted max_tokens to {tokens} based on entities or keyword density.")
-                return tokens
+                return tokens, features, False
             else:
-                return self.parser_config.max_tokens
+                return self.parser_config.max_tokens, None, False
         except Exception as e:
             log_exception(e, "Error determining token limit", self.strict_mode)
+            return self.parser_config.max_tokens, None, False
+
+    async def _observe_completion(self, features: EmailFeatures, response: Dict[str, Any],
+                                  completion: Optional[str], max_tokens: int, predicted: bool) -> bool:
+        """
+        Feeds a completion's length to the learned model.
+
+        Args:
+            features (EmailFeatures): Features of the email.
+            response (Dict[str, Any]): Provider response.
+            completion (Optional[str]): Completion text.
+            max_tokens (int): Limit the request was sent with.
+            predicted (bool): Whether the limit came from the model.
+
+        Returns:
+            bool: Whether the completion was truncated at max_tokens.
+        """
+        usage = response.get('usage') or {}
+        output_tokens = usage.get('output_tokens') or len(completion or '') // CHARS_PER_TOKEN
+        truncated = _is_truncated(response, output_tokens, max_tokens)
+        if truncated:
+            logger.warning(f"Completion truncated at max_tokens={max_tokens} (predicted={predicted})")
+        try:
+            if self.token_model.observe(features, output_tokens, max_tokens, predicted, truncated):
+                await asyncio.to_thread(self.token_model.flush)
+        except Exception as e:
+            logger.error(f"Failed to record completion length: {e}")
+        return truncated
+
+    def estimate_token_split(self, email_content: str) -> Tuple[int, int]:
+        """
+        Cheaply estimates the prompt tokens of a parse and its completion budget.
+
+        Uses a characters-per-token heuristic and the upper bound of the completion
+        budget, so it needs no spaCy pass and never under-charges.
+
+        Args:
+            email_content (str): The email content.
+
+        Returns:
+            Tuple[int, int]: Estimated input tokens and maximum output tokens.
+        """
+        prompt = self.artifacts.prompt
+        chunking = self.parser_config.chunking
+        requests = 1
+        if chunking.get('enabled', True) and len(email_content) > chunking.get('threshold_chars', 12000):
+            # Long emails are extracted chunk by chunk; each chunk repeats the instructions
+            requests = len(split_email(email_content, chunking.get('chunk_chars', 6000)))
+        prompt_tokens = (requests * (len(prompt.prefix) + len(prompt.suffix)) + len(email_content)) // CHARS_PER_TOKEN + 1
+        return prompt_tokens, requests * self._token_ceiling()
+
+    def estimate_request_tokens(self, email_content: str) -> int:
+        """
+        Cheaply estimates the provider tokens a parse may consume (prompt plus completion budget).
+
+        Args:
+            email_content (str): The email content.
+
+        Returns:
+            int: Estimated total tokens.
+        """
+        return sum(self.estimate_token_split(email_content))
 
     def _calculate_keyword_density(self, doc: spacy.tokens.Doc) -> float:
         """
@@ -454,7 +1104,7 @@ class EmailParser:
 
     def _prepare_prompt(self, email_content: str) -> str:
         """
-        Prepares the AI prompt by injecting email content into the prompt template.
+        Prepares the AI prompt: the compiled instruction prefix followed by the email.
 
         Args:
             email_content (str): The email content.
@@ -463,7 +1113,10 @@ class EmailParser:
             str: The prepared prompt.
         """
         try:
-            prompt = self.prompt_template.replace('{{email_content}}', email_content)
+            # The template is compiled once per configuration version into a static prefix and tail
+            with tracer.span("prompt.build", template='parse') as span:
+                prompt = self.artifacts.prompt.render(email_content)
+                span.set_attribute('prompt.chars', len(prompt))
             logger.debug("Prompt prepared successfully.")
             return prompt
         except Exception as e:
@@ -479,35 +1132,37 @@ class EmailParser:
         Returns:
             Dict[str, Any]: Parsed data.
         """
-        try:
-            parsed_data = {}
-            current_section = None
-
-            for line in response.split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                if line.startswith('**') and line.endswith('**'):
-                    section_name = self._extract_section_name(line)
-                    parsed_data[section_name] = {}
-                    current_section = section_name
-                    logger.debug(f"Parsing section: {section_name}")
-                elif line.startswith('-') and current_section:
-                    key, value = self._extract_key_value(line)
-                    if key and value:
-                        if key in parsed_data[current_section] and parsed_data[current_section][key] == value:
-                            logger.warning(f"Loop detected for field '{key}' with value '{value}'.")
-                            if self.strict_mode:
-                                raise ValueError(f"Loop detected in parsing for field '{key}'.")
+        with tracer.span("response.parse", **{'completion.chars': len(response)}) as span:
+            try:
+                parsed_data = {}
+                current_section = None
+
+                for line in response.split('\n'):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    if line.startswith('**') and line.endswith('**'):
+                        section_name = self._extract_section_name(line)
+                        parsed_data[section_name] = {}
+                        current_section = section_name
+                        logger.debug(f"Parsing section: {section_name}")
+                    elif line.startswith('-') and current_section:
+                        key, value = self._extract_key_value(line)
+                        if key and value:
+                            if key in parsed_data[current_section] and parsed_data[current_section][key] == value:
+                                logger.warning(f"Loop detected for field '{key}' with value '{value}'.")
+                                if self.strict_mode:
+                                    raise ValueError(f"Loop detected in parsing for field '{key}'.")
+                                else:
+                                    parsed_data[current_section][key] = f"{value} (Loop Detected)"
                             else:
-                                parsed_data[current_section][key] = f"{value} (Loop Detected)"
-                        else:
-                            parsed_data[current_section][key] = value
-                            logger.debug(f"Parsed field '{key}': '{value}'")
-            logger.debug(f"Parsed data: {parsed_data}")
-            return parsed_data
-        except Exception as e:
-            log_exception(e, "Error parsing AI response", self.strict_mode)
+                                parsed_data[current_section][key] = value
+                                logger.debug(f"Parsed field '{key}': '{value}'")
+                logger.debug(f"Parsed data: {parsed_data}")
+                span.set_attribute('fields', sum(len(fields) for fields in parsed_data.values()))
+                return parsed_data
+            except Exception as e:
+                log_exception(e, "Error parsing AI response", self.strict_mode)
 
     def _extract_section_name(self, line: str) -> str:
         """
@@ -557,33 +1212,108 @@ class EmailParser:
         Returns:
             Dict[str, Any]: Validated data.
         """
-        try:
-            validated_data = {}
-            for section, fields in parsed_data.items():
-                validated_data[section] = {}
-                for key, value in fields.items():
-                    pattern_key = f"{key}_pattern"
-                    pattern = self.field_validation.get(pattern_key)
-
-                    if pattern and value != "N/A":
-                        if not re.match(pattern, value):
-                            logger.warning(f"Validation failed for field '{key}': Value='{value}', Expected Pattern='{pattern}'")
-                            if self.strict_mode:
-                                raise ValueError(f"Validation failed for field '{key}' with value '{value}'")
+        with tracer.span("fields.validate") as span:
+            try:
+                validated_data = {}
+                for section, fields in parsed_data.items():
+                    validated_data[section] = {}
+                    for key, value in fields.items():
+                        pattern_key = f"{registry_field(key)}_pattern"
+                        pattern = self.parser_config.field_validation.get(pattern_key)
+
+                        if pattern and value != "N/A":
+                            if not self.artifacts.field_patterns[pattern_key].match(value):
+                                logger.warning(f"Validation failed for field '{key}': Value='{value}', Expected Pattern='{pattern}'")
+                                if self.strict_mode:
+                                    raise ValueError(f"Validation failed for field '{key}' with value '{value}'")
+                                else:
+                                    validated_data[section][key] = f"{value} (Invalid Format)"
                             else:
-                                validated_data[section][key] = f"{value} (Invalid Format)"
+                                validated_data[section][key] = value
+                                logger.debug(f"Field '{key}' validated successfully.")
                         else:
                             validated_data[section][key] = value
-                            logger.debug(f"Field '{key}' validated successfully.")
-                    else:
-                        validated_data[section][key] = value
-                        logger.debug(f"Field '{key}' does not require validation.")
-            if self._detect_repeated_patterns(validated_data):
-                logger.warning("Repeated output patterns detected in validated data.")
-            logger.debug(f"Validated data: {validated_data}")
-            return validated_data
-        except Exception as e:
-            log_exception(e, "Error validating parsed fields", self.strict_mode)
+                            logger.debug(f"Field '{key}' does not require validation.")
+                if self._detect_repeated_patterns(validated_data):
+                    logger.warning("Repeated output patterns detected in validated data.")
+                logger.debug(f"Validated data: {validated_data}")
+                span.set_attribute('fields', sum(len(fields) for fields in validated_data.values()))
+                return validated_data
+            except Exception as e:
+                log_exception(e, "Error validating parsed fields", self.strict_mode)
+
+    def _find_invalid_fields(self, parsed_data: Dict[str, Any]) -> List[Tuple[str, str, str, str]]:
+        """
+        Lists the parsed fields whose values do not match their validation patterns.
+
+        Args:
+            parsed_data (Dict[str, Any]): The parsed data.
+
+        Returns:
+            List[Tuple[str, str, str, str]]: Section, field key, value and pattern key of each invalid field.
+        """
+        invalid = []
+        patterns = self.artifacts.field_patterns
+        for section, fields in parsed_data.items():
+            for key, value in fields.items():
+                pattern_key = f"{registry_field(key)}_pattern"
+                if pattern_key in patterns and value != "N/A" and not patterns[pattern_key].match(value):
+                    invalid.append((section, key, value, pattern_key))
+        return invalid
+
+    async def _repair_invalid_fields(self, email_content: str, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Re-asks the provider for the fields that fail validation, with a minimal prompt.
+
+        Only the failed fields, their patterns and the email lines they came from are
+        sent, with a small max_tokens. Corrected values are patched in when they pass
+        validation; the others are left for _validate_parsed_fields to report.
+
+        Args:
+            email_content (str): The email content the fields were extracted from.
+            parsed_data (Dict[str, Any]): The parsed data (patched in place).
+
+        Returns:
+            Dict[str, Any]: The parsed data.
+        """
+        repair_config = self.parser_config.field_repair
+        if not parsed_data or not repair_config.get('enabled', True):
+            return parsed_data
+        invalid = self._find_invalid_fields(parsed_data)
+        if not invalid:
+            return parsed_data
+
+        snippet_chars = repair_config.get('snippet_chars', 300)
+        failures = [
+            FieldFailure(section=section, key=key, value=value,
+                         pattern=self.parser_config.field_validation[pattern_key],
+                         snippet=find_snippet(email_content, key, value, snippet_chars))
+            for section, key, value, pattern_key in invalid
+        ]
+        max_tokens = 20 + repair_config.get('max_tokens_per_field', 30) * len(failures)
+        logger.info(f"Repairing {len(failures)} invalid fields with max_tokens={max_tokens}")
+        self.repair_stats['calls'] += 1
+        self.repair_stats['fields'] += len(failures)
+
+        with tracer.span("fields.repair", fields=len(failures), max_tokens=max_tokens) as span:
+            response = await self.send_request_with_retry(build_repair_prompt(failures), max_tokens)
+            completion = self._extract_completion(response) if 'error' not in response else None
+            if not completion:
+                logger.warning("Field repair returned no completion.")
+                return parsed_data
+
+            corrected = parse_repair_response(completion)
+            patterns = self.artifacts.field_patterns
+            repaired = 0
+            for section, key, value, pattern_key in invalid:
+                candidate = corrected.get(key.lower())
+                if candidate and candidate != "N/A" and patterns[pattern_key].match(candidate):
+                    logger.debug(f"Repaired field '{key}': '{value}' -> '{candidate}'")
+                    parsed_data[section][key] = candidate
+                    repaired += 1
+            self.repair_stats['repaired'] += repaired
+            span.set_attribute('repaired', repaired)
+        return parsed_data
 
     def _detect_repeated_patterns(self, data: Dict[str, Any]) -> bool:
         """
@@ -615,22 +1345,42 @@ class EmailParser:
             logger.error(f"Error detecting repeated patterns: {e}")
             return False
 
-    def _generate_cache_key(self, email_content: str, chat_mode: bool = False) -> str:
+    def _generate_cache_key(self, email_content: str, chat_mode: bool = False,
+                            previous_state: Optional[Dict[str, Any]] = None) -> str:
         """
-        Generates a unique cache key based on email content and chat mode.
+        Generates a unique cache key based on the configuration's cache namespace, email content, chat mode
+        and, for thread replies, the previous state.
 
         Args:
             email_content (str): The email content.
             chat_mode (bool): Chat mode flag.
+            previous_state (Optional[Dict[str, Any]]): Thread state the reply is merged into.
 
         Returns:
             str: The generated cache key.
         """
-        hash_input = f"{email_content}|{chat_mode}"
+        state = json.dumps(previous_state, sort_keys=True) if chat_mode and previous_state else ''
+        hash_input = f"{self.artifacts.cache_namespace}|{email_content}|{chat_mode}|{state}"
         cache_key = hashlib.sha256(hash_input.encode('utf-8')).hexdigest()
         logger.debug(f"Generated cache key: {cache_key}")
         return cache_key
 
+    def _get_session(self) -> ClientSession:
+        """
+        Returns the aiohttp session, creating it on first use.
+
+        Returns:
+            ClientSession: Shared aiohttp session.
+        """
+        if self.session is None or self.session.closed:
+            self.session = ClientSession(
+                headers={
+                    "Content-Type": "application/json"
+                },
+                timeout=ClientTimeout(total=200)  # Timeout set to 200 seconds
+            )
+        return self.session
+
     def clear_cache(self) -> None:
         """
         Clears the cache manually.
@@ -643,13 +1393,16 @@ class EmailParser:
     @performance_monitor
     async def close(self):
         """
-        Closes the aiohttp session gracefully.
+        Closes the aiohttp session gracefully and saves the completion length model.
         """
         try:
-            await self.session.close()
+            if self.session is not None:
+                await self.session.close()
             logger.debug("Aiohttp session closed successfully.")
         except Exception as e:
             logger.error(f"Error closing aiohttp session: {e}")
+        if self.token_model is not None:
+            await asyncio.to_thread(self.token_model.close)
 
     def _extract_completion(self, response: Dict[str, Any]) -> Optional[str]:
         """
@@ -672,3 +1425,37 @@ class EmailParser:
         except Exception as e:
             logger.error(f"Error extracting completion from response: {e}")
             return None
+
+
+def format_parse_result(result: Union[Dict[str, Any], str]) -> Dict[str, Any]:
+    """
+    Normalizes a parse_email return value into a {'result': ...} or {'error': ...} entry.
+
+    Args:
+        result (Union[Dict[str, Any], str]): Parsed data, error dict or error message.
+
+    Returns:
+        Dict[str, Any]: Normalized result entry.
+    """
+    if isinstance(result, dict) and 'error' not in result:
+        return {'result': result}
+    if isinstance(result, dict):
+        return {'error': result['error']}
+    return {'error': str(result)}
+
+async def _aiterate(items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    """
+    Iterates over a synchronous or asynchronous iterable uniformly.
+
+    Args:
+        items (Union[Iterable[Any], AsyncIterable[Any]]): Items to iterate over.
+
+    Yields:
+        Any: Each item in turn.
+    """
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
@@ -0,0 +1,305 @@
+# prefork.py
+"""
+Pre-fork serving mode.
+
+The master process loads the read-only artifacts (spaCy model, compiled field
+registry, heavy library modules), freezes them out of the garbage collector and
+then forks the uvicorn workers, which share those pages copy-on-write instead of
+each loading their own copy. Per-process clients (gRPC channels, aiohttp
+sessions, caches) are still created in each worker by the application lifespan,
+after the fork.
+
+The master supervises the workers and periodically logs each worker's private
+memory (USS) and proportional share (PSS). A worker that dies is restarted;
+crashes shortly after start are restarted with exponential backoff, and the
+master gives up (and exits non-zero) if workers keep crashing.
+
+Usage:
+    python prefork.py --host 0.0.0.0 --port 8080 --workers 4
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import socket
+import signal
+import logging
+import argparse
+import importlib
+import traceback
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+import psutil
+
+logger = logging.getLogger("prefork")
+
+# Modules imported by the master so their code objects are shared with the workers.
+# Importing them must not create threads, sockets or gRPC channels.
+PRELOAD_MODULES = ('fastapi', 'starlette', 'orjson', 'exporter', 'mime_extractor', 'parser')
+
+# Exit code of a worker whose application failed to start (same as uvicorn's)
+STARTUP_FAILURE = 3
+
+# A worker that exits within this many seconds of starting counts as crash-looping
+MIN_UPTIME = 10.0
+RESTART_DELAY_MAX = 60.0
+
+def preload(config_path: str) -> None:
+    """
+    Loads shared read-only artifacts into the master and freezes them.
+
+    Args:
+        config_path (str): Configuration file path.
+    """
+    from config_loader import ConfigLoader
+
+    # Keep the collector from touching (and thereby copying) shared pages
+    gc.disable()
+    for module in PRELOAD_MODULES:
+        importlib.import_module(module)
+
+    from parser import preload_shared_artifacts
+    config = ConfigLoader.read_config(config_path)
+    preload_shared_artifacts(config['parser']['field_validation'])
+
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Preloaded shared artifacts; {gc.get_freeze_count()} objects frozen")
+
+def memory_report(pids: List[int]) -> Dict[str, Any]:
+    """
+    Measures per-worker memory.
+
+    USS (unique set size) is the memory private to a worker, i.e. what it costs
+    to add one more worker; PSS splits shared pages evenly across their users.
+
+    Args:
+        pids (List[int]): Worker process ids.
+
+    Returns:
+        Dict[str, Any]: Per-worker and total memory in MB.
+    """
+    workers = {}
+    for pid in pids:
+        try:
+            info = psutil.Process(pid).memory_full_info()
+            workers[pid] = {
+                'rss_mb': round(info.rss / (1024 * 1024), 2),
+                'uss_mb': round(info.uss / (1024 * 1024), 2),
+                'pss_mb': round(getattr(info, 'pss', 0) / (1024 * 1024), 2),
+            }
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    master = psutil.Process(os.getpid()).memory_full_info()
+    return {
+        'master_rss_mb': round(master.rss / (1024 * 1024), 2),
+        'workers': workers,
+        'total_uss_mb': round(sum(worker['uss_mb'] for worker in workers.values()), 2),
+        'total_pss_mb': round(sum(worker['pss_mb'] for worker in workers.values()), 2),
+    }
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    """
+    Binds the listening socket shared by all workers.
+
+    Args:
+        host (str): Bind address.
+        port (int): Bind port.
+
+    Returns:
+        socket.socket: Listening socket.
+    """
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def _run_worker(sock: socket.socket, app_path: str) -> None:
+    """
+    Worker body: serve the application on the inherited socket.
+
+    Args:
+        sock (socket.socket): Listening socket.
+        app_path (str): ASGI application import path.
+    """
+    import uvicorn
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    gc.enable()
+    server = uvicorn.Server(uvicorn.Config(app_path, proxy_headers=True, log_config=None))
+    server.run(sockets=[sock])
+    if not server.started:
+        # Lifespan startup failed; uvicorn returns instead of raising
+        sys.exit(STARTUP_FAILURE)
+
+class PreforkMaster:
+    """
+    Forks and supervises the worker processes.
+    """
+
+    def __init__(self, sock: socket.socket, app_path: str, workers: int,
+                 report_interval: float = 60.0, max_crashes: int = 5, crash_window: float = 60.0) -> None:
+        """
+        Args:
+            sock (socket.socket): Listening socket shared with the workers.
+            app_path (str): ASGI application import path.
+            workers (int): Number of worker processes.
+            report_interval (float): Seconds between memory reports.
+            max_crashes (int): Worker crashes within crash_window after which the master gives up.
+            crash_window (float): Seconds over which crashes are counted.
+        """
+        self.sock = sock
+        self.app_path = app_path
+        self.workers = workers
+        self.report_interval = report_interval
+        self.max_crashes = max_crashes
+        self.crash_window = crash_window
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+        self.crashes: deque = deque()
+        self.restart_delay = 0.0
+        # Monotonic times at which a worker is due to be restarted
+        self.pending_restarts: List[float] = []
+
+    def spawn(self) -> int:
+        """
+        Forks one worker.
+
+        Returns:
+            int: Child process id.
+        """
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                _run_worker(self.sock, self.app_path)
+                exit_code = 0
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(exit_code)
+        self.children[pid] = time.monotonic()
+        logger.info(f"Started worker {pid}")
+        return pid
+
+    def stop(self, signum, frame) -> None:
+        """
+        Signal handler: forwards the signal to the workers and stops supervision.
+        """
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _worker_exited(self, pid: int, status: int) -> None:
+        """
+        Schedules the restart of a dead worker, backing off while workers crash on start.
+
+        Args:
+            pid (int): Worker process id.
+            status (int): Wait status from os.waitpid.
+        """
+        started = self.children.pop(pid, None)
+        if self.stopping:
+            return
+        exit_code = os.waitstatus_to_exitcode(status)
+        now = time.monotonic()
+        uptime = now - started if started is not None else 0.0
+        if exit_code == 0 and uptime >= MIN_UPTIME:
+            self.restart_delay = 0.0
+            logger.warning(f"Worker {pid} exited after {uptime:.0f}s; restarting")
+        else:
+            self.crashes.append(now)
+            while self.crashes and now - self.crashes[0] > self.crash_window:
+                self.crashes.popleft()
+            if len(self.crashes) >= self.max_crashes:
+                logger.error(f"Worker {pid} exited with code {exit_code}; {len(self.crashes)} crashes in "
+                             f"{self.crash_window:.0f}s, giving up")
+                self.stop(None, None)
+                return
+            if uptime >= MIN_UPTIME:
+                # Crashed after running normally: restart at once
+                self.restart_delay = 0.0
+            else:
+                self.restart_delay = min(max(self.restart_delay * 2, 1.0), RESTART_DELAY_MAX)
+            logger.warning(f"Worker {pid} exited with code {exit_code} after {uptime:.0f}s; "
+                           f"restarting in {self.restart_delay:.0f}s")
+        self.pending_restarts.append(now + self.restart_delay)
+
+    def run(self) -> int:
+        """
+        Starts the workers and supervises them until signalled.
+
+        Returns:
+            int: Exit code (1 if the master gave up because workers kept crashing).
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+
+        last_report = time.monotonic()
+        while self.children or (self.pending_restarts and not self.stopping):
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if pid:
+                self._worker_exited(pid, status)
+                continue
+
+            now = time.monotonic()
+            due = [at for at in self.pending_restarts if at <= now]
+            if due and not self.stopping:
+                self.pending_restarts = [at for at in self.pending_restarts if at > now]
+                for _ in due:
+                    self.spawn()
+            if not self.stopping and now - last_report >= self.report_interval:
+                logger.info(f"Worker memory: {json.dumps(memory_report(list(self.children)))}")
+                last_report = now
+            time.sleep(0.5)
+        logger.info("All workers stopped")
+        return 1 if len(self.crashes) >= self.max_crashes else 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point.
+
+    Args:
+        argv (Optional[List[str]]): Arguments (defaults to sys.argv).
+
+    Returns:
+        int: Exit code.
+    """
+    arg_parser = argparse.ArgumentParser(description="Serve the app with pre-forked workers sharing preloaded models.")
+    arg_parser.add_argument('--host', default='0.0.0.0', help="Bind address")
+    arg_parser.add_argument('--port', type=int, default=int(os.getenv('PORT', 8080)), help="Bind port")
+    arg_parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    arg_parser.add_argument('--app', default='app:app', help="ASGI application import path")
+    arg_parser.add_argument('--config', default='config.yaml', help="Configuration file")
+    arg_parser.add_argument('--report-interval', type=float, default=60.0, help="Seconds between memory reports")
+    arg_parser.add_argument('--max-crashes', type=int, default=5,
+                            help="Worker crashes within --crash-window after which the master exits")
+    arg_parser.add_argument('--crash-window', type=float, default=60.0, help="Seconds over which crashes are counted")
+    args = arg_parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    preload(args.config)
+    sock = _bind_socket(args.host, args.port)
+    logger.info(f"Listening on {args.host}:{args.port} with {args.workers} workers")
+    return PreforkMaster(sock, args.app, args.workers, args.report_interval,
+                         args.max_crashes, args.crash_window).run()
+
+if __name__ == '__main__':
+    sys.exit(main())
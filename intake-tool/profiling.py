@@ -0,0 +1,269 @@
+# profiling.py
+"""
+On-demand profiling of a live worker.
+
+Nothing here runs until a profile is requested, so an idle worker pays no
+overhead. Three CPU profilers are available:
+- 'sample': a background thread samples every thread's stack at a fixed
+  interval and counts collapsed stacks (flamegraph.pl / speedscope input).
+  The event loop thread's stack shows whichever asyncio task is running.
+- 'cprofile': deterministic cProfile of the event loop thread, i.e. every
+  coroutine step and callback the loop runs (not worker threads).
+- 'yappi': deterministic, covers all threads and attributes wall time to
+  coroutines (requires the optional yappi package).
+
+Memory hotspots come from two tracemalloc snapshots taken N seconds apart.
+"""
+
+import io
+import os
+import sys
+import pstats
+import asyncio
+import cProfile
+import logging
+import tempfile
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import yappi
+except ImportError:  # yappi is optional; 'sample' and 'cprofile' work without it
+    yappi = None
+
+logger = logging.getLogger("app")
+
+PROFILERS = ('sample', 'cprofile', 'yappi')
+FORMATS = {
+    'sample': ('collapsed', 'text'),
+    'cprofile': ('pstats', 'text'),
+    'yappi': ('pstats', 'text'),
+}
+
+class ProfilerBusy(Exception):
+    """
+    Raised when a profile is requested while another one is running in this worker.
+    """
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+class StackSampler:
+    """
+    Samples the stacks of all threads from a background thread.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        # The sampler only runs when another thread releases the GIL. Without a shorter
+        # switch interval, an event loop running short steps releases it mostly in
+        # select(), and nearly every sample would show the loop as idle.
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval / 10))
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            sys.setswitchinterval(self._switch_interval)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[';'.join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        """
+        Returns the samples as collapsed stacks ('thread;outer;...;inner count' per line).
+        """
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def top(self, limit: int = 30) -> str:
+        """
+        Returns the functions most often on top of a stack (self time), as a text table.
+
+        Percentages are of sampling ticks, so a function running all the time in one
+        thread shows 100% however many (idle) threads the worker has.
+        """
+        leaf = Counter()
+        for stack, count in self.samples.items():
+            leaf[stack.rsplit(';', 1)[-1]] += count
+        ticks = self.sample_count or 1
+        lines = [f"{self.sample_count} samples every {self.interval * 1000:.1f} ms", f"{'self %':>7}  {'samples':>8}  function"]
+        lines += [f"{count * 100 / ticks:>6.1f}%  {count:>8}  {label}" for label, count in leaf.most_common(limit)]
+        return '\n'.join(lines) + '\n'
+
+def _dump_pstats(stats_source, path: str) -> None:
+    if yappi is not None and isinstance(stats_source, yappi.YFuncStats):
+        stats_source.save(path, type='pstat')
+    else:
+        pstats.Stats(stats_source).dump_stats(path)
+
+def _render_pstats(stats_source, output: str, limit: int) -> bytes:
+    """
+    Renders cProfile or yappi statistics as a pstats (marshal) dump or a text table.
+    """
+    fd, path = tempfile.mkstemp(suffix='.pstats')
+    os.close(fd)
+    try:
+        _dump_pstats(stats_source, path)
+        if output == 'pstats':
+            with open(path, 'rb') as f:
+                return f.read()
+        stream = io.StringIO()
+        pstats.Stats(path, stream=stream).sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue().encode('utf-8')
+    finally:
+        os.unlink(path)
+
+class WorkerProfiler:
+    """
+    Runs one CPU or memory profile at a time in this worker process.
+    """
+
+    def __init__(self, max_seconds: float = 120.0) -> None:
+        self.max_seconds = max_seconds
+        self._busy = False
+
+    def _acquire(self) -> None:
+        if self._busy:
+            raise ProfilerBusy("A profile is already running in this worker")
+        self._busy = True
+
+    async def profile_cpu(self, seconds: float, profiler: str = 'sample', output: str = 'collapsed',
+                          interval: float = 0.005, limit: int = 40) -> Tuple[bytes, str]:
+        """
+        Profiles the worker for a number of seconds while it keeps serving requests.
+
+        Args:
+            seconds (float): Profile duration (capped at max_seconds).
+            profiler (str): 'sample', 'cprofile' or 'yappi'.
+            output (str): 'collapsed' (sample), 'pstats' (cprofile/yappi) or 'text'.
+            interval (float): Sampling interval in seconds ('sample' only).
+            limit (int): Rows in text output.
+
+        Returns:
+            Tuple[bytes, str]: The profile and its media type.
+        """
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{profiler}', expected one of {', '.join(PROFILERS)}")
+        if output not in FORMATS[profiler]:
+            raise ValueError(f"Profiler '{profiler}' supports output {', '.join(FORMATS[profiler])}")
+        if profiler == 'yappi' and yappi is None:
+            raise ValueError("The yappi package is not installed")
+        seconds = min(max(seconds, 0.1), self.max_seconds)
+        self._acquire()
+        logger.warning(f"Starting {seconds:.1f}s {profiler} profile of worker {os.getpid()}")
+        try:
+            if profiler == 'sample':
+                sampler = StackSampler(interval=max(interval, 0.001))
+                sampler.start()
+                try:
+                    await asyncio.sleep(seconds)
+                finally:
+                    await asyncio.to_thread(sampler.stop)
+                if output == 'collapsed':
+                    return sampler.collapsed().encode('utf-8'), 'text/plain'
+                return sampler.top(limit).encode('utf-8'), 'text/plain'
+
+            if profiler == 'cprofile':
+                # Enabled from the event loop thread, so it records everything the loop runs
+                profile = cProfile.Profile()
+                profile.enable()
+                try:
+                    await asyncio.sleep(seconds)
+                finally:
+                    profile.disable()
+                stats_source = profile
+            else:
+                yappi.set_clock_type('wall')
+                yappi.clear_stats()
+                yappi.start(builtins=False)
+                try:
+                    await asyncio.sleep(seconds)
+                finally:
+                    yappi.stop()
+                stats_source = yappi.get_func_stats()
+
+            body = await asyncio.to_thread(_render_pstats, stats_source, output, limit)
+            return body, 'application/octet-stream' if output == 'pstats' else 'text/plain'
+        finally:
+            self._busy = False
+            logger.info(f"Finished {profiler} profile of worker {os.getpid()}")
+
+    async def profile_memory(self, seconds: float, limit: int = 25, frames: int = 1,
+                             group_by: str = 'lineno') -> Dict[str, Any]:
+        """
+        Reports where memory was allocated (and not freed) over a number of seconds.
+
+        tracemalloc is started for the duration only (unless it was already tracing),
+        so it costs nothing outside a request.
+
+        Args:
+            seconds (float): Time between the two snapshots (capped at max_seconds).
+            limit (int): Number of hotspots returned.
+            frames (int): Stack frames recorded per allocation (more is slower).
+            group_by (str): 'lineno', 'filename' or 'traceback'.
+
+        Returns:
+            Dict[str, Any]: Traced memory and the top allocation differences.
+        """
+        if group_by not in ('lineno', 'filename', 'traceback'):
+            raise ValueError("group_by must be 'lineno', 'filename' or 'traceback'")
+        seconds = min(max(seconds, 0.1), self.max_seconds)
+        self._acquire()
+        started = not tracemalloc.is_tracing()
+        try:
+            if started:
+                tracemalloc.start(max(frames, 1))
+            before = await asyncio.to_thread(tracemalloc.take_snapshot)
+            await asyncio.sleep(seconds)
+            after = await asyncio.to_thread(tracemalloc.take_snapshot)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started:
+                tracemalloc.stop()
+            self._busy = False
+
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')]
+        stats = await asyncio.to_thread(
+            lambda: after.filter_traces(filters).compare_to(before.filter_traces(filters), group_by)
+        )
+        return {
+            'seconds': seconds,
+            'traced_current_bytes': current,
+            'traced_peak_bytes': peak,
+            'hotspots': [_hotspot(stat) for stat in stats[:limit]],
+        }
+
+def _hotspot(stat) -> Dict[str, Any]:
+    return {
+        'location': [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+        'size_diff_bytes': stat.size_diff,
+        'size_bytes': stat.size,
+        'count_diff': stat.count_diff,
+        'count': stat.count,
+    }
@@ -0,0 +1,189 @@
+# prompt_template.py
+
+import logging
+from threading import Lock
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("parser")
+
+# Placeholder in the prompt template that is replaced by the email content
+EMAIL_PLACEHOLDER = '{{email_content}}'
+
+# Placeholder in the thread prompt template that is replaced by the thread's current field values
+FIELDS_PLACEHOLDER = '{{current_fields}}'
+
+# Approximate characters per provider token, used for estimates
+CHARS_PER_TOKEN = 4
+
+# Text allowed after the email before the template is reported as cache-unfriendly
+MAX_TAIL_CHARS = 64
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """
+    A prompt template split into a static prefix and a short tail around the email.
+
+    Providers cache a prompt's longest repeated prefix, so every instruction
+    belongs in the prefix and the email should come last.
+    """
+    prefix: str
+    suffix: str
+
+    @property
+    def prefix_tokens(self) -> int:
+        """
+        Estimated tokens in the static (cacheable) prefix.
+        """
+        return len(self.prefix) // CHARS_PER_TOKEN
+
+    def render(self, email_content: str) -> str:
+        """
+        Builds the prompt for one email.
+
+        Args:
+            email_content (str): The email content.
+
+        Returns:
+            str: Prefix, email and suffix.
+        """
+        return self.prefix + email_content + self.suffix
+
+def compile_prompt_template(template: str) -> CompiledPrompt:
+    """
+    Compiles a prompt template with one {{email_content}} placeholder.
+
+    Args:
+        template (str): Prompt template.
+
+    Returns:
+        CompiledPrompt: Static prefix and suffix.
+    """
+    prefix, placeholder, suffix = template.partition(EMAIL_PLACEHOLDER)
+    if not placeholder:
+        raise ValueError(f"Prompt template has no {EMAIL_PLACEHOLDER} placeholder")
+    if EMAIL_PLACEHOLDER in suffix:
+        raise ValueError(f"Prompt template has more than one {EMAIL_PLACEHOLDER} placeholder")
+    suffix = suffix.rstrip()
+    if len(suffix) > MAX_TAIL_CHARS:
+        logger.warning(f"Prompt template has {len(suffix)} characters after {EMAIL_PLACEHOLDER}; "
+                       f"move instructions before the email so providers can cache them")
+    return CompiledPrompt(prefix=prefix, suffix=suffix)
+
+@dataclass(frozen=True)
+class CompiledThreadPrompt:
+    """
+    A thread prompt template split around the current field values and the new message.
+    """
+    prefix: str
+    middle: str
+    suffix: str
+
+    def render(self, current_fields: str, email_content: str) -> str:
+        """
+        Builds the prompt for one reply in a thread.
+
+        Args:
+            current_fields (str): The thread's current field values.
+            email_content (str): The new message.
+
+        Returns:
+            str: Prefix, fields, middle, message and suffix.
+        """
+        return self.prefix + current_fields + self.middle + email_content + self.suffix
+
+def compile_thread_prompt_template(template: str) -> CompiledThreadPrompt:
+    """
+    Compiles a thread prompt template with a {{current_fields}} placeholder followed by {{email_content}}.
+
+    Args:
+        template (str): Thread prompt template.
+
+    Returns:
+        CompiledThreadPrompt: Static prefix, middle and suffix.
+    """
+    prefix, placeholder, rest = template.partition(FIELDS_PLACEHOLDER)
+    if not placeholder or FIELDS_PLACEHOLDER in rest:
+        raise ValueError(f"Thread prompt template needs exactly one {FIELDS_PLACEHOLDER} placeholder before {EMAIL_PLACEHOLDER}")
+    if EMAIL_PLACEHOLDER in prefix:
+        raise ValueError(f"Thread prompt template must place {EMAIL_PLACEHOLDER} after {FIELDS_PLACEHOLDER}")
+    tail = compile_prompt_template(rest)
+    return CompiledThreadPrompt(prefix=prefix, middle=tail.prefix, suffix=tail.suffix)
+
+class PromptCacheStats:
+    """
+    Measures how much of each provider request is a reusable prompt prefix and
+    what provider-side prefix caching saves in input tokens and latency.
+
+    Token counts reported by the provider are used when available; otherwise
+    input tokens are estimated from the prompt length.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._totals = {
+            'requests': 0,
+            'input_tokens': 0,
+            'prefix_tokens': 0,
+            'reported_requests': 0,
+            'reported_input_tokens': 0,
+            'cached_tokens': 0,
+            'cache_hits': 0,
+            'hit_latency_ms': 0.0,
+            'miss_latency_ms': 0.0,
+        }
+
+    def record(self, prompt_chars: int, prefix_tokens: int, latency: float,
+               usage: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Records one provider call.
+
+        Args:
+            prompt_chars (int): Length of the prompt sent.
+            prefix_tokens (int): Estimated tokens in the static prefix.
+            latency (float): Call duration in seconds.
+            usage (Optional[Dict[str, Any]]): Provider-reported 'input_tokens' and 'cached_tokens'.
+        """
+        input_tokens = usage.get('input_tokens') if usage else None
+        cached_tokens = (usage.get('cached_tokens') or 0) if usage else 0
+        with self._lock:
+            totals = self._totals
+            totals['requests'] += 1
+            totals['input_tokens'] += input_tokens or prompt_chars // CHARS_PER_TOKEN
+            totals['prefix_tokens'] += prefix_tokens
+            if input_tokens:
+                totals['reported_requests'] += 1
+                totals['reported_input_tokens'] += input_tokens
+                totals['cached_tokens'] += cached_tokens
+            if cached_tokens:
+                totals['cache_hits'] += 1
+                totals['hit_latency_ms'] += latency * 1000
+            else:
+                totals['miss_latency_ms'] += latency * 1000
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns totals and per-request savings.
+
+        Returns:
+            Dict[str, Any]: Prompt and prefix-cache metrics.
+        """
+        with self._lock:
+            totals = dict(self._totals)
+        requests = totals['requests']
+        hits = totals['cache_hits']
+        misses = requests - hits
+        hit_latency = totals['hit_latency_ms'] / hits if hits else None
+        miss_latency = totals['miss_latency_ms'] / misses if misses else None
+        reported = totals['reported_requests']
+        return {
+            'requests': requests,
+            'avg_input_tokens': round(totals['input_tokens'] / requests, 1) if requests else None,
+            # Share of each prompt that is static and can be served from a provider prefix cache
+            'cacheable_prefix_ratio': round(totals['prefix_tokens'] / totals['input_tokens'], 3) if totals['input_tokens'] else None,
+            'cache_hit_ratio': round(hits / reported, 3) if reported else None,
+            'avg_cached_tokens_per_request': round(totals['cached_tokens'] / reported, 1) if reported else None,
+            'avg_hit_latency_ms': round(hit_latency, 1) if hit_latency is not None else None,
+            'avg_miss_latency_ms': round(miss_latency, 1) if miss_latency is not None else None,
+            'avg_latency_saved_ms': round(miss_latency - hit_latency, 1) if hits and misses else None,
+        }
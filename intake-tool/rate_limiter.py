@@ -0,0 +1,130 @@
+# rate_limiter.py
+
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+from threading import Lock
+from dataclasses import dataclass
+
+logger = logging.getLogger("app")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    remaining: float
+    retry_after: float
+
+class TokenBucketLimiter:
+    """
+    Token-bucket rate limiter that charges by estimated provider tokens.
+
+    Buckets live in a local SQLite database (WAL mode), so every worker process
+    on the host draws from the same budget. Each check runs in an immediate
+    transaction, which serializes concurrent updates across processes.
+    """
+
+    def __init__(self, db_path: str = 'data/rate_limits.db', capacity: float = 60000,
+                 refill_per_minute: float = 30000) -> None:
+        """
+        Args:
+            db_path (str): Path to the SQLite database shared by the workers.
+            capacity (float): Maximum tokens a key can accumulate (burst size).
+            refill_per_minute (float): Tokens added to each bucket per minute.
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.capacity = capacity
+        self.refill_per_second = refill_per_minute / 60.0
+        self._lock = Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def acquire(self, key: str, cost: float) -> RateLimitDecision:
+        """
+        Charges a bucket if it holds enough tokens.
+
+        Args:
+            key (str): Bucket key (the API key).
+            cost (float): Estimated tokens for the request.
+
+        Returns:
+            RateLimitDecision: Whether the request may proceed, remaining tokens,
+            and seconds until it could be afforded if not.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    tokens = self.capacity
+                else:
+                    tokens = min(self.capacity, row[0] + max(now - row[1], 0) * self.refill_per_second)
+
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                self._conn.execute(
+                    "INSERT INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                    (key, tokens, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        retry_after = 0.0 if allowed else (cost - tokens) / self.refill_per_second
+        if not allowed:
+            logger.warning(f"Token budget exceeded: cost={cost:.0f}, available={tokens:.0f}, retry_after={retry_after:.1f}s")
+        return RateLimitDecision(allowed=allowed, remaining=tokens, retry_after=retry_after)
+
+    def refund(self, key: str, cost: float) -> None:
+        """
+        Returns tokens charged for a request that was then rejected before any work started.
+
+        Args:
+            key (str): Bucket key.
+            cost (float): Tokens charged by acquire().
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE buckets SET tokens = MIN(?, tokens + ?) WHERE key = ?", (self.capacity, cost, key)
+            )
+
+    async def wait_for_tokens(self, key: str, cost: float, poll_interval: float = 30.0) -> None:
+        """
+        Defers until the bucket can be charged (for background work).
+
+        Args:
+            key (str): Bucket key.
+            cost (float): Estimated tokens; must not exceed the capacity.
+            poll_interval (float): Maximum seconds between attempts.
+        """
+        while True:
+            decision = await asyncio.to_thread(self.acquire, key, cost)
+            if decision.allowed:
+                return
+            await asyncio.sleep(min(decision.retry_after, poll_interval))
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._conn.close()
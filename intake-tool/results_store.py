@@ -0,0 +1,190 @@
+# results_store.py
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger("app")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_created ON results (created_at);
+CREATE TABLE IF NOT EXISTS result_owners (
+    result_id TEXT NOT NULL,
+    account TEXT NOT NULL,
+    PRIMARY KEY (result_id, account)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    result_id TEXT NOT NULL,
+    messages INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_updated ON threads (updated_at);
+"""
+
+class ResultStore:
+    """
+    Content-addressed store of parse results backed by SQLite in WAL mode.
+
+    A result's id is the hash of its content, so storing the same result twice
+    is a no-op, and the content behind an id never changes (ids double as ETags).
+    Each result records the accounts that stored it; results hold insured PII, so
+    they are only served to those accounts.
+    Email threads point at the result holding their latest merged state.
+    """
+
+    def __init__(self, db_path: str = 'data/results.db', retention_days: float = 30) -> None:
+        """
+        Opens (and creates if needed) the results database.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+            retention_days (float): Age after which prune() removes results.
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.retention_days = retention_days
+        self._lock = Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        logger.debug(f"Results store opened at {db_path}")
+
+    def put(self, result: Dict[str, Any], account: Optional[str] = None) -> str:
+        """
+        Stores a parse result.
+
+        Args:
+            result (Dict[str, Any]): Parsed data.
+            account (Optional[str]): Account storing the result (allowed to read it back).
+
+        Returns:
+            str: The result id.
+        """
+        data = orjson.dumps(result, option=orjson.OPT_SORT_KEYS)
+        key = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO results (id, data, created_at) VALUES (?, ?, ?)",
+                    (key, data, time.time())
+                )
+                if account is not None:
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO result_owners (result_id, account) VALUES (?, ?)",
+                        (key, account)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return key
+
+    def owns(self, key: str, account: str) -> bool:
+        """
+        Checks that a result exists and was stored by an account, without loading it.
+
+        Args:
+            key (str): Result id.
+            account (str): Account id.
+
+        Returns:
+            bool: True if the account may read the result.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM result_owners JOIN results ON results.id = result_owners.result_id "
+                "WHERE result_owners.result_id = ? AND result_owners.account = ?",
+                (key, account)
+            ).fetchone()
+        return row is not None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Loads a stored result.
+
+        Args:
+            key (str): Result id.
+
+        Returns:
+            Optional[Dict[str, Any]]: Parsed data, or None if unknown or pruned.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM results WHERE id = ?", (key,)).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def get_thread(self, thread_id: str) -> Optional[Tuple[str, int]]:
+        """
+        Looks up a thread's latest state.
+
+        Args:
+            thread_id (str): Thread id.
+
+        Returns:
+            Optional[Tuple[str, int]]: Id of the result holding the thread's state and the
+            number of messages merged into it, or None for a new thread.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result_id, messages FROM threads WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set_thread(self, thread_id: str, result_id: str) -> int:
+        """
+        Points a thread at its new state after a message was merged.
+
+        Args:
+            thread_id (str): Thread id.
+            result_id (str): Id of the result holding the merged state.
+
+        Returns:
+            int: Number of messages in the thread.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "INSERT INTO threads (thread_id, result_id, messages, updated_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET result_id = excluded.result_id, "
+                "messages = messages + 1, updated_at = excluded.updated_at RETURNING messages",
+                (thread_id, result_id, time.time())
+            ).fetchone()[0]
+
+    def prune(self) -> int:
+        """
+        Deletes results and threads older than the retention period.
+
+        Returns:
+            int: Number of results deleted.
+        """
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock:
+            self._conn.execute("DELETE FROM threads WHERE updated_at < ?", (cutoff,))
+            deleted = self._conn.execute("DELETE FROM results WHERE created_at < ?", (cutoff,)).rowcount
+            if deleted:
+                self._conn.execute(
+                    "DELETE FROM result_owners WHERE result_id NOT IN (SELECT id FROM results)"
+                )
+        if deleted:
+            logger.info(f"Pruned {deleted} stored results older than {self.retention_days} days")
+        return deleted
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,288 @@
+# retry_budget.py
+
+import time
+import random
+import asyncio
+import logging
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from deadline import DeadlineExceeded, remaining_time
+
+logger = logging.getLogger("app")
+
+# HTTP statuses worth retrying: rate limited, or a server-side failure
+TRANSIENT_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+# gRPC status names worth retrying (Vertex AI)
+TRANSIENT_GRPC_CODES = frozenset({'UNAVAILABLE', 'RESOURCE_EXHAUSTED', 'DEADLINE_EXCEEDED', 'ABORTED', 'INTERNAL'})
+
+def _error_status(error: BaseException) -> Optional[int]:
+    """
+    Finds the HTTP status of a client library error (aiohttp, requests, google-api-core).
+    """
+    for status in (getattr(error, 'status', None), getattr(error, 'code', None),
+                   getattr(getattr(error, 'response', None), 'status_code', None)):
+        if isinstance(status, int):
+            return status
+    return None
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Whether a failed provider or network call is worth retrying.
+
+    Timeouts, connection errors, 429 and 5xx responses (and their gRPC equivalents)
+    are transient; everything else, such as invalid requests, authentication failures
+    or malformed responses, fails the same way on every attempt.
+
+    Args:
+        error (BaseException): The failure.
+
+    Returns:
+        bool: True for transient failures.
+    """
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = _error_status(error)
+    if status is not None:
+        return status in TRANSIENT_STATUSES
+    code = getattr(error, 'code', None)
+    if callable(code):
+        # grpc.RpcError exposes its status as a method
+        try:
+            return getattr(code(), 'name', None) in TRANSIENT_GRPC_CODES
+        except Exception:
+            return False
+    # Connection and timeout errors of client libraries, matched by name so none has to be imported
+    return any(name in cls.__name__ for cls in type(error).__mro__
+               for name in ('Timeout', 'ConnectionError', 'ServerDisconnected', 'ClientOSError'))
+
+class RetryBudget:
+    """
+    Process-wide retry budget over a sliding time window.
+
+    A retry is allowed only while retries in the window stay below
+    ratio * successful calls in the window (plus a small floor so an idle
+    process can still retry). During a provider brownout successes dry up,
+    so retries are shed instead of multiplying the load on the provider.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_retries_per_second: float = 1.0, window: float = 10.0) -> None:
+        """
+        Args:
+            ratio (float): Allowed retries per successful call.
+            min_retries_per_second (float): Retries always allowed regardless of successes.
+            window (float): Sliding window length in seconds.
+        """
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.window = window
+        self._lock = Lock()
+        # Per-second buckets: second -> [successes, retries]
+        self._buckets: Dict[int, list] = {}
+
+    def _bucket(self, now: float) -> list:
+        second = int(now)
+        bucket = self._buckets.get(second)
+        if bucket is None:
+            horizon = second - int(self.window)
+            for stale in [key for key in self._buckets if key <= horizon]:
+                del self._buckets[stale]
+            bucket = self._buckets[second] = [0, 0]
+        return bucket
+
+    def _totals(self, now: float) -> Tuple[int, int]:
+        horizon = int(now) - int(self.window)
+        successes = retries = 0
+        for second, (ok, retried) in self._buckets.items():
+            if second > horizon:
+                successes += ok
+                retries += retried
+        return successes, retries
+
+    def record_success(self) -> None:
+        """
+        Records a successful call.
+        """
+        with self._lock:
+            self._bucket(time.time())[0] += 1
+
+    def try_acquire(self) -> bool:
+        """
+        Takes a retry from the budget if one is available.
+
+        Returns:
+            bool: True if the caller may retry.
+        """
+        now = time.time()
+        with self._lock:
+            successes, retries = self._totals(now)
+            if retries + 1 > successes * self.ratio + self.min_retries_per_second * self.window:
+                return False
+            self._bucket(now)[1] += 1
+            return True
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Returns the successes and retries counted in the current window.
+
+        Returns:
+            Dict[str, int]: Window counters.
+        """
+        with self._lock:
+            successes, retries = self._totals(time.time())
+        return {'window_successes': successes, 'window_retries': retries}
+
+class RetryCoordinator:
+    """
+    Single retry policy shared by every retrying call site in the process.
+
+    Retries use full-jitter exponential backoff, draw from a shared RetryBudget
+    and never sleep past the current request deadline.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 10.0,
+                 budget: Optional[RetryBudget] = None) -> None:
+        """
+        Args:
+            max_attempts (int): Maximum attempts per call, including the first.
+            base_delay (float): Backoff base in seconds.
+            max_delay (float): Backoff cap in seconds.
+            budget (Optional[RetryBudget]): Shared retry budget.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+        self._lock = Lock()
+        self._metrics = {'calls': 0, 'successes': 0, 'failures': 0, 'retries': 0,
+                         'retries_denied_budget': 0, 'retries_denied_deadline': 0}
+
+    def configure(self, retry_config: Dict[str, Any]) -> None:
+        """
+        Applies the 'retry' configuration section.
+
+        Args:
+            retry_config (Dict[str, Any]): Retry settings.
+        """
+        self.max_attempts = retry_config.get('max_attempts', self.max_attempts)
+        self.base_delay = retry_config.get('base_delay', self.base_delay)
+        self.max_delay = retry_config.get('max_delay', self.max_delay)
+        self.budget.ratio = retry_config.get('budget_ratio', self.budget.ratio)
+        self.budget.min_retries_per_second = retry_config.get('min_retries_per_second', self.budget.min_retries_per_second)
+        self.budget.window = retry_config.get('budget_window', self.budget.window)
+
+    def _count(self, metric: str) -> None:
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _next_delay(self, attempt: int, error: Exception, name: str) -> float:
+        """
+        Decides whether a failed attempt may be retried.
+
+        Args:
+            attempt (int): Zero-based attempt that just failed.
+            error (Exception): The failure.
+            name (str): Call site name for logging.
+
+        Returns:
+            float: Seconds to wait before retrying, or -1 to give up.
+        """
+        if attempt + 1 >= self.max_attempts:
+            return -1
+        delay = self._backoff(attempt)
+        remaining = remaining_time()
+        if remaining is not None and remaining <= delay:
+            self._count('retries_denied_deadline')
+            return -1
+        if not self.budget.try_acquire():
+            self._count('retries_denied_budget')
+            logger.debug(f"Retry budget exhausted; not retrying {name}: {error}")
+            return -1
+        self._count('retries')
+        logger.info(f"Retrying {name} in {delay:.2f}s after attempt {attempt + 1} failed: {error}")
+        return delay
+
+    @staticmethod
+    def _retryable(error: Exception, retry_on: Optional[Tuple[Type[BaseException], ...]]) -> bool:
+        return isinstance(error, retry_on) if retry_on is not None else is_transient(error)
+
+    async def run(self, func: Callable[..., Any], *args,
+                  retry_on: Optional[Tuple[Type[BaseException], ...]] = None, **kwargs) -> Any:
+        """
+        Awaits func(*args, **kwargs), retrying transient failures within the budget.
+
+        Args:
+            func (Callable[..., Any]): Coroutine function to call.
+            retry_on (Optional[Tuple[Type[BaseException], ...]]): Exception types worth retrying
+                (default: transient errors, see is_transient()).
+
+        Returns:
+            Any: The call's result.
+        """
+        self._count('calls')
+        attempt = 0
+        while True:
+            try:
+                result = await func(*args, **kwargs)
+            except DeadlineExceeded:
+                self._count('failures')
+                raise
+            except Exception as e:
+                delay = self._next_delay(attempt, e, func.__name__) if self._retryable(e, retry_on) else -1
+                if delay < 0:
+                    self._count('failures')
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.budget.record_success()
+            self._count('successes')
+            return result
+
+    def call(self, func: Callable[..., Any], *args,
+             retry_on: Optional[Tuple[Type[BaseException], ...]] = None, **kwargs) -> Any:
+        """
+        Blocking counterpart of run() for synchronous call sites.
+
+        Args:
+            func (Callable[..., Any]): Function to call.
+            retry_on (Optional[Tuple[Type[BaseException], ...]]): Exception types worth retrying
+                (default: transient errors, see is_transient()).
+
+        Returns:
+            Any: The call's result.
+        """
+        self._count('calls')
+        attempt = 0
+        while True:
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(attempt, e, func.__name__) if self._retryable(e, retry_on) else -1
+                if delay < 0:
+                    self._count('failures')
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.budget.record_success()
+            self._count('successes')
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns retry metrics since startup and the current budget window.
+
+        Returns:
+            Dict[str, Any]: Retry metrics.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics.update(self.budget.snapshot())
+        return metrics
+
+# Process-wide coordinator shared by the parser, endpoints and health checks
+retry_coordinator = RetryCoordinator()
@@ -0,0 +1,214 @@
+# secret_cache.py
+
+import time
+import asyncio
+import logging
+from threading import Lock
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("app")
+
+@dataclass
+class _SecretEntry:
+    value: Optional[str]
+    ttl: float
+    fetched_at: float
+    next_refresh: float
+    last_error: Optional[str] = None
+    listeners: List[Callable[[str], None]] = field(default_factory=list)
+
+class SecretCache:
+    """
+    In-memory secret cache with per-secret TTL and stale-while-revalidate refresh.
+
+    Secrets are fetched once (at startup or on first use) and then refreshed by a
+    background task before they expire. Readers always get the cached value, even
+    if a refresh is failing, so request handlers and health checks never wait on
+    the secret backend. Listeners are notified when a secret's value changes
+    (e.g. API key rotation).
+    """
+
+    def __init__(self, fetch: Callable[[str], str], default_ttl: float = 300,
+                 refresh_margin: float = 0.2, ttls: Optional[Dict[str, float]] = None) -> None:
+        """
+        Args:
+            fetch (Callable[[str], str]): Blocking function returning the current value of a secret.
+            default_ttl (float): Seconds a secret stays fresh.
+            refresh_margin (float): Fraction of the TTL before expiry at which to refresh.
+            ttls (Optional[Dict[str, float]]): Per-secret TTL overrides.
+        """
+        self._fetch = fetch
+        self.default_ttl = default_ttl
+        self.refresh_margin = refresh_margin
+        self.ttls = ttls or {}
+        self._entries: Dict[str, _SecretEntry] = {}
+        self._lock = Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def _ttl_for(self, name: str) -> float:
+        return self.ttls.get(name, self.default_ttl)
+
+    def _load(self, name: str) -> Optional[str]:
+        """
+        Fetches a secret and stores it, keeping the previous value on failure.
+
+        Args:
+            name (str): Secret name.
+
+        Returns:
+            Optional[str]: Current value (possibly stale), or None if never fetched.
+        """
+        ttl = self._ttl_for(name)
+        now = time.time()
+        try:
+            value = self._fetch(name)
+            error = None
+        except Exception as e:
+            logger.error(f"Failed to refresh secret '{name}': {e}")
+            value = None
+            error = str(e)
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = _SecretEntry(value=None, ttl=ttl, fetched_at=0.0, next_refresh=now)
+                self._entries[name] = entry
+            changed = error is None and value != entry.value
+            if error is None:
+                entry.value = value
+                entry.fetched_at = now
+                entry.next_refresh = now + ttl * (1 - self.refresh_margin)
+            else:
+                # Retry sooner than a full TTL, but do not hammer a failing backend
+                entry.next_refresh = now + min(max(ttl * 0.1, 5), 60)
+            entry.last_error = error
+            listeners = list(entry.listeners) if changed else []
+            current = entry.value
+
+        for listener in listeners:
+            try:
+                listener(current)
+            except Exception as e:
+                logger.error(f"Secret listener for '{name}' failed: {e}")
+        return current
+
+    def get(self, name: str, fallback: Optional[str] = None) -> Optional[str]:
+        """
+        Returns a secret from the cache, fetching it inline only the first time.
+
+        Args:
+            name (str): Secret name.
+            fallback (Optional[str]): Value returned if the secret is unavailable.
+
+        Returns:
+            Optional[str]: Secret value or fallback.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None or not entry.fetched_at and entry.last_error is None:
+            value = self._load(name)
+            self._notify()
+        else:
+            value = entry.value
+        return value if value is not None else fallback
+
+    async def aget(self, name: str, fallback: Optional[str] = None) -> Optional[str]:
+        """
+        Async variant of get(); a first-time fetch runs in a worker thread.
+
+        Args:
+            name (str): Secret name.
+            fallback (Optional[str]): Value returned if the secret is unavailable.
+
+        Returns:
+            Optional[str]: Secret value or fallback.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None or not entry.fetched_at and entry.last_error is None:
+            return await asyncio.to_thread(self.get, name, fallback)
+        return entry.value if entry.value is not None else fallback
+
+    def subscribe(self, name: str, listener: Callable[[str], None]) -> None:
+        """
+        Registers a callback invoked with the new value whenever a secret changes.
+
+        Args:
+            name (str): Secret name.
+            listener (Callable[[str], None]): Callback.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = _SecretEntry(value=None, ttl=self._ttl_for(name), fetched_at=0.0, next_refresh=0.0)
+                self._entries[name] = entry
+            entry.listeners.append(listener)
+
+    def is_healthy(self) -> bool:
+        """
+        Reports whether the most recent fetch of every cached secret succeeded.
+
+        Returns:
+            bool: True if all secrets refreshed successfully.
+        """
+        with self._lock:
+            return all(entry.last_error is None and entry.value is not None for entry in self._entries.values())
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        """
+        Returns cache age and refresh status per secret (values are never included).
+
+        Returns:
+            Dict[str, Dict[str, object]]: Status by secret name.
+        """
+        now = time.time()
+        with self._lock:
+            return {
+                name: {
+                    'age_s': round(now - entry.fetched_at, 1) if entry.fetched_at else None,
+                    'ttl_s': entry.ttl,
+                    'last_error': entry.last_error,
+                }
+                for name, entry in self._entries.items()
+            }
+
+    def _notify(self) -> None:
+        if self._wakeup is not None and self._task is not None:
+            self._task.get_loop().call_soon_threadsafe(self._wakeup.set)
+
+    def start(self) -> None:
+        """
+        Starts the background refresh task on the running event loop.
+        """
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """
+        Stops the background refresh task.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        """
+        Refreshes each secret shortly before it expires.
+        """
+        while True:
+            now = time.time()
+            with self._lock:
+                due = [name for name, entry in self._entries.items() if entry.next_refresh <= now]
+                upcoming = [entry.next_refresh for entry in self._entries.values() if entry.next_refresh > now]
+            for name in due:
+                await asyncio.to_thread(self._load, name)
+            if not due:
+                timeout = (min(upcoming) - now) if upcoming else 60
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0.1))
+                except asyncio.TimeoutError:
+                    pass
@@ -18,6 +18,7 @@ const Performance = {
 };
 
 let parsedDataJson = null; 
+let parsedResultId = null; // Server-side id of the current result; exports fetch it by id
 
 const CONFIG = {
     LM_STUDIO_URL: 'http://localhost:3000',
@@ -26,6 +27,7 @@ const CONFIG = {
     MAX_CONTENT_HEIGHT: window.innerHeight * 3,
     MIN_CONTENT_HEIGHT: 150,
     FETCH_TIMEOUT: 10000,
+    PARSE_TIMEOUT: 60000, // Sent to the server as the parse deadline; the server retries within it
     RETRY_LIMIT: 3
 };
 
@@ -75,11 +77,10 @@ function sanitizeHTML(str) {
     return div.innerHTML;
 }
 
-async function fetchWithTimeoutAndRetry(url, options = {}, retries = CONFIG.RETRY_LIMIT) {
-    const { FETCH_TIMEOUT } = CONFIG;
+async function fetchWithTimeoutAndRetry(url, options = {}, retries = CONFIG.RETRY_LIMIT, timeout = CONFIG.FETCH_TIMEOUT) {
     for (let attempt = 0; attempt <= retries; attempt++) {
         const controller = new AbortController();
-        const id = setTimeout(() => controller.abort(), FETCH_TIMEOUT);
+        const id = setTimeout(() => controller.abort(), timeout);
         try {
             const response = await fetch(url, { ...options, signal: controller.signal });
             clearTimeout(id);
@@ -541,11 +542,16 @@ Email: alice.johnson@example.com`;
     }
 
     async fetchParseResults() {
+        // No client-side retries: the server retries within the deadline, and aborting
+        // the request on timeout cancels the server-side work
         const response = await fetchWithTimeoutAndRetry('/parse_email', {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: {
+                'Content-Type': 'application/json',
+                'X-Request-Timeout': String(CONFIG.PARSE_TIMEOUT / 1000)
+            },
             body: JSON.stringify({ email_content: Elements.content.value })
-        });
+        }, 0, CONFIG.PARSE_TIMEOUT);
         if (!response.ok) {
             const errorData = await response.json();
             throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
@@ -556,6 +562,7 @@ Email: alice.johnson@example.com`;
     handleParseResponse(data) {
         if (data.result) {
             parsedDataJson = data.result;
+            parsedResultId = data.id || null;
             this.showResults(data.result);
             showNotification("Email parsed successfully.", "success");
         } else if (data.error) {
@@ -703,6 +710,18 @@ Email: alice.johnson@example.com`;
     }
 
 
+    fetchExport(format) {
+        // Stored results are exported by id, so the parsed data is not uploaded again
+        if (parsedResultId) {
+            return fetchWithTimeoutAndRetry(`/results/${encodeURIComponent(parsedResultId)}.${format}`);
+        }
+        return fetchWithTimeoutAndRetry(`/export_${format}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ parsed_data: parsedDataJson })
+        });
+    }
+
     async exportToPdf() {
         if (!parsedDataJson) {
             this.showError("No parsed data available for export.");
@@ -711,11 +730,7 @@ Email: alice.johnson@example.com`;
         showNotification("Exporting to PDF...", "info");
         try {
             Performance.measureStart('fetchExportToPdf');
-            const response = await fetchWithTimeoutAndRetry('/export_pdf', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ parsed_data: parsedDataJson })
-            });
+            const response = await this.fetchExport('pdf');
             Performance.measureEnd('fetchExportToPdf');
             if (!response.ok) throw new Error("Failed to generate PDF");
             const blob = await response.blob();
@@ -735,11 +750,7 @@ Email: alice.johnson@example.com`;
         showNotification("Exporting to CSV...", "info");
         try {
             Performance.measureStart('fetchExportToCsv');
-            const response = await fetchWithTimeoutAndRetry('/export_csv', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ parsed_data: parsedDataJson })
-            });
+            const response = await this.fetchExport('csv');
             Performance.measureEnd('fetchExportToCsv');
             if (!response.ok) throw new Error("Failed to generate CSV");
             const blob = await response.blob();
@@ -0,0 +1,44 @@
+# test_chunked_extraction.py
+
+import re
+
+from chunked_extraction import _hard_split, merge_partial_forms, split_email
+
+CLAIM_NUMBER = re.compile(r'^BX-\d{8}$')
+
+def _is_valid(key, value):
+    return not key.startswith('claim_number') or bool(CLAIM_NUMBER.match(value))
+
+def test_hard_split_cuts_oversized_line_by_length():
+    text = 'ab\n' + 'x' * 25 + '\ncd\n'
+    pieces = _hard_split(text, 10)
+    assert pieces == ['ab\nxxxxxxx', 'xxxxxxxxxx', 'xxxxxxxx\n', 'cd\n']
+    assert ''.join(pieces) == text
+
+def test_split_email_starts_quoted_messages_in_new_chunks():
+    email = 'Claim Number: BX-12345678\n\nNotes: roof leak\n-----Original Message-----\nOld message\n'
+    chunks = split_email(email, 60)
+    assert chunks == ['Claim Number: BX-12345678\n\nNotes: roof leak\n',
+                      '-----Original Message-----\nOld message\n']
+    assert all(len(chunk) <= 60 for chunk in chunks)
+
+def test_split_email_keeps_short_email_whole():
+    assert split_email('Claim Number: BX-12345678', 100) == ['Claim Number: BX-12345678']
+
+def test_valid_value_beats_first_value():
+    parts = [{'info': {'claim_number*': 'BX-123'}},
+             {'info': {'claim_number*': 'BX-12345678'}},
+             {'info': {'claim_number*': 'BX-87654321'}}]
+    assert merge_partial_forms(parts, _is_valid) == {'info': {'claim_number*': 'BX-12345678'}}
+
+def test_first_value_kept_when_none_is_valid():
+    parts = [{'info': {'claim_number*': 'BX-1'}}, {'info': {'claim_number*': 'BX-2'}}]
+    assert merge_partial_forms(parts, _is_valid) == {'info': {'claim_number*': 'BX-1'}}
+
+def test_missing_values_never_win_and_notes_accumulate():
+    parts = [{'info': {'insured_name*': 'N/A', 'notes/comments': 'Roof leak'}},
+             {'info': {'insured_name*': 'Jane Doe', 'notes/comments': 'Call first'}},
+             {'info': {'insured_name*': 'N/A', 'notes/comments': 'roof leak'}}]
+    assert merge_partial_forms(parts, _is_valid) == {
+        'info': {'insured_name*': 'Jane Doe', 'notes/comments': 'Roof leak; Call first'}
+    }
@@ -0,0 +1,54 @@
+# test_claim_merge.py
+
+from claim_merge import merge_result, new_record
+
+def _merge(*results):
+    record = new_record('claim:BX-12345678')
+    for number, result in enumerate(results):
+        merge_result(record, result, f"result-{number}", float(number))
+    return record
+
+def test_newer_value_replaces_at_equal_confidence():
+    record = _merge({'info': {"Insured's Name*": 'Jane Doe'}},
+                    {'info': {"Insured's Name*": 'Jane Smith'}})
+    field = record['fields']['insured_name']
+    assert field['value'] == 'Jane Smith'
+    assert field['source'] == 'result-1'
+    assert field['revisions'] == 1
+    assert record['sources'] == ['result-0', 'result-1']
+
+def test_flagged_value_does_not_replace_valid_one():
+    record = _merge({'info': {'Date of Loss*': 'March 3rd, 2024'}},
+                    {'info': {'Date of Loss*': '3/3 (Invalid Format)'}})
+    field = record['fields']['date_of_loss']
+    assert field['value'] == 'March 3rd, 2024'
+    assert field['source'] == 'result-0'
+    assert field['revisions'] == 0
+
+def test_valid_value_replaces_flagged_one():
+    record = _merge({'info': {'Date of Loss*': '3/3 (Invalid Format)'}},
+                    {'info': {'Date of Loss*': 'March 3rd, 2024'}})
+    field = record['fields']['date_of_loss']
+    assert field['value'] == 'March 3rd, 2024'
+    assert field['confidence'] == 1.0
+
+def test_missing_value_never_overwrites():
+    record = _merge({'info': {'Insurance Carrier*': 'Beacon Mutual'}},
+                    {'info': {'Insurance Carrier*': 'N/A'}})
+    assert record['fields']['insurance_carrier']['value'] == 'Beacon Mutual'
+
+def test_accumulating_fields_join_distinct_values():
+    record = _merge({'notes': {'Notes/Comments': 'Roof leak'}},
+                    {'notes': {'Notes/Comments': 'Insured prefers mornings (Invalid Format)'}},
+                    {'notes': {'Notes/Comments': 'roof leak'}})
+    field = record['fields']['notes_comments']
+    assert field['value'] == 'Roof leak; Insured prefers mornings'
+    assert field['confidence'] == 0.5
+    assert field['revisions'] == 1
+
+def test_identifiers_are_normalized():
+    record = _merge({'info': {'Claim Number*': 'bx- 12345678'}},
+                    {'info': {'Claim Number*': 'BX-12345678'}})
+    field = record['fields']['claim_number']
+    assert field['value'] == 'BX-12345678'
+    assert field['revisions'] == 0
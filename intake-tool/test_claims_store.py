@@ -0,0 +1,46 @@
+# test_claims_store.py
+
+import pytest
+
+from claims_store import ClaimStore
+
+@pytest.fixture
+def store(tmp_path):
+    claims = ClaimStore(str(tmp_path / 'claims.db'))
+    yield claims
+    claims.close()
+
+def test_policy_only_record_is_adopted_by_later_claim_number(store):
+    store.add({'info': {'Policy Number': 'BCR-2024-00001', "Insured's Name*": 'Jane Doe'}}, 'account-a')
+    store.add({'info': {'Claim Number*': 'BX-12345678', 'Policy Number': 'BCR-2024-00001',
+                        'Insurance Carrier*': 'Beacon Mutual'}}, 'account-a')
+
+    record = store.get_record('bx-12345678', 'account-a')
+    assert record['key'] == 'policy:BCR-2024-00001'
+    assert record['claim_number'] == 'BX-12345678'
+    assert record['result']['info'] == {
+        'policy_number': 'BCR-2024-00001',
+        'insured_name': 'Jane Doe',
+        'claim_number': 'BX-12345678',
+        'insurance_carrier': 'Beacon Mutual',
+    }
+    assert len(record['sources']) == 2
+    assert store.get_record('BCR-2024-00001', 'account-a')['key'] == record['key']
+
+def test_policy_record_with_claim_number_is_not_adopted_by_another_claim(store):
+    store.add({'info': {'Claim Number*': 'BX-11111111', 'Policy Number': 'BCR-2024-00001'}}, 'account-a')
+    store.add({'info': {'Claim Number*': 'BX-22222222', 'Policy Number': 'BCR-2024-00001'}}, 'account-a')
+
+    assert store.get_record('BX-11111111', 'account-a')['key'] == 'claim:BX-11111111'
+    assert store.get_record('BX-22222222', 'account-a')['key'] == 'claim:BX-22222222'
+    # The policy resolves to its latest claim
+    assert store.get_record('BCR-2024-00001', 'account-a')['claim_number'] == 'BX-22222222'
+
+def test_records_are_not_shared_between_accounts(store):
+    store.add({'info': {'Claim Number*': 'BX-12345678', "Insured's Name*": 'Jane Doe'}}, 'account-a')
+    store.add({'info': {'Claim Number*': 'BX-12345678', "Insured's Name*": 'John Roe'}}, 'account-b')
+
+    assert store.get_record('BX-12345678', 'account-a')['result']['info']['insured_name'] == 'Jane Doe'
+    assert store.get_record('BX-12345678', 'account-b')['result']['info']['insured_name'] == 'John Roe'
+    assert store.get_record('BX-12345678', 'account-c') is None
+    assert [item['insured_name'] for item in store.query('account-b', claim_number='BX-12345678')['items']] == ['John Roe']
@@ -0,0 +1,74 @@
+# test_columnar_exporter.py
+
+import io
+import json
+from datetime import date
+
+import pyarrow.parquet as pq
+
+from columnar_exporter import ColumnarExporter
+
+FIELD_VALIDATION = {
+    'claim_number_pattern': r'^BX-\d{8}$',
+    'date_of_loss_pattern': r'^(January|February|March|April|May|June|July|August|September|October|November|December) \d{1,2}(st|nd|rd|th)?, \d{4}$',
+    'client_company_pattern': r'^[A-Za-z\s]+$',
+    'insured_name_pattern': r'^[A-Za-z\s]+$',
+    'insured_phone_pattern': r'^\d{3}-\d{3}-\d{4}$',
+    'risk_location_pattern': r'^.+$',
+    'cat_event_related_pattern': '^(Yes|No)$',
+    'services_needed_pattern': r'^.+$',
+    'number_of_buildings_pattern': r'^\d+$',
+}
+
+# Shaped like EmailParser output: sections keyed by the form's labels
+PARSED = {
+    'assignment_information': {
+        'claim_number*': 'BX-12345678',
+        'date_of_loss*': 'March 3rd, 2024',
+        "client_(assigner's_company)*": 'Acme Adjusters',
+        'insurance_carrier*': 'Beacon Mutual',
+        "insured's_name*": 'Jane Doe',
+        "insured's_phone_number_1*": '555-123-4567',
+        "insured's_phone_number_2": '555-987-6543',
+        'address_of_risk_location*': '12 Main St, Springfield',
+        'is_this_related_to_a_cat_event?*': 'Yes',
+    },
+    'description_of_services_needed': {
+        'describe_the_services_needed*': 'Roof inspection',
+    },
+    'questions_to_help_us_speed_up_assignment_processing': {
+        'number_of_buildings/units_(if_commercial)': '2',
+    },
+}
+
+def _export(entries):
+    buffer = io.BytesIO()
+    ColumnarExporter(FIELD_VALIDATION).write(entries, buffer, 'parquet')
+    buffer.seek(0)
+    return pq.read_table(buffer).to_pylist()
+
+def test_parser_labels_fill_typed_columns():
+    row = _export([{'index': 0, 'result': PARSED}])[0]
+    assert row['claim_number'] == 'BX-12345678'
+    assert row['date_of_loss'] == date(2024, 3, 3)
+    assert row['client_company'] == 'Acme Adjusters'
+    assert row['insured_name'] == 'Jane Doe'
+    assert row['insured_phone'] == '555-123-4567'
+    assert row['risk_location'] == '12 Main St, Springfield'
+    assert row['cat_event_related'] is True
+    assert row['services_needed'] == 'Roof inspection'
+    assert row['number_of_buildings'] == 2
+
+def test_unregistered_and_duplicate_fields_go_to_extra_fields():
+    row = _export([{'index': 0, 'result': PARSED}])[0]
+    assert json.loads(row['extra_fields']) == {
+        'insurance_carrier*': 'Beacon Mutual',
+        "insured's_phone_number_2": '555-987-6543',
+    }
+
+def test_error_entries_have_null_fields():
+    row = _export([{'index': 3, 'error': 'AI request failed'}])[0]
+    assert row['id'] == '3'
+    assert row['error'] == 'AI request failed'
+    assert row['claim_number'] is None
+    assert row['extra_fields'] is None
@@ -0,0 +1,96 @@
+# thread_parsing.py
+"""
+Incremental parsing of reply chains.
+
+Every reply in a thread quotes the messages before it, so parsing each reply
+from scratch costs more as the thread grows. In thread mode the parser sends
+only the new message (quoted history removed) together with the thread's
+current field values, asks for the fields that changed, and merges them into
+the previous state, so a reply costs about the same however long the thread is.
+"""
+
+import re
+import copy
+from typing import Any, Dict
+
+from token_predictor import QUOTE_HEADERS
+
+MISSING_VALUE = 'N/A'
+
+_HEADER_LINE = re.compile(r'^[A-Za-z-]+:\s')
+
+def strip_quoted_history(email_content: str) -> str:
+    """
+    Removes the quoted earlier messages from a reply.
+
+    The message is cut at the first reply or forward header that follows its body,
+    and '>'-quoted lines are dropped.
+
+    Args:
+        email_content (str): The reply as received.
+
+    Returns:
+        str: The new message only (the original content if nothing would be left).
+    """
+    # Skip the message's own header block (From:/To:/Subject: lines at the top)
+    body_start = 0
+    lines = email_content.split('\n')
+    if lines and _HEADER_LINE.match(lines[0].strip()):
+        for line in lines:
+            body_start += len(line) + 1
+            if not line.strip():
+                break
+    match = QUOTE_HEADERS.search(email_content, min(body_start, len(email_content)))
+    new_message = email_content[:match.start()] if match else email_content
+    new_message = '\n'.join(line for line in new_message.split('\n') if not line.lstrip().startswith('>')).strip()
+    return new_message or email_content
+
+def _field_label(key: str) -> str:
+    """
+    Renders a parsed field key as its form label ("insured's_name*" -> "Insured's Name*").
+    """
+    return ' '.join(word[:1].upper() + word[1:] for word in key.split('_'))
+
+def render_current_fields(state: Dict[str, Any]) -> str:
+    """
+    Renders a thread's filled fields in the parser's response format.
+
+    Missing values are left out, so the prompt only grows with what is known about the claim.
+
+    Args:
+        state (Dict[str, Any]): Current parsed data ({section: {field: value}}).
+
+    Returns:
+        str: Sections and fields, or "(none)" if no field is filled.
+    """
+    blocks = []
+    for section, fields in state.items():
+        if not isinstance(fields, dict):
+            continue
+        lines = [f"- {_field_label(key)}: {value}" for key, value in fields.items()
+                 if isinstance(value, str) and value.strip() and value.strip() != MISSING_VALUE]
+        if lines:
+            blocks.append(f"**{section.replace('_', ' ').upper()}**\n" + '\n'.join(lines))
+    return '\n\n'.join(blocks) or "(none)"
+
+def merge_changes(state: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Applies the fields a reply changed to the thread's previous state.
+
+    Args:
+        state (Dict[str, Any]): Previous parsed data.
+        changes (Dict[str, Any]): Changed fields parsed from the reply, in the same layout.
+
+    Returns:
+        Dict[str, Any]: The merged parsed data (the previous state is not modified).
+    """
+    merged = copy.deepcopy(state)
+    for section, fields in changes.items():
+        if not isinstance(fields, dict):
+            continue
+        target = merged.setdefault(section, {})
+        for key, value in fields.items():
+            # A reply that does not mention a field never clears it
+            if isinstance(value, str) and value.strip() and value.strip() != MISSING_VALUE:
+                target[key] = value
+    return merged
@@ -0,0 +1,275 @@
+# token_accounting.py
+
+import os
+import time
+import asyncio
+import sqlite3
+import logging
+import contextvars
+from threading import Lock
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("app")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_usage (
+    account TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    estimated_tokens INTEGER NOT NULL DEFAULT 0,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    reserved_tokens INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (account, hour)
+);
+"""
+
+# Account row holding the totals of all accounts
+GLOBAL_ACCOUNT = '*'
+
+@dataclass
+class TokenUsage:
+    """
+    Provider tokens consumed by the work in one usage scope.
+    """
+    input_tokens: int = 0
+    output_tokens: int = 0
+    calls: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+# Usage accumulator of the request being served. Context variables are copied into
+# tasks, so provider calls made by the parser's tasks add to the request's usage.
+_usage: contextvars.ContextVar[Optional[TokenUsage]] = contextvars.ContextVar('token_usage', default=None)
+
+@contextmanager
+def usage_scope() -> Iterator[TokenUsage]:
+    """
+    Collects the provider tokens used by the enclosed work.
+
+    Yields:
+        TokenUsage: Accumulator filled by record_usage().
+    """
+    usage = TokenUsage()
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+def record_usage(input_tokens: int, output_tokens: int) -> None:
+    """
+    Adds one provider call to the current usage scope, if any.
+
+    Args:
+        input_tokens (int): Prompt tokens.
+        output_tokens (int): Completion tokens.
+    """
+    usage = _usage.get()
+    if usage is not None:
+        usage.input_tokens += input_tokens
+        usage.output_tokens += output_tokens
+        usage.calls += 1
+
+def current_hour(now: Optional[float] = None) -> int:
+    """
+    Returns the accounting hour (hours since the epoch).
+    """
+    return int((time.time() if now is None else now) // 3600)
+
+@dataclass
+class TokenReservation:
+    account: str
+    hour: int
+    estimated_tokens: int
+
+@dataclass
+class AdmissionDecision:
+    allowed: bool
+    retry_after: float
+    reservation: Optional[TokenReservation] = None
+
+class TokenLedger:
+    """
+    Per-account, per-hour token ledger backed by a local SQLite database (WAL mode).
+
+    Admission reserves a request's estimated tokens; settling replaces the
+    reservation with the tokens actually used. Every worker process on the host
+    shares the ledger, and each admission runs in an immediate transaction so
+    concurrent requests cannot overshoot a budget together.
+    """
+
+    def __init__(self, db_path: str = 'data/token_usage.db', account_hourly_budget: int = 0,
+                 global_hourly_budget: int = 0, retention_hours: int = 24 * 30) -> None:
+        """
+        Args:
+            db_path (str): Path to the SQLite database shared by the workers.
+            account_hourly_budget (int): Tokens one account may use per hour (0 = unlimited).
+            global_hourly_budget (int): Tokens all accounts together may use per hour (0 = unlimited).
+            retention_hours (int): Hours of usage history kept by prune().
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.account_hourly_budget = account_hourly_budget
+        self.global_hourly_budget = global_hourly_budget
+        self.retention_hours = retention_hours
+        self._lock = Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def _charged(self, account: str, hour: int) -> int:
+        row = self._conn.execute(
+            "SELECT input_tokens + output_tokens + reserved_tokens FROM token_usage WHERE account = ? AND hour = ?",
+            (account, hour)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _over_budget(self, account: str, hour: int, estimated_tokens: int, budget: int) -> bool:
+        if not budget:
+            return False
+        charged = self._charged(account, hour)
+        # An idle window admits one request even if its estimate alone exceeds the budget
+        return charged > 0 and charged + estimated_tokens > budget
+
+    def _add(self, account: str, hour: int, **deltas: int) -> None:
+        columns = ', '.join(deltas)
+        placeholders = ', '.join('?' for _ in deltas)
+        updates = ', '.join(f"{column} = {column} + excluded.{column}" for column in deltas)
+        self._conn.execute(
+            f"INSERT INTO token_usage (account, hour, {columns}) VALUES (?, ?, {placeholders}) "
+            f"ON CONFLICT(account, hour) DO UPDATE SET {updates}",
+            (account, hour, *deltas.values())
+        )
+
+    def reserve(self, account: str, estimated_tokens: int) -> AdmissionDecision:
+        """
+        Admits a request if its estimate fits the account's and the global hourly budget.
+
+        Args:
+            account (str): Account key (hashed API key).
+            estimated_tokens (int): Estimated input + output tokens.
+
+        Returns:
+            AdmissionDecision: Whether the request may proceed, its reservation,
+            and seconds until the next budget window if not.
+        """
+        now = time.time()
+        hour = current_hour(now)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                over_account = self._over_budget(account, hour, estimated_tokens, self.account_hourly_budget)
+                over_global = self._over_budget(GLOBAL_ACCOUNT, hour, estimated_tokens, self.global_hourly_budget)
+                if not (over_account or over_global):
+                    for name in (account, GLOBAL_ACCOUNT):
+                        self._add(name, hour, reserved_tokens=estimated_tokens)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if over_account or over_global:
+            retry_after = (hour + 1) * 3600 - now
+            scope = 'account' if over_account else 'global'
+            logger.warning(f"Hourly {scope} token budget exceeded: estimate={estimated_tokens}, retry_after={retry_after:.0f}s")
+            return AdmissionDecision(allowed=False, retry_after=retry_after)
+        return AdmissionDecision(allowed=True, retry_after=0.0,
+                                 reservation=TokenReservation(account, hour, estimated_tokens))
+
+    def settle(self, reservations: List[TokenReservation], usage: TokenUsage, requests: int = 1) -> None:
+        """
+        Releases reservations and records the tokens the admitted work actually used.
+
+        Args:
+            reservations (List[TokenReservation]): Reservations returned by reserve() for one request
+                (a streamed batch holds one per email).
+            usage (TokenUsage): Tokens used by the admitted work.
+            requests (int): Number of parse requests covered.
+        """
+        if not reservations:
+            return
+        account, hour = reservations[0].account, reservations[0].hour
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for name in (account, GLOBAL_ACCOUNT):
+                    self._add(name, hour, requests=requests,
+                              input_tokens=usage.input_tokens, output_tokens=usage.output_tokens)
+                    for reservation in reservations:
+                        self._add(name, reservation.hour, estimated_tokens=reservation.estimated_tokens,
+                                  reserved_tokens=-reservation.estimated_tokens)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def usage(self, account: str, hours: int = 24) -> List[Dict[str, Any]]:
+        """
+        Returns an account's usage per hour, newest first.
+
+        Args:
+            account (str): Account key, or GLOBAL_ACCOUNT for the totals.
+            hours (int): Number of hours to return.
+
+        Returns:
+            List[Dict[str, Any]]: Hourly usage rows.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT hour, requests, estimated_tokens, input_tokens, output_tokens, reserved_tokens "
+                "FROM token_usage WHERE account = ? AND hour > ? ORDER BY hour DESC",
+                (account, current_hour() - hours)
+            ).fetchall()
+        return [{
+            'hour_start': hour * 3600,
+            'requests': requests,
+            'estimated_tokens': estimated,
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'in_flight_tokens': reserved,
+        } for hour, requests, estimated, input_tokens, output_tokens, reserved in rows]
+
+    def prune(self) -> int:
+        """
+        Deletes usage rows older than the retention period.
+
+        Returns:
+            int: Number of rows deleted.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM token_usage WHERE hour < ?", (current_hour() - self.retention_hours,)
+            ).rowcount
+
+    async def wait_for_budget(self, account: str, estimated_tokens: int, poll_interval: float = 30.0) -> TokenReservation:
+        """
+        Defers until the budget admits the estimate (for background work).
+
+        Args:
+            account (str): Account key.
+            estimated_tokens (int): Estimated tokens.
+            poll_interval (float): Maximum seconds between admission attempts.
+
+        Returns:
+            TokenReservation: The reservation once admitted.
+        """
+        while True:
+            decision = await asyncio.to_thread(self.reserve, account, estimated_tokens)
+            if decision.allowed:
+                return decision.reservation
+            logger.info(f"Deferring {account} work for token budget ({decision.retry_after:.0f}s to next window)")
+            await asyncio.sleep(min(decision.retry_after, poll_interval))
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._conn.close()
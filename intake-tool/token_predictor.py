@@ -0,0 +1,338 @@
+# token_predictor.py
+"""
+Learned per-request max_tokens.
+
+The parser records how many tokens each completion actually used, together
+with cheap features of the email (length, spaCy entity count, keyword density,
+number of quoted messages). CompletionLengthModel fits an online ridge
+regression over those observations and sets max_tokens to the predicted length
+plus a safety margin, instead of a fixed budget far above what the prompt asks
+for. The model's sufficient statistics live in SQLite, so every worker on the
+host contributes to, and restarts keep, the same model.
+"""
+
+import os
+import re
+import math
+import time
+import sqlite3
+import logging
+from threading import Lock
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from prompt_template import CHARS_PER_TOKEN
+
+logger = logging.getLogger("parser")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS completion_model (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    stats BLOB NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Markers of an earlier message quoted in a reply or forward
+QUOTE_HEADERS = re.compile(
+    r'^\s*(?:-{2,}\s*(?:Original|Forwarded) Message\s*-{2,}|On .{1,200}wrote:|From:\s.+)$',
+    re.IGNORECASE | re.MULTILINE
+)
+_QUOTED_BLOCK = re.compile(r'(?:^(?!>).*\n|\A)(?=>)', re.MULTILINE)
+
+# Ridge penalty keeping the fit stable while there are few observations
+RIDGE = 1.0
+
+def count_quoted_messages(email_content: str) -> int:
+    """
+    Counts earlier messages quoted in an email (reply headers, forwards and '>' blocks).
+
+    Args:
+        email_content (str): The email content.
+
+    Returns:
+        int: Number of quoted messages.
+    """
+    headers = len(QUOTE_HEADERS.findall(email_content))
+    # A From: line at the very top is the message's own header, not a quote
+    if re.match(r'\s*From:\s', email_content, re.IGNORECASE):
+        headers -= 1
+    return max(headers, len(_QUOTED_BLOCK.findall(email_content)))
+
+@dataclass(frozen=True)
+class EmailFeatures:
+    """
+    Cheap features of an email that predict how long its completion will be.
+    """
+    email_tokens: int
+    entities: int
+    keyword_density: float
+    quoted_messages: int
+
+    def vector(self) -> List[float]:
+        """
+        Returns the regression inputs (with intercept), scaled to similar ranges.
+        """
+        return [1.0, self.email_tokens / 100, float(self.entities), self.keyword_density * 10, float(self.quoted_messages)]
+
+def email_features(email_content: str, entities: int, keyword_density: float) -> EmailFeatures:
+    """
+    Builds the features of an email from its text and its spaCy analysis.
+
+    Args:
+        email_content (str): The email content.
+        entities (int): Number of named entities spaCy found.
+        keyword_density (float): Share of insurance keywords among the tokens.
+
+    Returns:
+        EmailFeatures: Features for the completion length model.
+    """
+    return EmailFeatures(
+        email_tokens=len(email_content) // CHARS_PER_TOKEN,
+        entities=entities,
+        keyword_density=keyword_density,
+        quoted_messages=count_quoted_messages(email_content)
+    )
+
+FEATURE_COUNT = len(EmailFeatures(0, 0, 0.0, 0).vector())
+
+def _empty_stats() -> Dict[str, Any]:
+    return {
+        'n': 0.0,
+        'xtx': [[0.0] * FEATURE_COUNT for _ in range(FEATURE_COUNT)],
+        'xty': [0.0] * FEATURE_COUNT,
+        'yy': 0.0,
+    }
+
+def _add_stats(target: Dict[str, Any], delta: Dict[str, Any], scale: float = 1.0) -> None:
+    target['n'] += delta['n'] * scale
+    target['yy'] += delta['yy'] * scale
+    for i in range(FEATURE_COUNT):
+        target['xty'][i] += delta['xty'][i] * scale
+        for j in range(FEATURE_COUNT):
+            target['xtx'][i][j] += delta['xtx'][i][j] * scale
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> List[float]:
+    """
+    Solves matrix @ w = vector by Gaussian elimination with partial pivoting.
+    """
+    size = len(vector)
+    rows = [list(row) + [value] for row, value in zip(matrix, vector)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(rows[r][col]))
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(col + 1, size):
+            factor = rows[r][col] / rows[col][col]
+            for c in range(col, size + 1):
+                rows[r][c] -= factor * rows[col][c]
+    weights = [0.0] * size
+    for r in range(size - 1, -1, -1):
+        weights[r] = (rows[r][size] - sum(rows[r][c] * weights[c] for c in range(r + 1, size))) / rows[r][r]
+    return weights
+
+class CompletionLengthModel:
+    """
+    Online ridge regression of completion tokens on email features, shared through SQLite.
+
+    Observations accumulate in memory and are merged into the stored statistics
+    every flush_every observations; beyond `window` observations the stored
+    statistics are scaled down so the model follows drifts in the prompt or model.
+    """
+
+    def __init__(self, db_path: str = 'data/token_model.db', min_samples: int = 50,
+                 stddevs: float = 2.0, safety_margin: float = 1.15, floor: int = 256,
+                 window: int = 5000, flush_every: int = 20) -> None:
+        """
+        Args:
+            db_path (str): Path to the SQLite database shared by the workers.
+            min_samples (int): Observations needed before predictions replace the configured limit.
+            stddevs (float): Residual standard deviations added to the predicted length.
+            safety_margin (float): Factor applied on top of the padded prediction.
+            floor (int): Lowest max_tokens ever set.
+            window (int): Approximate number of recent observations the model reflects.
+            flush_every (int): Observations buffered before they are merged into the database.
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.min_samples = min_samples
+        self.stddevs = stddevs
+        self.safety_margin = safety_margin
+        self.floor = floor
+        self.window = window
+        self.flush_every = flush_every
+        self._lock = Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        row = self._conn.execute("SELECT stats FROM completion_model WHERE id = 1").fetchone()
+        self._stats = orjson.loads(row[0]) if row else _empty_stats()
+        self._pending = _empty_stats()
+        self._fit: Optional[Dict[str, Any]] = None
+        self._counters = {
+            'requests': 0,
+            'predicted_requests': 0,
+            'limit_tokens': 0,
+            'output_tokens': 0,
+            'truncated': 0,
+            'truncated_predicted': 0,
+            'truncation_retries': 0,
+        }
+        logger.debug(f"Completion length model loaded from {db_path} ({int(self._stats['n'])} observations)")
+
+    def _current_fit(self) -> Optional[Dict[str, Any]]:
+        """
+        Returns the weights and residual deviation, refitting if observations arrived since the last fit.
+        """
+        if self._fit is not None:
+            return self._fit
+        stats = self._stats
+        if stats['n'] < self.min_samples:
+            return None
+        penalized = [[value + (RIDGE if i == j and i > 0 else 0.0) for j, value in enumerate(row)]
+                     for i, row in enumerate(stats['xtx'])]
+        try:
+            weights = _solve(penalized, stats['xty'])
+        except ZeroDivisionError:
+            return None
+        # Residual sum of squares from the sufficient statistics: y'y - 2w'X'y + w'X'Xw
+        fitted = sum(w * v for w, v in zip(weights, stats['xty']))
+        quadratic = sum(weights[i] * stats['xtx'][i][j] * weights[j]
+                        for i in range(FEATURE_COUNT) for j in range(FEATURE_COUNT))
+        residual = max(stats['yy'] - 2 * fitted + quadratic, 0.0)
+        sigma = math.sqrt(residual / max(stats['n'] - FEATURE_COUNT, 1.0))
+        self._fit = {'weights': weights, 'sigma': sigma}
+        return self._fit
+
+    def predict(self, features: EmailFeatures, ceiling: int) -> Optional[int]:
+        """
+        Predicts a max_tokens for an email.
+
+        Args:
+            features (EmailFeatures): Email features.
+            ceiling (int): Configured upper bound for max_tokens.
+
+        Returns:
+            Optional[int]: The limit, or None while the model has too few observations.
+        """
+        with self._lock:
+            fit = self._current_fit()
+        if fit is None:
+            return None
+        expected = sum(w * x for w, x in zip(fit['weights'], features.vector()))
+        limit = math.ceil((expected + self.stddevs * fit['sigma']) * self.safety_margin)
+        return min(max(limit, self.floor), ceiling)
+
+    def observe(self, features: EmailFeatures, output_tokens: int, limit: int,
+                predicted: bool, truncated: bool) -> bool:
+        """
+        Records a completion.
+
+        A truncated completion's true length is unknown, so it only counts towards
+        the truncation rate; the untruncated retry is observed instead. A completion
+        truncated at the ceiling is learned as ceiling-long.
+
+        Args:
+            features (EmailFeatures): Features of the email.
+            output_tokens (int): Tokens the completion used.
+            limit (int): max_tokens the request was sent with.
+            predicted (bool): Whether the limit came from the model.
+            truncated (bool): Whether the completion stopped at the limit.
+
+        Returns:
+            bool: True when enough observations are buffered to flush().
+        """
+        with self._lock:
+            counters = self._counters
+            counters['requests'] += 1
+            counters['limit_tokens'] += limit
+            counters['output_tokens'] += output_tokens
+            if predicted:
+                counters['predicted_requests'] += 1
+            if truncated:
+                counters['truncated'] += 1
+                if predicted:
+                    counters['truncated_predicted'] += 1
+                    counters['truncation_retries'] += 1
+                    return False
+            x = features.vector()
+            y = float(output_tokens)
+            for stats in (self._stats, self._pending):
+                stats['n'] += 1
+                stats['yy'] += y * y
+                for i in range(FEATURE_COUNT):
+                    stats['xty'][i] += x[i] * y
+                    for j in range(FEATURE_COUNT):
+                        stats['xtx'][i][j] += x[i] * x[j]
+            self._fit = None
+            return self._pending['n'] >= self.flush_every
+
+    def flush(self) -> None:
+        """
+        Merges buffered observations into the shared statistics and reloads them.
+        """
+        with self._lock:
+            if not self._pending['n']:
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT stats FROM completion_model WHERE id = 1").fetchone()
+                merged = orjson.loads(row[0]) if row else _empty_stats()
+                _add_stats(merged, self._pending)
+                if merged['n'] > self.window:
+                    # Exponential forgetting: older observations weigh less than recent ones
+                    scaled = _empty_stats()
+                    _add_stats(scaled, merged, self.window / merged['n'])
+                    merged = scaled
+                self._conn.execute(
+                    "INSERT INTO completion_model (id, stats, updated_at) VALUES (1, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET stats = excluded.stats, updated_at = excluded.updated_at",
+                    (orjson.dumps(merged), time.time())
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._stats = merged
+            self._pending = _empty_stats()
+            self._fit = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns model state and truncation metrics.
+
+        Returns:
+            Dict[str, Any]: Observations, average limit and output, and truncation rates.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            observations = int(self._stats['n'])
+            fit = self._current_fit()
+        requests = counters['requests']
+        predicted = counters['predicted_requests']
+        return {
+            'observations': observations,
+            'active': fit is not None,
+            'residual_stddev': round(fit['sigma'], 1) if fit else None,
+            'requests': requests,
+            'predicted_share': round(predicted / requests, 3) if requests else None,
+            'avg_max_tokens': round(counters['limit_tokens'] / requests, 1) if requests else None,
+            'avg_output_tokens': round(counters['output_tokens'] / requests, 1) if requests else None,
+            'truncation_rate': round(counters['truncated'] / requests, 4) if requests else None,
+            'predicted_truncation_rate': round(counters['truncated_predicted'] / predicted, 4) if predicted else None,
+            'truncation_retries': counters['truncation_retries'],
+        }
+
+    def close(self) -> None:
+        """
+        Flushes buffered observations and closes the database connection.
+        """
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Failed to save completion length model: {e}")
+        with self._lock:
+            self._conn.close()
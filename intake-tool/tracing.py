@@ -0,0 +1,413 @@
+# tracing.py
+"""
+Lightweight request tracing.
+
+Every request gets a trace id (taken from an incoming W3C traceparent header
+when present) and spans for the stages it passes through: endpoint, cache
+lookup, NLP, prompt build, provider calls and each retry attempt, response
+parsing, validation and export. Spans carry attributes such as token counts
+and cache status. Finished spans are handed to a background thread that
+batches them to the configured exporters: a local JSONL file, and an OTLP/HTTP
+(JSON) endpoint such as an OpenTelemetry collector.
+
+The current span lives in a context variable, so spans opened in tasks and
+worker threads started by a request (asyncio.create_task, asyncio.to_thread)
+nest under that request's spans.
+"""
+
+import os
+import time
+import queue
+import random
+import secrets
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+import requests
+
+logger = logging.getLogger("app")
+
+class Span:
+    """
+    One timed operation within a trace.
+    """
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """
+        Sets an attribute (None values are ignored).
+        """
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        """
+        Sets several attributes; keyword underscores stay as they are.
+        """
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_exception(self, exc: BaseException) -> None:
+        """
+        Marks the span as failed.
+        """
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the span as a JSON-serializable dict.
+        """
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+class _NoopSpan:
+    """
+    Stand-in yielded when tracing is disabled or the trace is not sampled.
+    """
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes: Any) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: contextvars.ContextVar[Optional[Any]] = contextvars.ContextVar('current_span', default=None)
+
+def current_span() -> Any:
+    """
+    Returns the active span, or a no-op span outside of a trace.
+    """
+    return _current_span.get() or NOOP_SPAN
+
+def current_trace_id() -> Optional[str]:
+    """
+    Returns the active trace id, if any.
+    """
+    return current_span().trace_id
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    Parses a W3C traceparent header ('00-<trace id>-<parent id>-<flags>').
+
+    Args:
+        value (Optional[str]): Header value.
+
+    Returns:
+        Optional[Tuple[str, str, bool]]: Trace id, parent span id and sampled flag, or None if invalid.
+    """
+    if not value:
+        return None
+    parts = value.strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    if parts[1] == '0' * 32 or parts[2] == '0' * 16:
+        return None
+    return parts[1], parts[2], sampled
+
+class SpanExporter:
+    """
+    Destination for finished spans. Exporters run on the tracer's background thread.
+    """
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+class JsonlSpanExporter(SpanExporter):
+    """
+    Appends spans to a local JSONL file, one span per line.
+    """
+
+    def __init__(self, path: str = 'logs/traces.jsonl') -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        with open(self.path, 'ab') as f:
+            f.write(b''.join(orjson.dumps(span) + b'\n' for span in spans))
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items()]
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """
+    Sends spans to an OTLP/HTTP endpoint (JSON encoding), e.g. an OpenTelemetry collector.
+    """
+
+    def __init__(self, endpoint: str = 'http://localhost:4318/v1/traces', headers: Optional[Dict[str, str]] = None,
+                 service_name: str = 'intake-tool', timeout: float = 5.0) -> None:
+        self.endpoint = endpoint
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+        self.service_name = service_name
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        payload = {'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes({'service.name': self.service_name})},
+            'scopeSpans': [{
+                'scope': {'name': 'intake-tool.tracing'},
+                'spans': [{
+                    'traceId': span['trace_id'],
+                    'spanId': span['span_id'],
+                    **({'parentSpanId': span['parent_id']} if span['parent_id'] else {}),
+                    'name': span['name'],
+                    'kind': 2 if span['parent_id'] is None else 1,  # SERVER for roots, INTERNAL otherwise
+                    'startTimeUnixNano': str(span['start_ns']),
+                    'endTimeUnixNano': str(span['end_ns']),
+                    'attributes': _otlp_attributes(span['attributes']),
+                    'status': {'code': 2, 'message': span['error']} if span['error'] else {'code': 1},
+                } for span in spans],
+            }],
+        }]}
+        response = self._session.post(self.endpoint, data=orjson.dumps(payload), headers=self.headers, timeout=self.timeout)
+        response.raise_for_status()
+
+    def shutdown(self) -> None:
+        self._session.close()
+
+class Tracer:
+    """
+    Creates spans and exports finished ones in batches from a background thread.
+
+    Export never blocks a request: spans go through a bounded queue, and spans
+    that do not fit are dropped and counted.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.sample_ratio = 1.0
+        self.exporters: List[SpanExporter] = []
+        self.batch_size = 256
+        self.flush_interval = 2.0
+        self._queue: queue.Queue = queue.Queue(maxsize=10000)
+        self._worker: Optional[threading.Thread] = None
+        self._worker_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.stats = {'exported': 0, 'dropped': 0, 'export_errors': 0}
+
+    def configure(self, tracing_config: Dict[str, Any]) -> None:
+        """
+        Applies the tracing configuration and creates the exporters.
+
+        Args:
+            tracing_config (Dict[str, Any]): The 'tracing' configuration section.
+        """
+        self.shutdown()
+        self.enabled = tracing_config.get('enabled', False)
+        self.sample_ratio = tracing_config.get('sample_ratio', 1.0)
+        self.batch_size = tracing_config.get('batch_size', 256)
+        self.flush_interval = tracing_config.get('flush_interval', 2.0)
+        self._queue = queue.Queue(maxsize=tracing_config.get('queue_size', 10000))
+        exporters_config = tracing_config.get('exporters', {})
+        self.exporters = []
+        jsonl = exporters_config.get('jsonl', {})
+        if jsonl.get('enabled', True):
+            self.exporters.append(JsonlSpanExporter(jsonl.get('path', 'logs/traces.jsonl')))
+        otlp = exporters_config.get('otlp', {})
+        if otlp.get('enabled', False):
+            self.exporters.append(OtlpHttpSpanExporter(
+                endpoint=otlp.get('endpoint', 'http://localhost:4318/v1/traces'),
+                headers=otlp.get('headers', {}),
+                service_name=tracing_config.get('service_name', 'intake-tool'),
+                timeout=otlp.get('timeout', 5.0)
+            ))
+        if self.enabled:
+            logger.info(f"Tracing enabled (sample ratio {self.sample_ratio}, "
+                        f"exporters: {', '.join(type(e).__name__ for e in self.exporters) or 'none'})")
+
+    @contextmanager
+    def span(self, name: str, traceparent: Optional[str] = None, **attributes: Any) -> Iterator[Any]:
+        """
+        Opens a span as a child of the active span, or as a new trace's root.
+
+        Args:
+            name (str): Span name (e.g. 'provider.attempt').
+            traceparent (Optional[str]): Incoming W3C traceparent header (root spans only).
+            **attributes: Initial attributes.
+
+        Yields:
+            Span: The span (a no-op span when tracing is off or the trace is not sampled).
+        """
+        parent = _current_span.get()
+        if not self.enabled or parent is NOOP_SPAN:
+            yield NOOP_SPAN
+            return
+        if parent is None:
+            remote = parse_traceparent(traceparent)
+            sampled = remote[2] if remote else random.random() < self.sample_ratio
+            if not sampled:
+                token = _current_span.set(NOOP_SPAN)
+                try:
+                    yield NOOP_SPAN
+                finally:
+                    _current_span.reset(token)
+                return
+            span = Span(name, remote[0] if remote else secrets.token_hex(16), remote[1] if remote else None, attributes)
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, attributes)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self._enqueue(span.to_dict())
+
+    def _enqueue(self, span: Dict[str, Any]) -> None:
+        if not self.exporters:
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.stats['dropped'] += 1
+
+    def _ensure_worker(self) -> None:
+        """
+        Starts the export thread (again after a fork, which does not copy threads).
+        """
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid:
+            return
+        with self._lock:
+            if self._worker is None or self._worker_pid != pid:
+                self._worker_pid = pid
+                self._worker = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            stop = item is None
+            if not stop:
+                batch.append(item)
+            while len(batch) < self.batch_size and not stop:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._export(batch)
+            if stop:
+                return
+
+    def _export(self, batch: List[Dict[str, Any]]) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(batch)
+            except Exception as e:
+                self.stats['export_errors'] += 1
+                logger.warning(f"{type(exporter).__name__} failed to export {len(batch)} spans: {e}")
+        self.stats['exported'] += len(batch)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """
+        Exports queued spans and stops the export thread.
+        """
+        worker = self._worker
+        if worker is not None and worker.is_alive() and self._worker_pid == os.getpid():
+            self._queue.put(None)
+            worker.join(timeout)
+        self._worker = None
+        for exporter in self.exporters:
+            exporter.shutdown()
+
+# Process-wide tracer, configured by the app at startup
+tracer = Tracer()
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening the root span of each HTTP request.
+
+    The trace id is returned in the X-Trace-Id response header so a slow request
+    can be looked up in the exported spans.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope['headers']:
+            if key == b'traceparent':
+                traceparent = value.decode('latin-1')
+                break
+
+        with tracer.span(f"{scope['method']} {scope['path']}", traceparent=traceparent,
+                         **{'http.method': scope['method'], 'http.target': scope['path']}) as span:
+            async def send_with_trace_id(message):
+                if message['type'] == 'http.response.start':
+                    span.set_attribute('http.status_code', message['status'])
+                    if span.trace_id:
+                        message = dict(message)
+                        message['headers'] = list(message.get('headers', [])) + [(b'x-trace-id', span.trace_id.encode('latin-1'))]
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)